@@ -1,91 +1,611 @@
+import argparse
 import heapq
+import math
 import time
 import tkinter as tk
 from tkinter import Button, Label
 
 goal_state = [[1, 2, 3], [4, 5, 6], [7, 8, 0]]
 
+# bidirectional: A* from both ends (front-to-end heuristic, not pdb);
+# bidirectional-bfs: breadth-first from both ends, ignores the heuristic
+ALGORITHMS = ("astar", "idastar", "bidirectional", "bidirectional-bfs")
+# manhattan: Manhattan distance; linear: Manhattan + linear conflicts;
+# walking: max(walking distance, Manhattan + linear conflicts);
+# pdb: additive pattern databases (see pattern_db.py), loaded with --pdb
+HEURISTICS = ("manhattan", "linear", "walking", "pdb")
 
-def find_position(state, tile):
-    for i, row in enumerate(state):
-        if tile in row:
-            return (i, row.index(tile))
-    return None
+
+def default_goal(size):
+    tiles = list(range(1, size * size)) + [0]
+    return [tiles[i * size:(i + 1) * size] for i in range(size)]
+
+
+class Puzzle:
+    # Size-dependent tables for an N x N board with the given goal layout.
+    # States are packed into a single int: `bits` bits per tile (4 up to the
+    # 15-puzzle, 5 for the 24-puzzle), position p (row-major) in bits
+    # bits*p..bits*(p+1)-1. The blank is 0.
+
+    def __init__(self, goal):
+        self.goal = [row[:] for row in goal]
+        self.size = len(goal)
+        self.cells = self.size * self.size
+        self.bits = max(4, (self.cells - 1).bit_length())
+        self.mask = (1 << self.bits) - 1
+        self.goal_code = self.pack(goal)
+
+        goal_pos = {tile: pos for pos, tile in enumerate(tile for row in goal for tile in row)}
+        self.goal_row = [goal_pos[tile] // self.size for tile in range(self.cells)]
+        self.goal_col = [goal_pos[tile] % self.size for tile in range(self.cells)]
+        # manhattan[tile][pos]: distance from pos to the goal position of tile (0 for the blank)
+        self.manhattan = [
+            [0] * self.cells if tile == 0 else
+            [abs(pos // self.size - self.goal_row[tile]) + abs(pos % self.size - self.goal_col[tile]) for pos in range(self.cells)]
+            for tile in range(self.cells)
+        ]
+        # neighbors[pos]: positions the blank can move to from pos (up, down, left, right)
+        self.neighbors = [
+            tuple(
+                (i + dx) * self.size + (j + dy)
+                for dx, dy in ((-1, 0), (1, 0), (0, -1), (0, 1))
+                if 0 <= i + dx < self.size and 0 <= j + dy < self.size
+            )
+            for i in range(self.size) for j in range(self.size)
+        ]
+        self.row_positions = [tuple(i * self.size + j for j in range(self.size)) for i in range(self.size)]
+        self.col_positions = [tuple(i * self.size + j for i in range(self.size)) for j in range(self.size)]
+        self.row_mask = (1 << (self.bits * self.size)) - 1
+        # _conflicts[vertical][line]: packed line -> linear conflicts
+        self._conflicts = ([{} for _ in range(self.size)], [{} for _ in range(self.size)])
+        self._walking = None
+        self.pattern_database = None
+
+    def pack(self, state):
+        code = 0
+        for pos, tile in enumerate(tile for row in state for tile in row):
+            code |= tile << (self.bits * pos)
+        return code
+
+    def unpack(self, code):
+        return [[self.tile_at(code, i * self.size + j) for j in range(self.size)] for i in range(self.size)]
+
+    def tile_at(self, code, pos):
+        return (code >> (self.bits * pos)) & self.mask
+
+    def blank_position(self, code):
+        for pos in range(self.cells):
+            if not self.tile_at(code, pos):
+                return pos
+        return None
+
+    def moves(self, code, blank):
+        # Yields (next_code, next_blank, tile) for each neighbour: `tile` moves
+        # from next_blank into the old blank position
+        for pos in self.neighbors[blank]:
+            tile = (code >> (self.bits * pos)) & self.mask
+            yield code - (tile << (self.bits * pos)) + (tile << (self.bits * blank)), pos, tile
+
+    def parity(self, code):
+        # Invariant under moves: parity of the inversions among the tiles in
+        # row-major order, plus the blank row on boards of even width (there a
+        # vertical move jumps an odd number of tiles)
+        tiles = [tile for tile in (self.tile_at(code, pos) for pos in range(self.cells)) if tile]
+        inversions = sum(1 for i in range(len(tiles)) for j in range(i + 1, len(tiles)) if tiles[i] > tiles[j])
+        if self.size % 2 == 0:
+            inversions += self.blank_position(code) // self.size
+        return inversions % 2
+
+    def is_solvable(self, code):
+        # Exactly half of the permutations reach the goal: those with its parity
+        return self.parity(code) == self.parity(self.goal_code)
+
+    def manhattan_distance(self, code):
+        return sum(self.manhattan[self.tile_at(code, pos)][pos] for pos in range(self.cells))
+
+    def line_conflicts(self, code, vertical, index):
+        # Extra moves forced by tiles that are in their goal row (or column)
+        # but in the wrong order: every tile outside a longest correctly
+        # ordered subsequence has to leave the line and come back (+2).
+        # Memoized on the packed tiles of the line
+        if vertical:
+            line = 0
+            for i, pos in enumerate(self.col_positions[index]):
+                line |= ((code >> (self.bits * pos)) & self.mask) << (self.bits * i)
+        else:
+            line = (code >> (self.bits * self.size * index)) & self.row_mask
+        memo = self._conflicts[vertical][index]
+        value = memo.get(line)
+        if value is None:
+            tiles = [(line >> (self.bits * i)) & self.mask for i in range(self.size)]
+            if vertical:
+                order = [self.goal_row[t] for t in tiles if t and self.goal_col[t] == index]
+            else:
+                order = [self.goal_col[t] for t in tiles if t and self.goal_row[t] == index]
+            longest = [1] * len(order)
+            for i in range(len(order)):
+                for j in range(i):
+                    if order[j] < order[i] and longest[j] + 1 > longest[i]:
+                        longest[i] = longest[j] + 1
+            value = memo[line] = 2 * (len(order) - max(longest, default=0))
+        return value
+
+    def linear_conflicts(self, code):
+        return sum(self.line_conflicts(code, vertical, i) for vertical in (False, True) for i in range(self.size))
+
+    def conflicts_delta(self, code, next_code, tile, src, dst):
+        # Only the moved tile changes line: a vertical move can only change the
+        # conflicts of its goal row (if it leaves or enters it), a horizontal
+        # one those of its goal column
+        if abs(src - dst) == self.size:
+            vertical, line = False, self.goal_row[tile]
+            if line != src // self.size and line != dst // self.size:
+                return 0
+        else:
+            vertical, line = True, self.goal_col[tile]
+            if line != src % self.size and line != dst % self.size:
+                return 0
+        return self.line_conflicts(next_code, vertical, line) - self.line_conflicts(code, vertical, line)
+
+    def walking_tables(self):
+        if self._walking is None:
+            self._walking = (WalkingDistance(self, vertical=True), WalkingDistance(self, vertical=False))
+        return self._walking
+
+    def evaluator(self, name):
+        if name == "manhattan":
+            return ManhattanEvaluator(self)
+        if name == "linear":
+            return LinearConflictEvaluator(self)
+        if name == "walking":
+            return WalkingDistanceEvaluator(self)
+        if name == "pdb":
+            if self.pattern_database is None:
+                raise ValueError(f"No hay base de datos de patrones cargada para {self.size}x{self.size} (usa --pdb)")
+            return PatternDatabaseEvaluator(self, self.pattern_database)
+        raise ValueError(f"Heurística desconocida: {name!r} (opciones: {', '.join(HEURISTICS)})")
+
+    def astar(self, start, heuristic_name="manhattan"):
+        evaluator = self.evaluator(heuristic_name)
+        priority_queue = []
+        # (f, g, state, blank, h, aux); the path is rebuilt from came_from at the end
+        h, aux = evaluator.start(start)
+        heapq.heappush(priority_queue, (h, 0, start, self.blank_position(start), h, aux))
+        came_from = {start: None}
+        g_score = {start: 0}
+        expanded = 0
+
+        while priority_queue:
+            _, moves, current, blank, h, aux = heapq.heappop(priority_queue)
+            # Stale entry: the state was reached again with a lower g
+            if moves > g_score[current]:
+                continue
+            if current == self.goal_code:
+                return reconstruct_path(came_from, current), expanded
+            expanded += 1
+
+            next_moves = moves + 1
+            for next_code, next_blank, tile in self.moves(current, blank):
+                # Skip the push if the state is already closed or queued with an
+                # equal-or-better g. With a consistent heuristic (manhattan) closed
+                # states are never improved; linear conflicts are admissible but
+                # not consistent, so a closed state may be reopened
+                if next_moves >= g_score.get(next_code, next_moves + 1):
+                    continue
+                g_score[next_code] = next_moves
+                came_from[next_code] = current
+                # Only the moved tile changes position: update h incrementally
+                next_h, next_aux = evaluator.step(aux, current, next_code, tile, next_blank, blank)
+                heapq.heappush(priority_queue, (next_h + next_moves, next_moves, next_code, next_blank, next_h, next_aux))
+
+        return None, expanded
+
+    def ida_star(self, start, heuristic_name="linear"):
+        # Depth-first iterative deepening on f = g + h: memory is linear in
+        # the solution depth (only the current path is kept)
+        evaluator = self.evaluator(heuristic_name)
+        h, aux = evaluator.start(start)
+        path = [start]
+        expanded = 0
+        found = object()
+
+        def search(code, blank, g, h, aux, bound, previous_blank):
+            nonlocal expanded
+            f = g + h
+            if f > bound:
+                return f
+            if code == self.goal_code:
+                return found
+            expanded += 1
+            minimum = math.inf
+            for next_code, next_blank, tile in self.moves(code, blank):
+                # Never undo the previous move
+                if next_blank == previous_blank:
+                    continue
+                next_h, next_aux = evaluator.step(aux, code, next_code, tile, next_blank, blank)
+                path.append(next_code)
+                result = search(next_code, next_blank, g + 1, next_h, next_aux, bound, blank)
+                if result is found:
+                    return found
+                path.pop()
+                minimum = min(minimum, result)
+            return minimum
+
+        bound = h
+        blank = self.blank_position(start)
+        while True:
+            result = search(start, blank, 0, h, aux, bound, None)
+            if result is found:
+                return path, expanded
+            if result == math.inf:
+                return None, expanded
+            bound = result
+
+    def bidirectional(self, start, heuristic_name="manhattan"):
+        # Bidirectional A* (front-to-end): a forward search from start towards
+        # the goal and a backward one from the goal towards start (moves are
+        # reversible, so it is a forward search on the puzzle whose goal is the
+        # start layout). Every state generated by one side that the other has
+        # already reached closes a path; the best one is optimal as soon as its
+        # length is <= max(min f forward, min f backward), since both minima
+        # are lower bounds on any path not found yet
+        if heuristic_name == "pdb":
+            raise ValueError("La búsqueda bidireccional no admite pdb: la base de datos solo estima la distancia al objetivo")
+        reverse = Puzzle(self.unpack(start))
+        forward = SearchFrontier(self, start, self.evaluator(heuristic_name))
+        backward = SearchFrontier(reverse, self.goal_code, reverse.evaluator(heuristic_name))
+        best = (0, start) if start == self.goal_code else (math.inf, None)
+
+        while True:
+            bound = max(forward.min_f(), backward.min_f())
+            if best[0] <= bound or bound == math.inf:
+                break
+            # Expand the side with the smaller open list
+            if len(forward.open) <= len(backward.open):
+                best = forward.expand(backward, best)
+            else:
+                best = backward.expand(forward, best)
+
+        expanded = forward.expanded + backward.expanded
+        if best[1] is None:
+            return None, expanded
+        return join_paths(forward.came_from, backward.came_from, best[1]), expanded
+
+    def bidirectional_bfs(self, start):
+        # Breadth-first search from both ends, one whole layer at a time from
+        # the smaller frontier. After the first layer that touches the other
+        # side, the shortest of the paths found in it is optimal
+        goal = self.goal_code
+        if start == goal:
+            return [start], 0
+        came_from = ({start: None}, {goal: None})
+        depth = ({start: 0}, {goal: 0})
+        frontiers = [[(start, self.blank_position(start))], [(goal, self.blank_position(goal))]]
+        expanded = 0
+
+        while frontiers[0] and frontiers[1]:
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            parents, depths, other = came_from[side], depth[side], depth[1 - side]
+            best = None
+            layer = []
+            for code, blank in frontiers[side]:
+                expanded += 1
+                next_depth = depths[code] + 1
+                for next_code, next_blank, _ in self.moves(code, blank):
+                    if next_code in depths:
+                        continue
+                    depths[next_code] = next_depth
+                    parents[next_code] = code
+                    layer.append((next_code, next_blank))
+                    if next_code in other and (best is None or next_depth + other[next_code] < best[0]):
+                        best = (next_depth + other[next_code], next_code)
+            if best is not None:
+                return join_paths(came_from[0], came_from[1], best[1]), expanded
+            frontiers[side] = layer
+
+        return None, expanded
+
+
+class SearchFrontier:
+    # One side of the bidirectional A*: open list, g values and parents
+    # (towards the side's own start)
+
+    def __init__(self, puzzle, start, evaluator):
+        self.puzzle = puzzle
+        self.evaluator = evaluator
+        h, aux = evaluator.start(start)
+        # (f, g, state, blank, aux), as in Puzzle.astar
+        self.open = [(h, 0, start, puzzle.blank_position(start), aux)]
+        self.g_score = {start: 0}
+        self.came_from = {start: None}
+        self.expanded = 0
+
+    def min_f(self):
+        # Drops stale entries so the top is a real lower bound
+        while self.open and self.open[0][1] > self.g_score[self.open[0][2]]:
+            heapq.heappop(self.open)
+        return self.open[0][0] if self.open else math.inf
+
+    def expand(self, other, best):
+        # Expands the best open state; returns the (length, meeting state) of
+        # the best path found so far
+        _, moves, current, blank, aux = heapq.heappop(self.open)
+        if moves > self.g_score[current]:
+            return best
+        self.expanded += 1
+        next_moves = moves + 1
+        for next_code, next_blank, tile in self.puzzle.moves(current, blank):
+            if next_moves >= self.g_score.get(next_code, next_moves + 1):
+                continue
+            self.g_score[next_code] = next_moves
+            self.came_from[next_code] = current
+            next_h, next_aux = self.evaluator.step(aux, current, next_code, tile, next_blank, blank)
+            heapq.heappush(self.open, (next_h + next_moves, next_moves, next_code, next_blank, next_aux))
+            other_moves = other.g_score.get(next_code)
+            if other_moves is not None and next_moves + other_moves < best[0]:
+                best = (next_moves + other_moves, next_code)
+        return best
+
+
+class WalkingDistance:
+    # Walking distance (Takahashi): moves needed in a relaxation that only
+    # tracks how many tiles of each goal row every row holds, and the row of
+    # the blank (vertical), or the same by columns (horizontal). All abstract
+    # states are enumerated once by BFS from the goal; transitions[id][d][g]
+    # is the state reached when a tile of group g moves into the blank's line
+    # from the previous (d=0) or next (d=1) line. Practical up to 4x4.
+
+    def __init__(self, puzzle, vertical):
+        self.size = puzzle.size
+        self.vertical = vertical
+        self.group = puzzle.goal_row if vertical else puzzle.goal_col
+        n = self.size
+        goal = self.key(puzzle, puzzle.goal_code)
+        self.index = {goal: 0}
+        self.distance = [0]
+        self.transitions = []
+        states = [goal]
+        i = 0
+        while i < len(states):
+            counts, blank = states[i][:-1], states[i][-1]
+            transitions = [[-1] * n, [-1] * n]
+            for d, other in ((0, blank - 1), (1, blank + 1)):
+                if not 0 <= other < n:
+                    continue
+                for g in range(n):
+                    if counts[other * n + g]:
+                        moved = list(counts)
+                        moved[other * n + g] -= 1
+                        moved[blank * n + g] += 1
+                        key = tuple(moved) + (other,)
+                        j = self.index.get(key)
+                        if j is None:
+                            j = self.index[key] = len(states)
+                            states.append(key)
+                            self.distance.append(self.distance[i] + 1)
+                        transitions[d][g] = j
+            self.transitions.append(transitions)
+            i += 1
+
+    def line(self, pos):
+        return pos // self.size if self.vertical else pos % self.size
+
+    def key(self, puzzle, code):
+        n = self.size
+        counts = [0] * (n * n)
+        blank = None
+        for pos in range(puzzle.cells):
+            tile = puzzle.tile_at(code, pos)
+            if tile:
+                counts[self.line(pos) * n + self.group[tile]] += 1
+            else:
+                blank = self.line(pos)
+        return tuple(counts) + (blank,)
+
+    def state_id(self, puzzle, code):
+        return self.index[self.key(puzzle, code)]
+
+    def move(self, state_id, tile, src, dst):
+        # `tile` moves from src to dst: the blank goes from line(dst) to line(src)
+        d = 0 if self.line(src) < self.line(dst) else 1
+        return self.transitions[state_id][d][self.group[tile]]
+
+
+# Evaluators: start(code) -> (h, aux) and step(aux, code, next_code, tile, src, dst)
+# -> (h, aux) for the move of `tile` from src to dst. `aux` carries what each
+# heuristic updates incrementally along the search.
+
+class ManhattanEvaluator:
+    def __init__(self, puzzle):
+        self.puzzle = puzzle
+        self.manhattan = puzzle.manhattan
+
+    def start(self, code):
+        h = self.puzzle.manhattan_distance(code)
+        return h, h
+
+    def step(self, aux, code, next_code, tile, src, dst):
+        h = aux - self.manhattan[tile][src] + self.manhattan[tile][dst]
+        return h, h
+
+
+class LinearConflictEvaluator:
+    # aux = (manhattan, linear conflicts)
+
+    def __init__(self, puzzle):
+        self.puzzle = puzzle
+        self.manhattan = puzzle.manhattan
+
+    def start(self, code):
+        md = self.puzzle.manhattan_distance(code)
+        lc = self.puzzle.linear_conflicts(code)
+        return md + lc, (md, lc)
+
+    def step(self, aux, code, next_code, tile, src, dst):
+        md, lc = aux
+        md += self.manhattan[tile][dst] - self.manhattan[tile][src]
+        lc += self.puzzle.conflicts_delta(code, next_code, tile, src, dst)
+        return md + lc, (md, lc)
+
+
+class WalkingDistanceEvaluator:
+    # aux = (manhattan, linear conflicts, vertical WD state, horizontal WD state)
+
+    def __init__(self, puzzle):
+        self.puzzle = puzzle
+        self.manhattan = puzzle.manhattan
+        self.vertical, self.horizontal = puzzle.walking_tables()
+
+    def start(self, code):
+        md = self.puzzle.manhattan_distance(code)
+        lc = self.puzzle.linear_conflicts(code)
+        v = self.vertical.state_id(self.puzzle, code)
+        w = self.horizontal.state_id(self.puzzle, code)
+        return self.value(md, lc, v, w), (md, lc, v, w)
+
+    def value(self, md, lc, v, w):
+        return max(md + lc, self.vertical.distance[v] + self.horizontal.distance[w])
+
+    def step(self, aux, code, next_code, tile, src, dst):
+        md, lc, v, w = aux
+        md += self.manhattan[tile][dst] - self.manhattan[tile][src]
+        lc += self.puzzle.conflicts_delta(code, next_code, tile, src, dst)
+        if abs(src - dst) == self.puzzle.size:
+            v = self.vertical.move(v, tile, src, dst)
+        else:
+            w = self.horizontal.move(w, tile, src, dst)
+        return self.value(md, lc, v, w), (md, lc, v, w)
+
+
+class PatternDatabaseEvaluator:
+    # aux = (index of each pattern, h). A move changes one digit of the index
+    # of the moved tile's pattern, so each step is a single table lookup
+
+    def __init__(self, puzzle, database):
+        self.puzzle = puzzle
+        self.tables = database.tables
+        self.slots = database.slots
+        self.database = database
+
+    def start(self, code):
+        indices = tuple(self.database.indices(self.puzzle, code))
+        h = sum(table[index] for table, index in zip(self.tables, indices))
+        return h, (indices, h)
+
+    def step(self, aux, code, next_code, tile, src, dst):
+        slot = self.slots[tile]
+        if slot is None:
+            return aux[1], aux
+        indices, h = aux
+        pattern, weight = slot
+        old = indices[pattern]
+        new = old + (dst - src) * weight
+        h += self.tables[pattern][new] - self.tables[pattern][old]
+        return h, (indices[:pattern] + (new,) + indices[pattern + 1:], h)
+
+
+_puzzles = {}
+
+
+def get_puzzle(goal):
+    key = tuple(tile for row in goal for tile in row)
+    if key not in _puzzles:
+        _puzzles[key] = Puzzle(goal)
+    return _puzzles[key]
+
+
+def load_pattern_database(path):
+    # Maps the file and attaches it to the puzzle with the same goal
+    from pattern_db import PatternDatabase
+    database = PatternDatabase(path)
+    get_puzzle(database.goal).pattern_database = database
+    return database
+
+
+def puzzle_for_state(state):
+    # goal_state for 3x3 boards, the standard goal (blank last) for other sizes
+    return get_puzzle(goal_state if len(state) == len(goal_state) else default_goal(len(state)))
 
 
 def heuristic(state):
-    cost = 0
-    for i in range(len(state)):
-        for j in range(len(state[i])):
-            if state[i][j] != 0:
-                goal_i, goal_j = find_position(goal_state, state[i][j])
-                cost += abs(i - goal_i) + abs(j - goal_j)
-    return cost
+    puzzle = puzzle_for_state(state)
+    return puzzle.manhattan_distance(puzzle.pack(state))
 
 
 def generate_moves(state):
-    moves = []
-    x, y = find_position(state, 0)
-    directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+    puzzle = puzzle_for_state(state)
+    code = puzzle.pack(state)
+    return [puzzle.unpack(next_code) for next_code, _, _ in puzzle.moves(code, puzzle.blank_position(code))]
 
-    for dx, dy in directions:
-        nx, ny = x + dx, y + dy
-        if 0 <= nx < len(state) and 0 <= ny < len(state[0]):
-            new_state = [row[:] for row in state]
-            new_state[x][y], new_state[nx][ny] = new_state[nx][ny], new_state[x][y]
-            moves.append(new_state)
-    return moves
 
+def reconstruct_path(came_from, code):
+    path = []
+    while code is not None:
+        path.append(code)
+        code = came_from[code]
+    path.reverse()
+    return path
 
-def solve_puzzle(initial_state):
-    start_time = time.time()
-    priority_queue = []
-    heapq.heappush(priority_queue, (heuristic(initial_state), 0, initial_state, []))
-    visited = set()
-
-    while priority_queue:
-        _, moves, current_state, path = heapq.heappop(priority_queue)
-        if current_state == goal_state:
-            end_time = time.time()
-            return path + [current_state], len(path), end_time - start_time
-
-        state_tuple = tuple(tuple(row) for row in current_state)
-        if state_tuple in visited:
-            continue
-        visited.add(state_tuple)
-
-        for next_state in generate_moves(current_state):
-            new_path = path + [current_state]
-            heapq.heappush(
-                priority_queue,
-                (
-                    heuristic(next_state) + len(new_path),
-                    len(new_path),
-                    next_state,
-                    new_path,
-                ),
-            )
 
-    return None, 0, 0
+def join_paths(forward, backward, meeting):
+    # Path start..meeting from the forward parents, then meeting..goal from
+    # the backward ones (which point towards the goal)
+    return reconstruct_path(forward, meeting) + reconstruct_path(backward, meeting)[-2::-1]
+
+
+def solve_puzzle(initial_state, algorithm="astar", heuristic_name=None, stats=None):
+    # Returns (solution states, number of moves, seconds); `stats` (a dict),
+    # if given, receives the number of expanded nodes and whether the state
+    # is solvable
+    start_time = time.time()
+    puzzle = puzzle_for_state(initial_state)
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Algoritmo desconocido: {algorithm!r} (opciones: {', '.join(ALGORITHMS)})")
+    if heuristic_name is None:
+        heuristic_name = "linear" if algorithm == "idastar" else "manhattan"
+    start = puzzle.pack(initial_state)
+    solvable = puzzle.is_solvable(start)
+    if stats is not None:
+        stats["solvable"] = solvable
+        stats["expanded"] = 0
+    # Without the check the search would exhaust the whole reachable half of
+    # the state space (or, with idastar, never finish)
+    if not solvable:
+        return None, 0, 0
+    if algorithm == "astar":
+        path, expanded = puzzle.astar(start, heuristic_name)
+    elif algorithm == "idastar":
+        path, expanded = puzzle.ida_star(start, heuristic_name)
+    elif algorithm == "bidirectional":
+        path, expanded = puzzle.bidirectional(start, heuristic_name)
+    else:
+        path, expanded = puzzle.bidirectional_bfs(start)
+    if stats is not None:
+        stats["expanded"] = expanded
+    end_time = time.time()
+    if path is None:
+        return None, 0, 0
+    return [puzzle.unpack(code) for code in path], len(path) - 1, end_time - start_time
 
 
 class PuzzleGUI:
     def __init__(self, root, solution, moves, time_taken):
         self.root = root
         self.solution = solution
+        self.size = len(solution[0])
         self.step = 0
         self.labels = []
 
         self.frame = tk.Frame(root)
         self.frame.pack()
 
-        for i in range(3):
+        for i in range(self.size):
             row_labels = []
-            for j in range(3):
+            for j in range(self.size):
                 label = Label(
                     self.frame,
                     text="",
-                    font=("Arial", 24),
+                    font=("Arial", 24 if self.size <= 4 else 18),
                     width=4,
                     height=2,
                     borderwidth=2,
@@ -120,8 +640,8 @@ class PuzzleGUI:
     def update_board(self):
         if 0 <= self.step < len(self.solution):
             current_state = self.solution[self.step]
-            for i in range(3):
-                for j in range(3):
+            for i in range(self.size):
+                for j in range(self.size):
                     value = current_state[i][j]
                     self.labels[i][j].config(text=str(value) if value != 0 else "")
 
@@ -136,18 +656,58 @@ class PuzzleGUI:
             self.update_board()
 
 
+def parse_state(values):
+    size = math.isqrt(len(values))
+    if size < 2 or size * size != len(values) or sorted(values) != list(range(size * size)):
+        raise ValueError("el estado debe ser una permutación de 0..N²-1 (N >= 2), con 0 como hueco")
+    return [values[i * size:(i + 1) * size] for i in range(size)]
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Solucionador del N-puzzle (8, 15, 24...)")
+    parser.add_argument("--state", type=int, nargs="+", metavar="T",
+                        help="Fichas por filas, 0 es el hueco (p. ej. --state 3 1 2 4 7 0 5 6 8)")
+    parser.add_argument("--algorithm", choices=ALGORITHMS, default="astar",
+                        help="astar (memoria proporcional a los nodos), idastar (memoria lineal), "
+                             "bidirectional (A* desde ambos extremos) o bidirectional-bfs (anchura desde ambos extremos)")
+    parser.add_argument("--heuristic", choices=HEURISTICS, default=None,
+                        help="Por defecto linear con idastar y manhattan con el resto (walking: tablas hasta 4x4); pdb con --pdb")
+    parser.add_argument("--pdb", metavar="RUTA",
+                        help="Base de datos de patrones (pattern_db.py build) a usar como heurística")
+    parser.add_argument("--no-gui", action="store_true", help="Mostrar la solución en consola")
+    args = parser.parse_args()
+
     initial_state = [[3, 1, 2], [4, 7, 0], [5, 6, 8]]
+    if args.state:
+        try:
+            initial_state = parse_state(args.state)
+        except ValueError as e:
+            parser.error(str(e))
 
-    solution, moves, time_taken = solve_puzzle(initial_state)
-    if solution:
+    heuristic_name = args.heuristic
+    if args.pdb:
+        database = load_pattern_database(args.pdb)
+        if database.size != len(initial_state):
+            parser.error(f"la base de datos {args.pdb} es para {database.size}x{database.size}")
+        heuristic_name = heuristic_name or "pdb"
+
+    stats = {}
+    solution, moves, time_taken = solve_puzzle(initial_state, args.algorithm, heuristic_name, stats)
+    if not stats["solvable"]:
+        print("El estado no tiene solución: la paridad de sus inversiones no coincide con la del objetivo.")
+    elif not solution:
+        print("No se encontró solución.")
+    elif args.no_gui:
+        for state in solution:
+            print("\n".join(" ".join(f"{tile:2d}" if tile else " ." for tile in row) for row in state))
+            print()
+        print(f"Movimientos: {moves} | Tiempo: {time_taken:.4f} segundos | Nodos expandidos: {stats['expanded']}")
+    else:
         root = tk.Tk()
-        root.title("8-Puzzle Solver")
+        root.title(f"{len(initial_state) ** 2 - 1}-Puzzle Solver")
         app = PuzzleGUI(root, solution, moves, time_taken)
         root.mainloop()
-    else:
-        print("No se encontró solución.")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
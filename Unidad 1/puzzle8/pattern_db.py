@@ -0,0 +1,254 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from Puzle8 import default_goal, get_puzzle
+
+# Additive disjoint pattern databases for the N-puzzle.
+#
+# Each pattern is a group of tiles; its table stores, for every placement of
+# those tiles, the minimum number of moves *of pattern tiles* needed to bring
+# them to their goal cells (moves of other tiles are free). Because the
+# groups are disjoint and each move moves a single tile, the values of all
+# patterns can be added and the sum is still an admissible (and consistent)
+# heuristic.
+#
+# Tables are built by retrograde BFS from the goal in layers of pattern-move
+# cost: the blank wanders through the cells not covered by pattern tiles at
+# zero cost (flood fill), and each pattern tile next to that region can be
+# moved into it at cost 1. An entry is indexed by the positions of the
+# pattern tiles as digits in base N*N (tile i of the pattern is digit i), so
+# moving one tile from src to dst changes the index by (dst - src) * (N*N)**i.
+#
+# File format: MAGIC, uint64 header length, JSON header (size, goal,
+# patterns, offset and length of each table), then the tables: one byte per
+# entry (255 = unreachable placement). The solver maps the file with mmap.
+#
+#     python pattern_db.py build --size 4 --partition 555 --workers 3
+#     python Puzle8.py --pdb pdb_4x4_555.bin --algorithm idastar --state ...
+
+MAGIC = b"PUZPDB01"
+UNREACHED = 255
+
+# Named partitions per board size
+PARTITIONS = {
+    3: {
+        "44": [[1, 2, 3, 4], [5, 6, 7, 8]],
+    },
+    4: {
+        "555": [[1, 2, 3, 5, 6], [4, 7, 8, 11, 12], [9, 10, 13, 14, 15]],
+        "663": [[1, 5, 6, 9, 10, 13], [7, 8, 11, 12, 14, 15], [2, 3, 4]],
+    },
+}
+DEFAULT_PARTITION = {3: "44", 4: "555"}
+
+# Largest table the builder accepts (bytes): (N*N)**k for a k-tile pattern
+MAX_TABLE_BYTES = 1 << 28
+
+
+def parse_partition(size, text):
+    if text in PARTITIONS.get(size, {}):
+        return PARTITIONS[size][text]
+    patterns = [[int(tile) for tile in group.split(",") if tile] for group in text.split("/")]
+    tiles = [tile for pattern in patterns for tile in pattern]
+    if len(tiles) != len(set(tiles)) or not all(1 <= tile < size * size for tile in tiles):
+        raise ValueError("los patrones deben ser grupos disjuntos de fichas 1..N²-1 (p. ej. 1,2,3/4,5,6,7,8)")
+    return patterns
+
+
+def build_pattern(goal, tiles, stats=None):
+    # Table (bytearray) of one pattern; `stats`, if given, receives the number
+    # of expanded abstract states and the BFS depth
+    puzzle = get_puzzle(goal)
+    cells = puzzle.cells
+    k = len(tiles)
+    if cells ** k > MAX_TABLE_BYTES:
+        raise ValueError(f"patrón de {k} fichas demasiado grande para un tablero de {cells} casillas")
+    weights = [cells ** i for i in range(k)]
+    goal_positions = [puzzle.goal_row[tile] * puzzle.size + puzzle.goal_col[tile] for tile in tiles]
+    goal_blank = puzzle.goal_row[0] * puzzle.size + puzzle.goal_col[0]
+    neighbors = puzzle.neighbors
+
+    table = bytearray([UNREACHED]) * (cells ** k)
+    # visited[(index * cells + blank) bit]: blank regions already expanded
+    visited = bytearray((cells ** k * cells + 7) // 8)
+    frontier = [sum(p * w for p, w in zip(goal_positions, weights)) * cells + goal_blank]
+    cost = depth = 0
+    expanded = 0
+
+    while frontier:
+        next_frontier = []
+        for state in frontier:
+            if visited[state >> 3] & (1 << (state & 7)):
+                continue
+            index, blank = divmod(state, cells)
+            positions = [(index // w) % cells for w in weights]
+            occupied = {p: slot for slot, p in enumerate(positions)}
+            if table[index] == UNREACHED:
+                table[index] = cost
+            expanded += 1
+            depth = cost
+
+            # Zero-cost closure: every cell the blank reaches without moving
+            # a pattern tile belongs to the same abstract state
+            region = [blank]
+            base = index * cells
+            visited[(base + blank) >> 3] |= 1 << ((base + blank) & 7)
+            for cell in region:
+                for nb in neighbors[cell]:
+                    if nb in occupied:
+                        continue
+                    bit = base + nb
+                    if not visited[bit >> 3] & (1 << (bit & 7)):
+                        visited[bit >> 3] |= 1 << (bit & 7)
+                        region.append(nb)
+
+            # Cost-1 moves: a pattern tile next to the region moves into it
+            for cell in region:
+                for nb in neighbors[cell]:
+                    slot = occupied.get(nb)
+                    if slot is None:
+                        continue
+                    child = (index + (cell - nb) * weights[slot]) * cells + nb
+                    if not visited[child >> 3] & (1 << (child & 7)):
+                        next_frontier.append(child)
+        frontier = next_frontier
+        cost += 1
+
+    if stats is not None:
+        stats["expanded"] = expanded
+        stats["depth"] = depth
+    return table
+
+
+def _build_worker(goal, tiles):
+    start = time.perf_counter()
+    stats = {}
+    table = build_pattern(goal, tiles, stats)
+    stats["seconds"] = time.perf_counter() - start
+    return table, stats
+
+
+def build_database(size, patterns, output, workers=None, goal=None):
+    # Builds every pattern (in parallel with `workers` processes) and writes
+    # the file. Returns per-pattern stats plus the total wall time
+    goal = goal or default_goal(size)
+    workers = workers or min(len(patterns), os.cpu_count() or 1)
+    start = time.perf_counter()
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_build_worker, [goal] * len(patterns), patterns))
+    else:
+        results = [_build_worker(goal, tiles) for tiles in patterns]
+    write_database(output, size, goal, patterns, [table for table, _ in results])
+    stats = {
+        "patterns": [dict(tiles=tiles, entries=len(table), **info) for tiles, (table, info) in zip(patterns, results)],
+        "workers": workers,
+        "seconds": time.perf_counter() - start,
+        "bytes": os.path.getsize(output),
+    }
+    return stats
+
+
+def write_database(path, size, goal, patterns, tables):
+    descriptors = []
+    offset = 0
+    for table in tables:
+        descriptors.append({"offset": offset, "length": len(table)})
+        offset += len(table)
+    header = json.dumps({"size": size, "goal": goal, "patterns": patterns, "tables": descriptors}).encode("utf-8")
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        for table in tables:
+            f.write(table)
+    os.replace(tmp, path)
+
+
+class PatternDatabase:
+    # Read-only view of a pattern database file; the tables are slices of a
+    # shared mmap, so several solver processes share the same pages
+
+    def __init__(self, path):
+        self.path = str(path)
+        with open(self.path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{self.path} no es una base de datos de patrones")
+            (header_length,) = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(header_length).decode("utf-8"))
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        data_start = len(MAGIC) + 8 + header_length
+        self.size = header["size"]
+        self.goal = header["goal"]
+        self.patterns = header["patterns"]
+        view = memoryview(self._mmap)
+        self.tables = [
+            view[data_start + table["offset"]:data_start + table["offset"] + table["length"]]
+            for table in header["tables"]
+        ]
+        cells = self.size * self.size
+        # slots[tile] = (pattern, weight of its digit in the index), None if uncovered
+        self.slots = [None] * cells
+        for p, tiles in enumerate(self.patterns):
+            for i, tile in enumerate(tiles):
+                self.slots[tile] = (p, cells ** i)
+
+    def indices(self, puzzle, code):
+        indices = [0] * len(self.patterns)
+        for pos in range(puzzle.cells):
+            slot = self.slots[puzzle.tile_at(code, pos)]
+            if slot is not None:
+                indices[slot[0]] += pos * slot[1]
+        return indices
+
+    def value(self, puzzle, code):
+        return sum(table[index] for table, index in zip(self.tables, self.indices(puzzle, code)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bases de datos de patrones aditivas para el N-puzzle")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_build = sub.add_parser("build", help="Construir una base de datos de patrones (BFS retrógrada)")
+    p_build.add_argument("--size", type=int, default=4)
+    p_build.add_argument("--partition", default=None,
+                         help="Nombre (3x3: 44; 4x4: 555, 663) o grupos explícitos, p. ej. 1,2,3,4/5,6,7,8")
+    p_build.add_argument("--output", default=None, help="Por defecto pdb_<N>x<N>_<partición>.bin")
+    p_build.add_argument("--workers", type=int, default=None, help="Procesos (por defecto uno por patrón, hasta el nº de CPUs)")
+    p_build.add_argument("--json", metavar="RUTA", help="Escribir las estadísticas de construcción en JSON")
+    p_info = sub.add_parser("info", help="Mostrar el contenido de una base de datos de patrones")
+    p_info.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        name = args.partition or DEFAULT_PARTITION.get(args.size)
+        if name is None:
+            parser.error(f"no hay partición por defecto para {args.size}x{args.size}: usa --partition")
+        try:
+            patterns = parse_partition(args.size, name)
+        except ValueError as e:
+            parser.error(str(e))
+        label = name if name in PARTITIONS.get(args.size, {}) else "-".join(str(len(p)) for p in patterns)
+        output = args.output or f"pdb_{args.size}x{args.size}_{label}.bin"
+        stats = build_database(args.size, patterns, output, args.workers)
+        for info in stats["patterns"]:
+            print(f"patrón {info['tiles']}: {info['entries']} entradas, {info['expanded']} estados, "
+                  f"profundidad {info['depth']}, {info['seconds']:.2f} s")
+        print(f"{output}: {stats['bytes']} bytes en {stats['seconds']:.2f} s con {stats['workers']} procesos")
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(stats, f, indent=2)
+    elif args.command == "info":
+        database = PatternDatabase(args.path)
+        print(json.dumps({
+            "size": database.size,
+            "patterns": database.patterns,
+            "entries": [len(table) for table in database.tables],
+            "max": [max(value for value in table if value != UNREACHED) for table in database.tables],
+            "bytes": os.path.getsize(args.path),
+        }, indent=2))
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Puzle8 and pattern_db are imported by name, as the scripts do
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,112 @@
+import random
+from collections import deque
+
+import pytest
+
+from Puzle8 import default_goal, get_puzzle, goal_state, load_pattern_database, solve_puzzle
+from pattern_db import PARTITIONS, build_database, parse_partition
+
+# Every algorithm is optimal with every admissible heuristic: solution
+# lengths are checked against a full breadth-first search of the 8-puzzle
+# and, for the 15-puzzle, against A* with Manhattan distance
+
+COMBINATIONS = [
+    ("astar", "manhattan"), ("astar", "linear"), ("astar", "walking"), ("astar", "pdb"),
+    ("idastar", "manhattan"), ("idastar", "linear"), ("idastar", "walking"), ("idastar", "pdb"),
+    ("bidirectional", "manhattan"), ("bidirectional", "linear"), ("bidirectional", "walking"),
+    ("bidirectional-bfs", None),
+]
+
+# The two hardest 8-puzzle states (31 moves)
+HARDEST = [[[8, 6, 7], [2, 5, 4], [3, 0, 1]], [[6, 4, 7], [8, 5, 0], [3, 2, 1]]]
+
+
+def random_walk(size, steps, seed):
+    puzzle = get_puzzle(default_goal(size))
+    rng = random.Random(seed)
+    code, blank, previous = puzzle.goal_code, puzzle.blank_position(puzzle.goal_code), None
+    for _ in range(steps):
+        code, next_blank, _ = rng.choice([m for m in puzzle.moves(code, blank) if m[1] != previous])
+        previous, blank = blank, next_blank
+    return puzzle.unpack(code)
+
+
+def attach_pdb(tmp_path_factory, size, patterns):
+    path = tmp_path_factory.mktemp("pdb") / f"pdb_{size}.bin"
+    build_database(size, patterns, str(path), workers=1)
+    return load_pattern_database(str(path))
+
+
+@pytest.fixture(scope="module")
+def distances():
+    # Exact distance to the goal of every solvable 8-puzzle state
+    puzzle = get_puzzle(goal_state)
+    distances = {puzzle.goal_code: 0}
+    queue = deque([(puzzle.goal_code, puzzle.blank_position(puzzle.goal_code))])
+    while queue:
+        code, blank = queue.popleft()
+        for next_code, next_blank, _ in puzzle.moves(code, blank):
+            if next_code not in distances:
+                distances[next_code] = distances[code] + 1
+                queue.append((next_code, next_blank))
+    return distances
+
+
+@pytest.fixture(scope="module")
+def pdb_3x3(tmp_path_factory):
+    database = attach_pdb(tmp_path_factory, 3, PARTITIONS[3]["44"])
+    yield database
+    get_puzzle(database.goal).pattern_database = None
+
+
+@pytest.fixture(scope="module")
+def pdb_4x4(tmp_path_factory):
+    # Small disjoint patterns: quick to build, still admissible
+    database = attach_pdb(tmp_path_factory, 4, parse_partition(4, "1,2,3/4,5,6/7,8,9/10,11,12/13,14,15"))
+    yield database
+    get_puzzle(database.goal).pattern_database = None
+
+
+def check_path(solution, start, goal):
+    puzzle = get_puzzle(goal)
+    assert solution[0] == start and solution[-1] == goal
+    for state, following in zip(solution, solution[1:]):
+        code = puzzle.pack(state)
+        assert puzzle.pack(following) in {m[0] for m in puzzle.moves(code, puzzle.blank_position(code))}
+
+
+def test_distances_cover_half_the_permutations(distances):
+    assert len(distances) == 181440
+    assert max(distances.values()) == 31
+
+
+@pytest.mark.parametrize("algorithm, heuristic_name", COMBINATIONS)
+def test_8_puzzle_optimal(distances, pdb_3x3, algorithm, heuristic_name):
+    puzzle = get_puzzle(goal_state)
+    rng = random.Random(1)
+    states = HARDEST + [puzzle.unpack(code) for code in rng.sample(sorted(distances), 12)] + [goal_state]
+    for state in states:
+        solution, moves, _ = solve_puzzle(state, algorithm, heuristic_name)
+        assert moves == distances[puzzle.pack(state)]
+        check_path(solution, state, goal_state)
+
+
+@pytest.mark.parametrize("algorithm", ["astar", "idastar", "bidirectional", "bidirectional-bfs"])
+def test_unsolvable(algorithm):
+    stats = {}
+    assert solve_puzzle([[2, 1, 3], [4, 5, 6], [7, 8, 0]], algorithm, stats=stats) == (None, 0, 0)
+    assert stats == {"solvable": False, "expanded": 0}
+
+
+@pytest.mark.parametrize("algorithm, heuristic_name", [
+    ("idastar", "linear"), ("idastar", "walking"), ("idastar", "pdb"), ("astar", "pdb"),
+    ("bidirectional", "linear"), ("bidirectional-bfs", None),
+])
+def test_15_puzzle_optimal(pdb_4x4, algorithm, heuristic_name):
+    goal = default_goal(4)
+    for seed in range(3):
+        state = random_walk(4, 30, seed)
+        _, expected, _ = solve_puzzle(state, "astar", "manhattan")
+        solution, moves, _ = solve_puzzle(state, algorithm, heuristic_name)
+        assert moves == expected
+        check_path(solution, state, goal)
@@ -0,0 +1,482 @@
+"""
+Backends de almacenamiento para el catálogo y los usuarios del recomendador.
+
+`Almacenamiento` define la interfaz común que usan el CLI y las
+herramientas de datos:
+
+  - catálogo: `platillos()`, `disponibilidad()`, `guardar_catalogo(...)`,
+    `actualizar_disponibilidad(cambios)`.
+  - usuarios: `obtener_usuario(uid)`, `iterar_usuarios()`,
+    `guardar_usuario(uid, perfil)`, `guardar_usuarios(pares)`,
+    `eliminar_usuario(uid)`.
+  - triples de la red: `iterar_triples()`, `añadir_triples(triples)`.
+
+Hay dos implementaciones:
+
+  - `AlmacenamientoJSON(data_dir)`: los archivos de siempre
+    (`platillos.json`, `ingredientes_disponibilidad.json`,
+    `red_semantica.json` + su diario, ver `DiarioRed`).
+  - `AlmacenamientoSQLite(path)`: una base SQLite local con tablas
+    indexadas para usuarios, preferencias, ingredientes de cada plato y
+    disponibilidad. Consultar un usuario es una búsqueda por clave en lugar
+    de parsear la red entera, y recorrer todos los usuarios es un cursor
+    (memoria constante).
+
+`abrir_almacenamiento(spec)` crea el backend a partir de una cadena
+`json:<directorio>` o `sqlite:<archivo>`, y `migrar(origen, destino)` copia
+todo el contenido de uno a otro. Desde consola:
+
+    python almacenamiento.py migrar json:data sqlite:data/recomendador.db
+"""
+
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+from abc import ABC, abstractmethod
+from itertools import groupby
+from pathlib import Path
+import argparse
+import json
+import os
+import sqlite3
+
+from herramientas_semanticas import cargar_red_simplificada, AlmacenTriples, DiarioRed, IndiceRed, iterar_usuarios_red
+
+
+# Campos del perfil que son listas de preferencias (tabla `preferencias`)
+CAMPOS_PREFERENCIA = (
+    'platos_gustan',
+    'platos_no_gustan',
+    'ingredientes_gustan',
+    'alergias',
+    'restricciones',
+    'ingredientes_no_gustan',
+)
+
+ARCHIVO_PLATILLOS = 'platillos.json'
+ARCHIVO_DISPONIBILIDAD = 'ingredientes_disponibilidad.json'
+ARCHIVO_RED = 'red_semantica.json'
+
+
+class Almacenamiento(ABC):
+    """Interfaz común de los backends de datos del recomendador."""
+
+    @abstractmethod
+    def platillos(self) -> List[Dict[str, Any]]:
+        """Catálogo completo, con el formato de `platillos.json`."""
+
+    @abstractmethod
+    def disponibilidad(self) -> Dict[str, bool]:
+        """Mapa ingrediente -> disponible."""
+
+    @abstractmethod
+    def guardar_catalogo(self, platillos: List[Dict[str, Any]], disponibilidad: Dict[str, bool]) -> None:
+        """Reemplaza catálogo y disponibilidad."""
+
+    @abstractmethod
+    def actualizar_disponibilidad(self, cambios: Dict[str, bool]) -> None:
+        """Aplica cambios puntuales de disponibilidad."""
+
+    @abstractmethod
+    def obtener_usuario(self, uid: str) -> Optional[Dict[str, Any]]:
+        """Perfil de `uid`, o None si no existe."""
+
+    @abstractmethod
+    def iterar_usuarios(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Pares (uid, perfil) en orden de alta."""
+
+    @abstractmethod
+    def guardar_usuario(self, uid: str, perfil: Dict[str, Any]) -> None:
+        """Añade o reemplaza el perfil de `uid`."""
+
+    @abstractmethod
+    def eliminar_usuario(self, uid: str) -> None:
+        """Elimina `uid` (no hace nada si no existe)."""
+
+    @abstractmethod
+    def iterar_triples(self) -> Iterator[Dict[str, Any]]:
+        """Triples {'s', 'p', 'o'} de la red."""
+
+    @abstractmethod
+    def añadir_triples(self, triples: Iterable[Dict[str, Any]]) -> None:
+        """Añade triples (los ya existentes se ignoran)."""
+
+    def guardar_usuarios(self, pares: Iterable[Tuple[str, Dict[str, Any]]]) -> int:
+        """Guarda muchos usuarios de una vez. Devuelve cuántos se guardaron."""
+        n = 0
+        for uid, perfil in pares:
+            self.guardar_usuario(uid, perfil)
+            n += 1
+        return n
+
+    def cerrar(self) -> None:
+        pass
+
+    def __enter__(self) -> 'Almacenamiento':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.cerrar()
+
+
+def _leer_json(path: Path, por_defecto: Any) -> Any:
+    if not path.exists():
+        return por_defecto
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _escribir_json_atomico(path: Path, datos: Any) -> None:
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(datos, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+class AlmacenamientoJSON(Almacenamiento):
+    """Backend sobre los archivos JSON de `data_dir`.
+
+    Las lecturas de usuarios no cargan la red entera: `iterar_usuarios`
+    la recorre en streaming y `obtener_usuario` usa el índice de
+    desplazamientos (`IndiceRed`). Solo las operaciones que necesitan la red
+    completa (triples, carga masiva) la leen en memoria. Los cambios de
+    usuarios y triples se registran en el diario de la red (`DiarioRed`),
+    así que cada escritura es O(cambio).
+    """
+
+    def __init__(self, data_dir: str):
+        self.data_dir = Path(data_dir)
+        self.path_platillos = self.data_dir / ARCHIVO_PLATILLOS
+        self.path_disponibilidad = self.data_dir / ARCHIVO_DISPONIBILIDAD
+        self.path_red = self.data_dir / ARCHIVO_RED
+        self._red: Optional[Dict[str, Any]] = None
+        # Índice de los triples de `_red` (se crea en el primer `añadir_triples`)
+        self._triples: Optional[AlmacenTriples] = None
+        self._diario = DiarioRed(str(self.path_red))
+        self._indice = IndiceRed(str(self.path_red))
+
+    def _cargar_red(self) -> Dict[str, Any]:
+        if self._red is None:
+            if self.path_red.exists() or os.path.exists(DiarioRed.ruta_diario(str(self.path_red))):
+                self._red = cargar_red_simplificada(str(self.path_red))
+            else:
+                self._red = {'usuarios': {}}
+            self._red.setdefault('usuarios', {})
+        return self._red
+
+    def platillos(self) -> List[Dict[str, Any]]:
+        return _leer_json(self.path_platillos, [])
+
+    def disponibilidad(self) -> Dict[str, bool]:
+        return _leer_json(self.path_disponibilidad, {})
+
+    def guardar_catalogo(self, platillos: List[Dict[str, Any]], disponibilidad: Dict[str, bool]) -> None:
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        _escribir_json_atomico(self.path_platillos, platillos)
+        _escribir_json_atomico(self.path_disponibilidad, disponibilidad)
+
+    def actualizar_disponibilidad(self, cambios: Dict[str, bool]) -> None:
+        disponibilidad = self.disponibilidad()
+        disponibilidad.update(cambios)
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        _escribir_json_atomico(self.path_disponibilidad, disponibilidad)
+
+    def obtener_usuario(self, uid: str) -> Optional[Dict[str, Any]]:
+        if self._red is not None:
+            return self._red['usuarios'].get(uid)
+        return self._indice.obtener(uid)
+
+    def iterar_usuarios(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        if self._red is not None:
+            return iter(list(self._red['usuarios'].items()))
+        return iterar_usuarios_red(str(self.path_red))
+
+    def guardar_usuario(self, uid: str, perfil: Dict[str, Any]) -> None:
+        self._diario.registrar_usuario(uid, perfil)
+        if self._red is not None:
+            self._red['usuarios'][uid] = perfil
+
+    def guardar_usuarios(self, pares: Iterable[Tuple[str, Dict[str, Any]]]) -> int:
+        # Carga masiva: se compacta el diario y se reescribe la instantánea una vez
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self._diario.compactar()
+        self._red = None
+        self._triples = None
+        red = self._cargar_red()
+        n = 0
+        for uid, perfil in pares:
+            red['usuarios'][uid] = perfil
+            n += 1
+        _escribir_json_atomico(self.path_red, red)
+        return n
+
+    def eliminar_usuario(self, uid: str) -> None:
+        if self.obtener_usuario(uid) is not None:
+            self._diario.eliminar_usuario(uid)
+            if self._red is not None:
+                del self._red['usuarios'][uid]
+
+    def iterar_triples(self) -> Iterator[Dict[str, Any]]:
+        return iter(list(self._cargar_red().get('triples', [])))
+
+    def añadir_triples(self, triples: Iterable[Dict[str, Any]]) -> None:
+        red = self._cargar_red()
+        existentes = red.setdefault('triples', [])
+        if self._triples is None:
+            self._triples = AlmacenTriples()
+            self._triples.añadir_varios(existentes)
+        nuevos = [{'s': t['s'], 'p': t['p'], 'o': t['o']} for t in triples if self._triples.añadir(t['s'], t['p'], t['o'])]
+        self._diario.registrar_triples(nuevos)
+        existentes.extend(nuevos)
+
+
+ESQUEMA_SQLITE = """
+CREATE TABLE IF NOT EXISTS platos (
+    orden INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    nombre TEXT,
+    disponible INTEGER,
+    extra TEXT
+);
+CREATE TABLE IF NOT EXISTS plato_ingredientes (
+    plato INTEGER NOT NULL REFERENCES platos(orden) ON DELETE CASCADE,
+    posicion INTEGER NOT NULL,
+    ingrediente TEXT NOT NULL,
+    PRIMARY KEY (plato, posicion)
+);
+CREATE INDEX IF NOT EXISTS idx_plato_ingredientes_ingrediente ON plato_ingredientes(ingrediente);
+CREATE TABLE IF NOT EXISTS disponibilidad (
+    ingrediente TEXT PRIMARY KEY,
+    disponible INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS usuarios (
+    id TEXT PRIMARY KEY,
+    campos TEXT NOT NULL,
+    extra TEXT
+);
+CREATE TABLE IF NOT EXISTS preferencias (
+    usuario TEXT NOT NULL REFERENCES usuarios(id) ON DELETE CASCADE,
+    tipo TEXT NOT NULL,
+    posicion INTEGER NOT NULL,
+    valor TEXT NOT NULL,
+    PRIMARY KEY (usuario, tipo, posicion)
+);
+CREATE INDEX IF NOT EXISTS idx_preferencias_tipo_valor ON preferencias(tipo, valor);
+CREATE TABLE IF NOT EXISTS triples (
+    s TEXT NOT NULL,
+    p TEXT NOT NULL,
+    o TEXT NOT NULL,
+    PRIMARY KEY (s, p, o)
+);
+CREATE INDEX IF NOT EXISTS idx_triples_po ON triples(p, o);
+"""
+
+
+class AlmacenamientoSQLite(Almacenamiento):
+    """Backend sobre una base SQLite local.
+
+    Esquema (ver `ESQUEMA_SQLITE`):
+      - `platos` + `plato_ingredientes` (índice por ingrediente): catálogo,
+        en el orden original; los campos no estándar de un plato van como
+        JSON en `platos.extra`.
+      - `disponibilidad`: ingrediente -> 0/1.
+      - `usuarios` + `preferencias` (índice por tipo y valor): una fila por
+        elemento de cada lista de preferencias. `usuarios.campos` recuerda
+        qué listas tenía el perfil y `usuarios.extra` el resto de campos.
+      - `triples`: objetos serializados como JSON.
+
+    Los ingredientes y preferencias se guardan tal cual (el recomendador ya
+    normaliza mayúsculas al compilar).
+    """
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        # La conexión puede usarse desde varios hilos si el llamador serializa
+        # el acceso (p. ej. el servidor HTTP, con un candado)
+        self.conexion = sqlite3.connect(self.path, check_same_thread=False)
+        self.conexion.execute('PRAGMA foreign_keys = ON')
+        self.conexion.execute('PRAGMA journal_mode = WAL')
+        self.conexion.executescript(ESQUEMA_SQLITE)
+        self.conexion.commit()
+
+    def cerrar(self) -> None:
+        self.conexion.close()
+
+    # --- catálogo ---
+    def platillos(self) -> List[Dict[str, Any]]:
+        filas = self.conexion.execute(
+            'SELECT p.orden, p.id, p.nombre, p.disponible, p.extra, i.ingrediente '
+            'FROM platos p LEFT JOIN plato_ingredientes i ON i.plato = p.orden '
+            'ORDER BY p.orden, i.posicion'
+        )
+        platillos = []
+        for _, grupo in groupby(filas, key=lambda fila: fila[0]):
+            grupo = list(grupo)
+            _, pid, nombre, disponible, extra, _ = grupo[0]
+            plato: Dict[str, Any] = {'id': pid}
+            if nombre is not None:
+                plato['name'] = nombre
+            plato['ingredients'] = [fila[5] for fila in grupo if fila[5] is not None]
+            if disponible is not None:
+                plato['available'] = bool(disponible)
+            if extra:
+                plato.update(json.loads(extra))
+            platillos.append(plato)
+        return platillos
+
+    def disponibilidad(self) -> Dict[str, bool]:
+        return {ing: bool(d) for ing, d in self.conexion.execute('SELECT ingrediente, disponible FROM disponibilidad ORDER BY rowid')}
+
+    def guardar_catalogo(self, platillos: List[Dict[str, Any]], disponibilidad: Dict[str, bool]) -> None:
+        with self.conexion:
+            self.conexion.execute('DELETE FROM plato_ingredientes')
+            self.conexion.execute('DELETE FROM platos')
+            self.conexion.execute('DELETE FROM disponibilidad')
+            for orden, p in enumerate(platillos):
+                extra = {k: v for k, v in p.items() if k not in ('id', 'name', 'ingredients', 'available')}
+                disponible = p.get('available')
+                self.conexion.execute(
+                    'INSERT INTO platos (orden, id, nombre, disponible, extra) VALUES (?, ?, ?, ?, ?)',
+                    (orden, p['id'], p.get('name'), None if disponible is None else int(bool(disponible)),
+                     json.dumps(extra, ensure_ascii=False) if extra else None),
+                )
+                self.conexion.executemany(
+                    'INSERT INTO plato_ingredientes (plato, posicion, ingrediente) VALUES (?, ?, ?)',
+                    [(orden, pos, ing) for pos, ing in enumerate(p.get('ingredients', []))],
+                )
+            self.conexion.executemany(
+                'INSERT INTO disponibilidad (ingrediente, disponible) VALUES (?, ?)',
+                [(ing, int(bool(d))) for ing, d in disponibilidad.items()],
+            )
+
+    def actualizar_disponibilidad(self, cambios: Dict[str, bool]) -> None:
+        with self.conexion:
+            self.conexion.executemany(
+                'INSERT INTO disponibilidad (ingrediente, disponible) VALUES (?, ?) '
+                'ON CONFLICT(ingrediente) DO UPDATE SET disponible = excluded.disponible',
+                [(ing, int(bool(d))) for ing, d in cambios.items()],
+            )
+
+    # --- usuarios ---
+    @staticmethod
+    def _armar_perfil(campos: str, extra: Optional[str], preferencias: Iterable[Tuple[str, Any]]) -> Dict[str, Any]:
+        perfil: Dict[str, Any] = json.loads(extra) if extra else {}
+        for campo in json.loads(campos):
+            perfil[campo] = []
+        for tipo, valor in preferencias:
+            perfil.setdefault(tipo, []).append(valor)
+        return perfil
+
+    def obtener_usuario(self, uid: str) -> Optional[Dict[str, Any]]:
+        fila = self.conexion.execute('SELECT campos, extra FROM usuarios WHERE id = ?', (uid,)).fetchone()
+        if fila is None:
+            return None
+        preferencias = self.conexion.execute(
+            'SELECT tipo, valor FROM preferencias WHERE usuario = ? ORDER BY tipo, posicion', (uid,)
+        )
+        return self._armar_perfil(fila[0], fila[1], preferencias)
+
+    def iterar_usuarios(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        # Un único cursor usuarios ⟕ preferencias agrupado por usuario:
+        # memoria constante aunque haya millones de usuarios
+        filas = self.conexion.execute(
+            'SELECT u.rowid, u.id, u.campos, u.extra, p.tipo, p.valor '
+            'FROM usuarios u LEFT JOIN preferencias p ON p.usuario = u.id '
+            'ORDER BY u.rowid, p.tipo, p.posicion'
+        )
+        for _, grupo in groupby(filas, key=lambda fila: fila[0]):
+            grupo = list(grupo)
+            _, uid, campos, extra, _, _ = grupo[0]
+            yield uid, self._armar_perfil(campos, extra, ((f[4], f[5]) for f in grupo if f[4] is not None))
+
+    def _insertar_usuario(self, uid: str, perfil: Dict[str, Any]) -> None:
+        campos = [c for c in perfil if c in CAMPOS_PREFERENCIA and isinstance(perfil[c], list)]
+        extra = {k: v for k, v in perfil.items() if k not in campos}
+        # ON CONFLICT ... DO UPDATE conserva el rowid (y con él el orden de alta)
+        self.conexion.execute(
+            'INSERT INTO usuarios (id, campos, extra) VALUES (?, ?, ?) '
+            'ON CONFLICT(id) DO UPDATE SET campos = excluded.campos, extra = excluded.extra',
+            (uid, json.dumps(campos), json.dumps(extra, ensure_ascii=False) if extra else None),
+        )
+        self.conexion.execute('DELETE FROM preferencias WHERE usuario = ?', (uid,))
+        self.conexion.executemany(
+            'INSERT INTO preferencias (usuario, tipo, posicion, valor) VALUES (?, ?, ?, ?)',
+            [(uid, campo, pos, valor) for campo in campos for pos, valor in enumerate(perfil[campo])],
+        )
+
+    def guardar_usuario(self, uid: str, perfil: Dict[str, Any]) -> None:
+        with self.conexion:
+            self._insertar_usuario(uid, perfil)
+
+    def guardar_usuarios(self, pares: Iterable[Tuple[str, Dict[str, Any]]]) -> int:
+        n = 0
+        with self.conexion:
+            for uid, perfil in pares:
+                self._insertar_usuario(uid, perfil)
+                n += 1
+        return n
+
+    def eliminar_usuario(self, uid: str) -> None:
+        with self.conexion:
+            self.conexion.execute('DELETE FROM usuarios WHERE id = ?', (uid,))
+
+    # --- triples ---
+    def iterar_triples(self) -> Iterator[Dict[str, Any]]:
+        for s, p, o in self.conexion.execute('SELECT s, p, o FROM triples ORDER BY rowid'):
+            yield {'s': s, 'p': p, 'o': json.loads(o)}
+
+    def añadir_triples(self, triples: Iterable[Dict[str, Any]]) -> None:
+        with self.conexion:
+            self.conexion.executemany(
+                'INSERT OR IGNORE INTO triples (s, p, o) VALUES (?, ?, ?)',
+                [(t['s'], t['p'], json.dumps(t['o'], ensure_ascii=False, sort_keys=True)) for t in triples],
+            )
+
+
+def abrir_almacenamiento(spec: str) -> Almacenamiento:
+    """Crea un backend a partir de `json:<directorio>` o `sqlite:<archivo>`.
+
+    Sin prefijo, las rutas terminadas en `.db`, `.sqlite` o `.sqlite3` se
+    abren como SQLite y el resto como directorio JSON.
+    """
+    tipo, sep, ruta = spec.partition(':')
+    if not sep or tipo not in ('json', 'sqlite'):
+        ruta = spec
+        tipo = 'sqlite' if Path(spec).suffix in ('.db', '.sqlite', '.sqlite3') else 'json'
+    if tipo == 'sqlite':
+        return AlmacenamientoSQLite(ruta)
+    return AlmacenamientoJSON(ruta)
+
+
+def migrar(origen: Almacenamiento, destino: Almacenamiento) -> Dict[str, int]:
+    """Copia catálogo, disponibilidad, usuarios y triples de `origen` a `destino`.
+
+    Los usuarios pasan en streaming (`iterar_usuarios` -> `guardar_usuarios`).
+    Devuelve el número de elementos copiados de cada tipo.
+    """
+    platillos = origen.platillos()
+    disponibilidad = origen.disponibilidad()
+    destino.guardar_catalogo(platillos, disponibilidad)
+    n_usuarios = destino.guardar_usuarios(origen.iterar_usuarios())
+    triples = list(origen.iterar_triples())
+    if triples:
+        destino.añadir_triples(triples)
+    return {
+        'platillos': len(platillos),
+        'ingredientes': len(disponibilidad),
+        'usuarios': n_usuarios,
+        'triples': len(triples),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Herramientas de almacenamiento del recomendador')
+    sub = parser.add_subparsers(dest='comando', required=True)
+    p_migrar = sub.add_parser('migrar', help='Copiar todos los datos de un backend a otro')
+    p_migrar.add_argument('origen', help='json:<directorio> o sqlite:<archivo>')
+    p_migrar.add_argument('destino', help='json:<directorio> o sqlite:<archivo>')
+    args = parser.parse_args()
+
+    if args.comando == 'migrar':
+        with abrir_almacenamiento(args.origen) as origen, abrir_almacenamiento(args.destino) as destino:
+            copiados = migrar(origen, destino)
+        print(', '.join(f'{n} {tipo}' for tipo, n in copiados.items()) + f' copiados de {args.origen} a {args.destino}')
@@ -0,0 +1,239 @@
+"""
+Benchmark del recomendador con catálogos y usuarios sintéticos.
+
+Genera un catálogo de N platos sobre M ingredientes con popularidad de
+ingredientes tipo Zipf (pocos ingredientes muy frecuentes, cola larga de
+ingredientes raros) y una base de usuarios con el formato de
+`red_semantica.json`. Después mide, para cada ruta de recomendación:
+
+  - compilacion: construir `RecommenderModel` (catálogo + disponibilidad).
+  - individual: `modelo.recommend(usuario)` (lista completa).
+  - individual_top: `modelo.recommend(usuario, top_k=K)`.
+  - lote: `modelo.recomendar_lote(usuarios)` (latencia por usuario).
+  - cache: `CacheRecomendaciones.recomendar` con consultas repetidas.
+  - ve: `modelo.recommend(usuario, motor='ve')` (eliminación de variables
+    propia; la primera consulta incluye construir la red).
+  - pgmpy: motor de referencia (solo con --pgmpy; es muy lento).
+
+y reporta percentiles de latencia, throughput y pico de memoria
+(tracemalloc, medido en una pasada aparte para no distorsionar tiempos).
+Con `--json` escribe el reporte para seguimiento de regresiones.
+
+Ejemplo:
+    python benchmark_recomendador.py --platos 5000 --ingredientes 800 --usuarios 500 --json bench.json
+"""
+
+from typing import List, Dict, Any, Callable, Tuple
+import argparse
+import json
+import platform
+import time
+import tracemalloc
+
+import numpy as np
+
+from recomendador import RecommenderModel
+from cache_recomendaciones import CacheRecomendaciones
+
+
+def _pesos_zipf(n: int, s: float) -> np.ndarray:
+    """Distribución de probabilidad Zipf(s) sobre los rangos 1..n."""
+    pesos = 1.0 / np.arange(1, n + 1, dtype=np.float64) ** s
+    return pesos / pesos.sum()
+
+
+def generar_catalogo(n_platos: int, n_ingredientes: int, ingredientes_por_plato: Tuple[int, int] = (3, 10), zipf_s: float = 1.1, frac_no_disponible: float = 0.02, semilla: int = 0) -> Tuple[List[Dict[str, Any]], Dict[str, bool]]:
+    """Catálogo sintético con el formato de `platillos.json` y su disponibilidad.
+
+    Cada plato toma entre `ingredientes_por_plato` ingredientes distintos,
+    muestreados según popularidad Zipf(`zipf_s`). Una fracción
+    `frac_no_disponible` de ingredientes se marca como no disponible.
+    """
+    rng = np.random.default_rng(semilla)
+    nombres = [f'ingrediente_{i}' for i in range(n_ingredientes)]
+    pesos = _pesos_zipf(n_ingredientes, zipf_s)
+    minimo, maximo = ingredientes_por_plato
+    platillos = []
+    for d in range(n_platos):
+        k = int(rng.integers(minimo, min(maximo, n_ingredientes) + 1))
+        elegidos = rng.choice(n_ingredientes, size=k, replace=False, p=pesos)
+        platillos.append({
+            'id': f'p{d}',
+            'name': f'Plato {d}',
+            'ingredients': [nombres[i] for i in elegidos],
+            'available': True,
+        })
+    no_disponibles = rng.random(n_ingredientes) < frac_no_disponible
+    disponibilidad = {nombre: not bool(falta) for nombre, falta in zip(nombres, no_disponibles)}
+    return platillos, disponibilidad
+
+
+def generar_usuarios(platillos: List[Dict[str, Any]], n_usuarios: int, zipf_s: float = 1.1, semilla: int = 0) -> Dict[str, Any]:
+    """Red semántica sintética ({'usuarios': {...}}) sobre el catálogo dado.
+
+    Gustos, alergias y restricciones se muestrean con la misma popularidad
+    Zipf que los ingredientes del catálogo (ingredientes frecuentes también
+    son los más elegidos).
+    """
+    rng = np.random.default_rng(semilla + 1)
+    ingredientes = sorted({ing.lower() for p in platillos for ing in p.get('ingredients', [])})
+    pesos = _pesos_zipf(len(ingredientes), zipf_s)
+    ids = [str(p['id']) for p in platillos]
+
+    def muestra(k_max: int, universo, p=None):
+        k = int(rng.integers(0, min(k_max, len(universo)) + 1))
+        return [universo[i] for i in rng.choice(len(universo), size=k, replace=False, p=p)] if k else []
+
+    usuarios = {}
+    for u in range(n_usuarios):
+        usuarios[f'u{u}'] = {
+            'platos_gustan': muestra(3, ids),
+            'platos_no_gustan': muestra(2, ids),
+            'ingredientes_gustan': muestra(6, ingredientes, pesos),
+            'alergias': muestra(1, ingredientes, pesos),
+            'restricciones': muestra(2, ingredientes, pesos),
+            'ingredientes_no_gustan': muestra(3, ingredientes, pesos),
+        }
+    return {'usuarios': usuarios}
+
+
+def _resumen(latencias: List[float], total: float, n_operaciones: int) -> Dict[str, float]:
+    """Percentiles (ms), media y throughput de una lista de latencias (s)."""
+    ms = np.asarray(latencias, dtype=np.float64) * 1000.0
+    return {
+        'n': n_operaciones,
+        'media_ms': float(ms.mean()) if len(ms) else 0.0,
+        'p50_ms': float(np.percentile(ms, 50)) if len(ms) else 0.0,
+        'p90_ms': float(np.percentile(ms, 90)) if len(ms) else 0.0,
+        'p99_ms': float(np.percentile(ms, 99)) if len(ms) else 0.0,
+        'max_ms': float(ms.max()) if len(ms) else 0.0,
+        'throughput_por_s': (n_operaciones / total) if total > 0 else 0.0,
+    }
+
+
+def _pico_memoria(fn: Callable[[], Any]) -> int:
+    """Pico de memoria (bytes) asignada por Python durante `fn()`.
+
+    `fn` no debe retener los resultados intermedios, para medir el pico de
+    una operación y no la suma de todas.
+    """
+    tracemalloc.start()
+    try:
+        fn()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return pico
+
+
+def _medir(nombre: str, pasos: List[Callable[[], Any]], medir_memoria: bool) -> Dict[str, Any]:
+    """Ejecuta cada paso, registra su latencia y (opcional) el pico de memoria del conjunto."""
+    latencias = []
+    inicio = time.perf_counter()
+    for paso in pasos:
+        t0 = time.perf_counter()
+        paso()
+        latencias.append(time.perf_counter() - t0)
+    total = time.perf_counter() - inicio
+    res = {'ruta': nombre, **_resumen(latencias, total, len(pasos))}
+    if medir_memoria:
+        def ejecutar_todos():
+            for paso in pasos:
+                paso()
+        res['pico_memoria_bytes'] = _pico_memoria(ejecutar_todos)
+    return res
+
+
+def ejecutar_benchmark(n_platos: int = 2000, n_ingredientes: int = 500, n_usuarios: int = 200, top_k: int = 10, zipf_s: float = 1.1, repeticiones_cache: int = 5, semilla: int = 0, incluir_pgmpy: bool = False, medir_memoria: bool = True) -> Dict[str, Any]:
+    """Genera datos sintéticos, mide todas las rutas y devuelve el reporte como dict."""
+    platillos, disponibilidad = generar_catalogo(n_platos, n_ingredientes, zipf_s=zipf_s, semilla=semilla)
+    usuarios = generar_usuarios(platillos, n_usuarios, zipf_s=zipf_s, semilla=semilla)['usuarios']
+    perfiles = list(usuarios.values())
+
+    resultados = []
+    modelo_ref: List[RecommenderModel] = []
+
+    def compilar():
+        modelo_ref[:] = [RecommenderModel(platillos, disponibilidad)]
+    resultados.append(_medir('compilacion', [compilar], medir_memoria))
+    modelo = modelo_ref[0]
+
+    resultados.append(_medir('individual', [lambda u=u: modelo.recommend(u) for u in perfiles], medir_memoria))
+    resultados.append(_medir('individual_top', [lambda u=u: modelo.recommend(u, top_k=top_k) for u in perfiles], medir_memoria))
+
+    # Lote: una sola pasada; la latencia reportada es por usuario
+    t0 = time.perf_counter()
+    for _ in modelo.recomendar_lote(usuarios):
+        pass
+    total_lote = time.perf_counter() - t0
+    lote = {'ruta': 'lote', **_resumen([total_lote / max(1, n_usuarios)] * n_usuarios, total_lote, n_usuarios)}
+    if medir_memoria:
+        def consumir_lote():
+            for _ in modelo.recomendar_lote(usuarios):
+                pass
+        lote['pico_memoria_bytes'] = _pico_memoria(consumir_lote)
+    resultados.append(lote)
+
+    # Caché: cada usuario consultado `repeticiones_cache` veces (la 1ª es fallo)
+    cache = CacheRecomendaciones(modelo, capacidad=max(1, n_usuarios))
+    consultas = [u for _ in range(repeticiones_cache) for u in perfiles]
+    cacheado = _medir('cache', [lambda u=u: cache.recomendar(u, top_k=top_k) for u in consultas], False)
+    cacheado.update(cache.estadisticas())
+    resultados.append(cacheado)
+
+    resultados.append(_medir('ve', [lambda u=u: modelo.recommend(u, motor='ve') for u in perfiles], False))
+
+    if incluir_pgmpy:
+        muestra = perfiles[:min(5, len(perfiles))]
+        resultados.append(_medir('pgmpy', [lambda u=u: modelo.recommend(u, motor='pgmpy') for u in muestra], False))
+
+    return {
+        'parametros': {
+            'platos': n_platos,
+            'ingredientes': n_ingredientes,
+            'usuarios': n_usuarios,
+            'top_k': top_k,
+            'zipf_s': zipf_s,
+            'repeticiones_cache': repeticiones_cache,
+            'semilla': semilla,
+        },
+        'entorno': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'maquina': platform.machine(),
+        },
+        'resultados': resultados,
+    }
+
+
+def imprimir_reporte(reporte: Dict[str, Any]) -> None:
+    """Tabla legible del reporte."""
+    p = reporte['parametros']
+    print(f"Catálogo: {p['platos']} platos, {p['ingredientes']} ingredientes (zipf s={p['zipf_s']}); {p['usuarios']} usuarios")
+    print(f"{'ruta':<16}{'n':>7}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'ops/s':>12}{'pico MiB':>10}")
+    for r in reporte['resultados']:
+        pico = r.get('pico_memoria_bytes')
+        pico_txt = f"{pico / 2**20:.1f}" if pico is not None else '-'
+        print(f"{r['ruta']:<16}{r['n']:>7}{r['p50_ms']:>10.3f}{r['p90_ms']:>10.3f}{r['p99_ms']:>10.3f}{r['throughput_por_s']:>12.1f}{pico_txt:>10}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark del recomendador con datos sintéticos')
+    parser.add_argument('--platos', type=int, default=2000)
+    parser.add_argument('--ingredientes', type=int, default=500)
+    parser.add_argument('--usuarios', type=int, default=200)
+    parser.add_argument('--top', type=int, default=10, metavar='K')
+    parser.add_argument('--zipf', type=float, default=1.1, help='Exponente de la popularidad Zipf de ingredientes')
+    parser.add_argument('--repeticiones-cache', type=int, default=5)
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--pgmpy', action='store_true', help='Incluir el motor de referencia pgmpy (lento)')
+    parser.add_argument('--sin-memoria', action='store_true', help='No medir el pico de memoria (más rápido)')
+    parser.add_argument('--json', metavar='RUTA', help='Escribir el reporte en JSON')
+    args = parser.parse_args()
+
+    reporte = ejecutar_benchmark(args.platos, args.ingredientes, args.usuarios, args.top, args.zipf,
+                                 args.repeticiones_cache, args.semilla, args.pgmpy, not args.sin_memoria)
+    imprimir_reporte(reporte)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(reporte, f, indent=2, ensure_ascii=False)
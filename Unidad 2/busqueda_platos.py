@@ -0,0 +1,85 @@
+"""
+Búsqueda incremental de platos por prefijo (nombre, id e ingredientes).
+
+`IndicePrefijos` guarda una lista ordenada de pares `(palabra, plato)` con
+todas las palabras del id, el nombre y los ingredientes de cada plato
+(en minúsculas y sin tildes, así "tiramisu" encuentra "Tiramisú"). Los
+platos cuyo texto tiene una palabra que empieza por `t` forman un rango
+contiguo de esa lista, que se localiza con dos búsquedas binarias.
+
+Una consulta con varias palabras devuelve los platos que casan con todas.
+Al escribir letra a letra cada consulta extiende la anterior, y su
+resultado es un subconjunto del anterior: en ese caso solo se filtran los
+candidatos previos con las palabras que han cambiado (la última de la
+consulta anterior, alargada, y las nuevas).
+"""
+
+from typing import List, Dict, Any, Tuple
+from bisect import bisect_left
+import re
+import unicodedata
+
+
+_PALABRA = re.compile(r'\w+')
+
+
+def normalizar_texto(texto: str) -> str:
+    """Minúsculas y sin marcas diacríticas ('Tiramisú' -> 'tiramisu')."""
+    descompuesto = unicodedata.normalize('NFKD', str(texto).lower())
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+def palabras(texto: str) -> List[str]:
+    return _PALABRA.findall(normalizar_texto(texto))
+
+
+class IndicePrefijos:
+    """Índice de prefijos sobre las palabras de cada plato del catálogo."""
+
+    def __init__(self, platillos: List[Dict[str, Any]]):
+        self.n_platos = len(platillos)
+        self.palabras_plato: List[Tuple[str, ...]] = []
+        pares = set()
+        for d, plato in enumerate(platillos):
+            texto = [str(plato.get('id', '')), plato.get('name', '')] + list(plato.get('ingredients', []))
+            propias = tuple(sorted({w for t in texto for w in palabras(t)}))
+            self.palabras_plato.append(propias)
+            pares.update((w, d) for w in propias)
+        ordenados = sorted(pares)
+        self.claves = [w for w, _ in ordenados]
+        self.platos = [d for _, d in ordenados]
+        self._ultima: Tuple[str, List[int]] = ('', list(range(self.n_platos)))
+
+    def con_prefijo(self, prefijo: str) -> set:
+        """Platos con alguna palabra que empieza por `prefijo` (ya normalizado)."""
+        i = bisect_left(self.claves, prefijo)
+        j = bisect_left(self.claves, prefijo + '\U0010ffff', i)
+        return set(self.platos[i:j])
+
+    def buscar(self, consulta: str) -> List[int]:
+        """Índices (en orden de catálogo) de los platos que casan con todas las palabras de `consulta`."""
+        normalizada = normalizar_texto(consulta).strip()
+        terminos = palabras(normalizada)
+        if not terminos:
+            resultado = list(range(self.n_platos))
+        else:
+            anterior, previos = self._ultima
+            if anterior and normalizada.startswith(anterior):
+                # La consulta solo se ha alargado: las palabras anteriores
+                # salvo la última siguen igual; basta filtrar por las demás
+                resultado = previos
+                for t in terminos[max(0, len(palabras(anterior)) - 1):]:
+                    if not resultado:
+                        break
+                    encontrados = self.con_prefijo(t)
+                    resultado = [d for d in resultado if d in encontrados]
+            else:
+                candidatos = None
+                for t in sorted(terminos, key=len, reverse=True):
+                    encontrados = self.con_prefijo(t)
+                    candidatos = encontrados if candidatos is None else candidatos & encontrados
+                    if not candidatos:
+                        break
+                resultado = sorted(candidatos)
+        self._ultima = (normalizada, resultado)
+        return resultado
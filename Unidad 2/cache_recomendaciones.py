@@ -0,0 +1,104 @@
+"""
+Caché LRU de recomendaciones indexada por la huella del perfil.
+
+La clave de cada entrada es `(huella_perfil(usuario), modelo.version, motor,
+top_k)`: la huella es un hash estable de los campos del perfil que usa el
+recomendador (ya normalizados), y `modelo.version` cambia con cada
+actualización de disponibilidad, así que un cambio de perfil o de stock
+nunca devuelve una entrada obsoleta. Las entradas viejas se descartan por LRU
+o explícitamente con `invalidar_usuario`.
+"""
+
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Hashable
+import hashlib
+import json
+import threading
+
+from recomendador import RecommenderModel, _normalizar_perfil
+
+
+CAPACIDAD_POR_DEFECTO = 256
+
+
+def huella_perfil(usuario: Dict[str, Any]) -> str:
+    """Hash estable (SHA-1 hex) del perfil normalizado.
+
+    Dos perfiles que el recomendador trata igual (mismo contenido, distinto
+    orden o mayúsculas en los ingredientes) producen la misma huella. Los
+    valores se comparan con su tipo (`repr`): `_normalizar_perfil` conserva
+    los ids de `platos_no_gustan` tal cual, y `1` y `'1'` no vetan el mismo plato.
+    """
+    perfil = _normalizar_perfil(usuario)
+    canonico = {campo: sorted(repr(x) for x in valores) for campo, valores in perfil.items()}
+    texto = json.dumps(canonico, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(texto.encode('utf-8')).hexdigest()
+
+
+class CacheRecomendaciones:
+    """Envoltorio con caché LRU acotada sobre `RecommenderModel.recommend`.
+
+    Las listas devueltas se comparten entre llamadas con la misma clave: no
+    deben modificarse. Puede usarse desde varios hilos (p. ej. la GUI calcula
+    en un hilo de fondo e invalida desde el hilo de Tk): un candado protege
+    las entradas, pero no se mantiene durante el cálculo.
+    """
+
+    def __init__(self, modelo: RecommenderModel, capacidad: int = CAPACIDAD_POR_DEFECTO):
+        self.modelo = modelo
+        self.capacidad = capacidad
+        self.aciertos = 0
+        self.fallos = 0
+        self._entradas: 'OrderedDict[Hashable, list]' = OrderedDict()
+        self._clave_usuario: Dict[str, Hashable] = {}
+        self._candado = threading.Lock()
+
+    def recomendar(self, usuario: Dict[str, Any], uid: Optional[str] = None, motor: str = 'numpy', top_k: Optional[int] = None) -> list:
+        """Recomendaciones de `usuario`, desde la caché si ya se calcularon.
+
+        `uid` es opcional; si se indica, permite invalidar después la entrada
+        del usuario con `invalidar_usuario(uid)`.
+        """
+        clave = (huella_perfil(usuario), self.modelo.version, motor, top_k)
+        with self._candado:
+            if uid is not None:
+                self._clave_usuario[uid] = clave
+            recs = self._entradas.get(clave)
+            if recs is not None:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return recs
+            self.fallos += 1
+        recs = self.modelo.recommend(usuario, motor=motor, top_k=top_k)
+        with self._candado:
+            self._entradas[clave] = recs
+            if len(self._entradas) > self.capacidad:
+                self._entradas.popitem(last=False)
+        return recs
+
+    def invalidar_usuario(self, uid: str) -> None:
+        """Descarta la última entrada calculada para `uid` (tras editar su perfil)."""
+        with self._candado:
+            clave = self._clave_usuario.pop(uid, None)
+            if clave is not None:
+                self._entradas.pop(clave, None)
+
+    def limpiar(self) -> None:
+        """Vacía la caché (los contadores se conservan)."""
+        with self._candado:
+            self._entradas.clear()
+            self._clave_usuario.clear()
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Tamaño, capacidad, aciertos, fallos y tasa de aciertos."""
+        consultas = self.aciertos + self.fallos
+        return {
+            'entradas': len(self._entradas),
+            'capacidad': self.capacidad,
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'tasa_aciertos': (self.aciertos / consultas) if consultas else 0.0,
+        }
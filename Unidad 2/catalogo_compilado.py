@@ -0,0 +1,320 @@
+"""
+Formato binario compacto del catálogo compilado.
+
+`RecommenderModel` compila el catálogo en cada arranque: parsea
+`platillos.json`, interna los ingredientes, construye la matriz de
+incidencia y la similitud Jaccard entre platos. Con catálogos grandes y
+varios procesos trabajadores eso se repite (y se duplica en memoria) en cada
+proceso. Este módulo guarda el resultado de esa compilación en un único
+archivo que se abre con `numpy.memmap`: las páginas del archivo las comparte
+el sistema operativo entre todos los procesos que lo abren, en solo lectura.
+
+Contenido del archivo (todos los arreglos alineados a 64 bytes):
+
+  - cabecera JSON: ids de platos, tabla de ingredientes internados (en
+    minúsculas, ordenada) y la posición/dtype/forma de cada arreglo.
+  - `platos_offsets`, `platos_datos`: los platos originales (para las
+    respuestas), cada uno como JSON en `platos_datos[offsets[d]:offsets[d+1]]`;
+    se decodifican al pedir cada plato, no al abrir el archivo.
+  - `indptr`, `indices`: ingredientes de cada plato en formato CSR
+    (`indices[indptr[d]:indptr[d+1]]`, ids ordenados).
+  - `indptr_t`, `indices_t`: índice invertido ingrediente -> platos (CSC).
+  - `disponibles`: máscara de bits (`np.packbits`) de ingredientes disponibles.
+  - `sim_indptr`, `sim_indices`, `sim_valores`: similitud Jaccard
+    plato×plato (opcional, acotada: ver `similitud_platos`; `sim_top_k` en
+    la cabecera si las filas están recortadas a los k vecinos).
+  - `incidencia`: matriz densa plato×ingrediente en float64 (opcional, crece
+    como platos×ingredientes; solo la usa `recomendar_lote`, que sin ella la
+    reconstruye desde el CSR al primer uso).
+
+Al cargar (`RecommenderModel.desde_catalogo`) nada de esto se convierte a
+objetos de Python por adelantado: los arreglos quedan como memmaps y las
+vistas por plato/ingrediente (`FilasCSR`, `ConjuntosCSR`, `BitsCSR`,
+`PlatosSerializados`) materializan cada fila al pedirla.
+
+Construcción y consulta desde consola:
+
+    python catalogo_compilado.py construir --salida data/catalogo.bin [--densa] [--similitudes]
+    python catalogo_compilado.py info data/catalogo.bin
+
+Para usarlo: `RecommenderModel.desde_catalogo('data/catalogo.bin')`.
+"""
+
+from typing import List, Dict, Any, Optional, Sequence, Iterator, Tuple
+from pathlib import Path
+import argparse
+import json
+import os
+import struct
+import threading
+
+import numpy as np
+
+
+MAGIA = b'RECCAT01'
+VERSION_FORMATO = 1
+ALINEACION = 64
+
+# Rutas por defecto (mismas que el CLI)
+DATA_DIR = Path(__file__).parent / 'data'
+RUTA_POR_DEFECTO = DATA_DIR / 'catalogo.bin'
+
+
+def _alinear(n: int) -> int:
+    return (n + ALINEACION - 1) // ALINEACION * ALINEACION
+
+
+def _csr(filas: Sequence[Sequence[int]]) -> Tuple[np.ndarray, np.ndarray]:
+    """(indptr, indices) de una lista de filas de enteros."""
+    indptr = np.zeros(len(filas) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(f) for f in filas])
+    indices = np.fromiter((j for f in filas for j in f), dtype=np.int32, count=int(indptr[-1]))
+    return indptr, indices
+
+
+def escribir_catalogo(modelo, destino: str, incluir_densa: bool = False, incluir_similitudes: bool = False, top_k_similitudes: Optional[int] = None) -> None:
+    """Serializa un `RecommenderModel` ya compilado en `destino` (escritura atómica)."""
+    arreglos: Dict[str, np.ndarray] = {}
+    platos = [json.dumps(plato, ensure_ascii=False, separators=(',', ':')).encode('utf-8') for plato in modelo.platillos]
+    arreglos['platos_offsets'] = np.zeros(len(platos) + 1, dtype=np.int64)
+    arreglos['platos_offsets'][1:] = np.cumsum([len(p) for p in platos])
+    arreglos['platos_datos'] = np.frombuffer(b''.join(platos), dtype=np.uint8)
+    arreglos['indptr'], arreglos['indices'] = _csr(modelo.ingredientes_plato)
+    arreglos['indptr_t'], arreglos['indices_t'] = _csr([sorted(platos) for platos in modelo.platos_por_ingrediente])
+    disponibles = np.array([bool(modelo.disponibilidad_ingredientes.get(ing, True)) for ing in modelo.ingredientes], dtype=bool)
+    arreglos['disponibles'] = np.packbits(disponibles)
+    if incluir_similitudes:
+        filas = modelo.compilar_similitudes(top_k=top_k_similitudes)
+        ordenadas = [sorted(fila.items()) for fila in filas]
+        arreglos['sim_indptr'], arreglos['sim_indices'] = _csr([[e for e, _ in fila] for fila in ordenadas])
+        arreglos['sim_valores'] = np.fromiter((s for fila in ordenadas for _, s in fila), dtype=np.float64, count=int(arreglos['sim_indptr'][-1]))
+    if incluir_densa:
+        arreglos['incidencia'] = np.ascontiguousarray(modelo.incidencia, dtype=np.float64)
+
+    descriptor = {}
+    posicion = 0
+    for nombre, arr in arreglos.items():
+        descriptor[nombre] = {'dtype': arr.dtype.str, 'forma': list(arr.shape), 'offset': posicion}
+        posicion = _alinear(posicion + arr.nbytes)
+    cabecera = json.dumps({
+        'version_formato': VERSION_FORMATO,
+        'n_platos': len(modelo.ids_platos),
+        'ids_platos': list(modelo.ids_platos),
+        'ingredientes': list(modelo.ingredientes),
+        'sim_top_k': top_k_similitudes if incluir_similitudes else None,
+        'arreglos': descriptor,
+    }, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    inicio_datos = _alinear(len(MAGIA) + 8 + len(cabecera))
+
+    tmp = f'{destino}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(MAGIA)
+        f.write(struct.pack('<Q', len(cabecera)))
+        f.write(cabecera)
+        for nombre, arr in arreglos.items():
+            f.seek(inicio_datos + descriptor[nombre]['offset'])
+            f.write(arr.tobytes())
+        f.truncate(inicio_datos + posicion)
+    os.replace(tmp, destino)
+
+
+def construir_catalogo(platillos: List[Dict[str, Any]], disponibilidad: Optional[Dict[str, bool]], destino: str, incluir_densa: bool = False, incluir_similitudes: bool = False, top_k_similitudes: Optional[int] = None) -> None:
+    """Compila `platillos` + `disponibilidad` y escribe el catálogo binario en `destino`."""
+    from recomendador import RecommenderModel
+    modelo = RecommenderModel(platillos, disponibilidad)
+    escribir_catalogo(modelo, destino, incluir_densa=incluir_densa, incluir_similitudes=incluir_similitudes, top_k_similitudes=top_k_similitudes)
+
+
+class FilasCSR:
+    """Filas de una matriz CSR de patrón (sin valores) como tuplas de enteros, al pedirlas."""
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray):
+        self.indptr = indptr
+        self.indices = indices
+
+    def __len__(self) -> int:
+        return len(self.indptr) - 1
+
+    def __getitem__(self, d: int) -> Tuple[int, ...]:
+        return tuple(self.indices[int(self.indptr[d]):int(self.indptr[d + 1])].tolist())
+
+    def __iter__(self) -> Iterator[Tuple[int, ...]]:
+        for d in range(len(self)):
+            yield self[d]
+
+
+class ConjuntosCSR(FilasCSR):
+    """Como `FilasCSR`, pero cada fila es un conjunto (índice invertido ingrediente -> platos)."""
+
+    def __getitem__(self, i: int) -> set:
+        return set(self.indices[int(self.indptr[i]):int(self.indptr[i + 1])].tolist())
+
+
+class BitsCSR(FilasCSR):
+    """Bitset (int) de cada fila, calculado la primera vez que se pide y guardado.
+
+    Puede compartirse entre hilos: el bitset se calcula fuera del candado y
+    se guarda bajo él, de modo que todos ven el mismo objeto.
+    """
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray):
+        super().__init__(indptr, indices)
+        self._bits: Dict[int, int] = {}
+        self._candado = threading.Lock()
+
+    def __getitem__(self, d: int) -> int:
+        bits = self._bits.get(d)
+        if bits is None:
+            bits = 0
+            for i in self.indices[int(self.indptr[d]):int(self.indptr[d + 1])].tolist():
+                bits |= 1 << i
+            with self._candado:
+                bits = self._bits.setdefault(d, bits)
+        return bits
+
+
+class PlatosSerializados:
+    """Secuencia de platos (dicts) decodificados de su JSON al pedirlos (y guardados).
+
+    Como `BitsCSR`, segura entre hilos: un plato se decodifica a lo sumo una
+    vez por hilo y todos reciben el mismo dict.
+    """
+
+    def __init__(self, offsets: np.ndarray, datos: np.ndarray):
+        self.offsets = offsets
+        self.datos = datos
+        self._platos: List[Optional[Dict[str, Any]]] = [None] * (len(offsets) - 1)
+        self._candado = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._platos)
+
+    def __getitem__(self, d: int) -> Dict[str, Any]:
+        plato = self._platos[d]
+        if plato is None:
+            plato = json.loads(self.datos[int(self.offsets[d]):int(self.offsets[d + 1])].tobytes().decode('utf-8'))
+            with self._candado:
+                if self._platos[d] is None:
+                    self._platos[d] = plato
+                plato = self._platos[d]
+        return plato
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for d in range(len(self)):
+            yield self[d]
+
+
+class FilasDispersas:
+    """Vista de solo lectura de una matriz CSR como secuencia de filas `{columna: valor}`.
+
+    Se comporta como la lista de dicts de `similitudes_jaccard`, pero cada
+    fila se materializa al pedirla, así que los arreglos pueden ser memmaps
+    compartidos entre procesos.
+    """
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, valores: np.ndarray):
+        self.indptr = indptr
+        self.indices = indices
+        self.valores = valores
+
+    def __len__(self) -> int:
+        return len(self.indptr) - 1
+
+    def __getitem__(self, d: int) -> Dict[int, float]:
+        a, b = int(self.indptr[d]), int(self.indptr[d + 1])
+        return dict(zip(self.indices[a:b].tolist(), self.valores[a:b].tolist()))
+
+    def __iter__(self) -> Iterator[Dict[int, float]]:
+        for d in range(len(self)):
+            yield self[d]
+
+
+class CatalogoCompilado:
+    """Catálogo binario abierto en solo lectura (arreglos mapeados en memoria)."""
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        with open(self.path, 'rb') as f:
+            if f.read(len(MAGIA)) != MAGIA:
+                raise ValueError(f'{self.path} no es un catálogo compilado')
+            (n_cabecera,) = struct.unpack('<Q', f.read(8))
+            cabecera = json.loads(f.read(n_cabecera).decode('utf-8'))
+        if cabecera.get('version_formato') != VERSION_FORMATO:
+            raise ValueError(f"Versión de catálogo no soportada: {cabecera.get('version_formato')}")
+        inicio_datos = _alinear(len(MAGIA) + 8 + n_cabecera)
+        self.ids_platos = tuple(cabecera['ids_platos'])
+        self.ingredientes: List[str] = cabecera['ingredientes']
+        self.similitudes_top_k: Optional[int] = cabecera.get('sim_top_k')
+        self.arreglos: Dict[str, np.ndarray] = {}
+        for nombre, desc in cabecera['arreglos'].items():
+            forma = tuple(desc['forma'])
+            dtype = np.dtype(desc['dtype'])
+            if int(np.prod(forma)) == 0:
+                # np.memmap no admite regiones vacías
+                self.arreglos[nombre] = np.empty(forma, dtype=dtype)
+            else:
+                self.arreglos[nombre] = np.memmap(self.path, dtype=dtype, mode='r', offset=inicio_datos + desc['offset'], shape=forma)
+        self.platillos: Sequence[Dict[str, Any]] = PlatosSerializados(self.platos_offsets, self.platos_datos)
+
+    def __getattr__(self, nombre: str) -> np.ndarray:
+        try:
+            return self.__dict__['arreglos'][nombre]
+        except KeyError:
+            raise AttributeError(nombre) from None
+
+    def tiene(self, nombre: str) -> bool:
+        return nombre in self.arreglos
+
+    def disponibilidad(self) -> Dict[str, bool]:
+        """Mapa ingrediente -> disponible, desde la máscara de bits."""
+        bits = np.unpackbits(self.disponibles, count=len(self.ingredientes)).astype(bool)
+        return dict(zip(self.ingredientes, bits.tolist()))
+
+    def incidencia_densa(self) -> np.ndarray:
+        """Matriz plato×ingrediente: el memmap si está en el archivo, si no se reconstruye del CSR."""
+        if self.tiene('incidencia'):
+            return self.incidencia
+        incidencia = np.zeros((len(self.ids_platos), len(self.ingredientes)), dtype=np.float64)
+        filas = np.repeat(np.arange(len(self.ids_platos)), np.diff(self.indptr))
+        incidencia[filas, self.indices] = 1.0
+        return incidencia
+
+    def similitudes(self) -> Optional[FilasDispersas]:
+        if not self.tiene('sim_indptr'):
+            return None
+        return FilasDispersas(self.sim_indptr, self.sim_indices, self.sim_valores)
+
+    def resumen(self) -> Dict[str, Any]:
+        return {
+            'platos': len(self.ids_platos),
+            'ingredientes': len(self.ingredientes),
+            'bytes_archivo': os.path.getsize(self.path),
+            'arreglos': {nombre: {'dtype': str(a.dtype), 'forma': list(a.shape), 'bytes': int(a.nbytes)} for nombre, a in self.arreglos.items()},
+        }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Catálogo binario compilado del recomendador')
+    sub = parser.add_subparsers(dest='comando', required=True)
+    p_construir = sub.add_parser('construir', help='Compilar platillos.json en un catálogo binario')
+    p_construir.add_argument('--platillos', default=str(DATA_DIR / 'platillos.json'))
+    p_construir.add_argument('--disponibilidad', default=str(DATA_DIR / 'ingredientes_disponibilidad.json'))
+    p_construir.add_argument('--salida', default=str(RUTA_POR_DEFECTO))
+    p_construir.add_argument('--densa', action='store_true', help='Guardar también la matriz de incidencia densa (platos×ingredientes; solo la usa el modo por lotes)')
+    p_construir.add_argument('--similitudes', action='store_true', help='Precalcular la similitud entre platos (casi densa con ingredientes populares)')
+    p_construir.add_argument('--top-k-similitudes', type=int, default=None, metavar='K', help='Guardar solo los K vecinos más parecidos de cada plato')
+    p_info = sub.add_parser('info', help='Mostrar el contenido de un catálogo binario')
+    p_info.add_argument('ruta', nargs='?', default=str(RUTA_POR_DEFECTO))
+    args = parser.parse_args()
+
+    if args.comando == 'construir':
+        with open(args.platillos, 'r', encoding='utf-8') as f:
+            platillos = json.load(f)
+        disponibilidad = None
+        if Path(args.disponibilidad).exists():
+            with open(args.disponibilidad, 'r', encoding='utf-8') as f:
+                disponibilidad = json.load(f)
+        construir_catalogo(platillos, disponibilidad, args.salida, incluir_densa=args.densa, incluir_similitudes=args.similitudes, top_k_similitudes=args.top_k_similitudes)
+        print(f'Catálogo escrito en {args.salida} ({os.path.getsize(args.salida)} bytes)')
+    elif args.comando == 'info':
+        print(json.dumps(CatalogoCompilado(args.ruta).resumen(), indent=2, ensure_ascii=False))
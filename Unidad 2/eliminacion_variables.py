@@ -0,0 +1,328 @@
+"""
+Inferencia exacta por eliminación de variables sobre redes bayesianas discretas.
+
+Motor propio (solo numpy) para las redes que construye el recomendador
+(`Plato -> Ingred__*`, más capas opcionales como cocina o categoría). A
+diferencia de `pgmpy.inference.VariableElimination`, que recalcula el orden
+de eliminación y todos los productos de factores en cada consulta, aquí se
+cachea entre consultas:
+
+  - el plan de cada forma de consulta (variables consultadas + conjunto de
+    variables observadas): las variables relevantes, que son los ancestros de
+    las consultadas y observadas (el resto son nodos estériles que suman 1 y
+    se podan), y el orden de eliminación (heurística greedy min-fill);
+  - los factores intermedios, identificados por su procedencia: una CPD
+    reducida con los valores observados de su ámbito, o el resultado de
+    eliminar una variable del producto de un conjunto de factores. Dos
+    consultas con evidencias distintas comparten todos los factores cuya
+    procedencia no toca las variables en que difieren.
+
+Los factores intermedios se reescalan por su máximo para evitar underflow
+con muchas observaciones; las constantes se cancelan al normalizar, así que
+las posteriores son exactas.
+
+`MotorEliminacion.verificar` repite la consulta con pgmpy (si está
+instalado) y devuelve la máxima diferencia, para validar el motor.
+
+Ejemplo:
+    red = RedDiscreta()
+    red.agregar_variable('Plato', ['p1', 'p2'], cpd=[0.5, 0.5])
+    red.agregar_variable('Ingred__tomate', ['absent', 'present'], padres=['Plato'],
+                         cpd=[[0.2, 0.8], [0.9, 0.1]])
+    motor = MotorEliminacion(red)
+    motor.consultar(['Plato'], {'Ingred__tomate': 'present'}).valores
+"""
+
+from typing import List, Dict, Any, Tuple, Optional, Sequence, Iterable, Callable, Hashable
+from collections import OrderedDict
+import threading
+
+import numpy as np
+
+
+# Factores intermedios y planes de consulta retenidos (LRU)
+CAPACIDAD_FACTORES = 1024
+CAPACIDAD_PLANES = 256
+
+
+class Factor:
+    """Tabla de valores no negativos con un eje por variable (en el orden de `variables`)."""
+
+    __slots__ = ('variables', 'valores')
+
+    def __init__(self, variables: Sequence[str], valores: np.ndarray):
+        self.variables: Tuple[str, ...] = tuple(variables)
+        self.valores = valores
+
+    def alineado(self, variables: Sequence[str]) -> np.ndarray:
+        """Valores transpuestos al orden de `variables` (superconjunto), con ejes de tamaño 1 donde falta."""
+        propias = [v for v in variables if v in self.variables]
+        valores = self.valores.transpose([self.variables.index(v) for v in propias])
+        return valores.reshape([valores.shape[propias.index(v)] if v in self.variables else 1 for v in variables])
+
+    def reducir(self, evidencia: Dict[str, int]) -> 'Factor':
+        """Fija las variables observadas de su ámbito (índice de estado) y las quita del factor."""
+        indice = tuple(evidencia.get(v, slice(None)) for v in self.variables)
+        return Factor([v for v in self.variables if v not in evidencia], self.valores[indice])
+
+    def sumar(self, variable: str) -> 'Factor':
+        eje = self.variables.index(variable)
+        return Factor(self.variables[:eje] + self.variables[eje + 1:], self.valores.sum(axis=eje))
+
+    def normalizado(self) -> 'Factor':
+        total = self.valores.sum()
+        if total <= 0:
+            raise ValueError('La evidencia tiene probabilidad cero')
+        return Factor(self.variables, self.valores / total)
+
+    def __repr__(self) -> str:
+        return f'Factor({self.variables}, forma={self.valores.shape})'
+
+
+def producto(factores: Sequence[Factor]) -> Factor:
+    """Producto de `factores` sobre la unión de sus variables, reescalado a máximo 1."""
+    variables: List[str] = []
+    for f in factores:
+        variables.extend(v for v in f.variables if v not in variables)
+    resultado = None
+    for f in factores:
+        valores = f.alineado(variables)
+        resultado = valores.copy() if resultado is None else np.multiply(resultado, valores)
+        maximo = resultado.max() if resultado.size else 0.0
+        if maximo > 0:
+            resultado /= maximo
+    # Los ejes de tamaño 1 de la alineación se expanden al multiplicar
+    return Factor(variables, np.ones(()) if resultado is None else resultado)
+
+
+class RedDiscreta:
+    """Red bayesiana discreta: estados, padres y CPD de cada variable.
+
+    La CPD de una variable con padres `(A, B)` es un arreglo de forma
+    `(|A|, |B|, |variable|)` con `P(variable | A, B)` (cada fila suma 1);
+    sin padres es el vector de su distribución a priori.
+    """
+
+    def __init__(self):
+        self.estados: Dict[str, List[str]] = {}
+        self.padres: Dict[str, Tuple[str, ...]] = {}
+        self.cpds: Dict[str, np.ndarray] = {}
+        self.indice_estado: Dict[str, Dict[str, int]] = {}
+
+    def agregar_variable(self, variable: str, estados: Sequence[Any], padres: Sequence[str] = (), cpd: Any = None) -> None:
+        """Añade `variable` (sus padres deben existir ya, así el orden es topológico)."""
+        if variable in self.estados:
+            raise ValueError(f'Variable duplicada: {variable}')
+        for padre in padres:
+            if padre not in self.estados:
+                raise ValueError(f'El padre {padre!r} de {variable!r} no está en la red')
+        estados = [str(e) for e in estados]
+        forma = tuple(len(self.estados[p]) for p in padres) + (len(estados),)
+        valores = np.full(forma, 1.0 / len(estados)) if cpd is None else np.asarray(cpd, dtype=np.float64)
+        if valores.shape != forma:
+            raise ValueError(f'CPD de {variable!r} con forma {valores.shape}; se esperaba {forma}')
+        self.estados[variable] = estados
+        self.padres[variable] = tuple(padres)
+        self.cpds[variable] = valores
+        self.indice_estado[variable] = {e: i for i, e in enumerate(estados)}
+
+    def validar(self, tolerancia: float = 1e-6) -> None:
+        """Comprueba que cada CPD es no negativa y que cada fila suma 1."""
+        for variable, cpd in self.cpds.items():
+            if (cpd < 0).any() or not np.allclose(cpd.sum(axis=-1), 1.0, atol=tolerancia):
+                raise ValueError(f'La CPD de {variable!r} no es una distribución condicional válida')
+
+    def factor(self, variable: str) -> Factor:
+        return Factor(self.padres[variable] + (variable,), self.cpds[variable])
+
+    def ancestros(self, variables: Iterable[str]) -> set:
+        """`variables` y todos sus ancestros."""
+        pendientes = list(variables)
+        vistos = set(pendientes)
+        while pendientes:
+            for padre in self.padres[pendientes.pop()]:
+                if padre not in vistos:
+                    vistos.add(padre)
+                    pendientes.append(padre)
+        return vistos
+
+    def a_pgmpy(self):
+        """La misma red como `DiscreteBayesianNetwork` de pgmpy (para verificación)."""
+        from pgmpy.models import DiscreteBayesianNetwork
+        from pgmpy.factors.discrete import TabularCPD
+
+        modelo = DiscreteBayesianNetwork()
+        modelo.add_nodes_from(self.estados)
+        modelo.add_edges_from((p, v) for v, padres in self.padres.items() for p in padres)
+        for variable, cpd in self.cpds.items():
+            padres = list(self.padres[variable])
+            # pgmpy: filas = estados de la variable, columnas = combinaciones de padres
+            valores = np.moveaxis(cpd, -1, 0).reshape(len(self.estados[variable]), -1)
+            modelo.add_cpds(TabularCPD(
+                variable=variable, variable_card=len(self.estados[variable]), values=valores,
+                evidence=padres or None, evidence_card=[len(self.estados[p]) for p in padres] or None,
+                state_names={v: self.estados[v] for v in [variable] + padres},
+            ))
+        return modelo
+
+
+class _Plan:
+    """Plan compilado de una forma de consulta."""
+
+    __slots__ = ('factores', 'orden')
+
+    def __init__(self, factores: Tuple[str, ...], orden: Tuple[str, ...]):
+        # Variables cuya CPD interviene y orden en que se eliminan las ocultas
+        self.factores = factores
+        self.orden = orden
+
+
+def orden_min_fill(ambitos: List[set], eliminar: Iterable[str]) -> List[str]:
+    """Orden de eliminación greedy: en cada paso la variable que añade menos aristas al grafo."""
+    vecinos: Dict[str, set] = {}
+    for ambito in ambitos:
+        for v in ambito:
+            vecinos.setdefault(v, set()).update(ambito - {v})
+    pendientes = set(eliminar)
+    orden = []
+    while pendientes:
+        def relleno(v):
+            n = list(vecinos.get(v, ()))
+            return sum(1 for i, a in enumerate(n) for b in n[i + 1:] if b not in vecinos[a]), len(n), v
+        v = min(pendientes, key=relleno)
+        n = vecinos.pop(v, set())
+        for a in n:
+            vecinos[a].discard(v)
+            vecinos[a].update(n - {a})
+        pendientes.discard(v)
+        orden.append(v)
+    return orden
+
+
+class MotorEliminacion:
+    """Eliminación de variables con planes y factores intermedios cacheados entre consultas.
+
+    Las cachés LRU y los contadores se comparten: las consultas desde varios
+    hilos se serializan con `_candado`.
+    """
+
+    def __init__(self, red: RedDiscreta, capacidad_factores: int = CAPACIDAD_FACTORES, capacidad_planes: int = CAPACIDAD_PLANES):
+        self.red = red
+        self.capacidad_factores = capacidad_factores
+        self.capacidad_planes = capacidad_planes
+        self._planes: 'OrderedDict[Hashable, _Plan]' = OrderedDict()
+        self._factores: 'OrderedDict[Hashable, Factor]' = OrderedDict()
+        self.contadores = {'consultas': 0, 'planes_compilados': 0, 'factores_calculados': 0, 'factores_reutilizados': 0}
+        self._candado = threading.RLock()
+
+    def plan(self, variables: Sequence[str], observadas: Iterable[str]) -> _Plan:
+        """Plan (cacheado) para consultar `variables` observando `observadas`."""
+        with self._candado:
+            return self._plan(variables, observadas)
+
+    def _plan(self, variables: Sequence[str], observadas: Iterable[str]) -> _Plan:
+        clave = (tuple(variables), frozenset(observadas))
+        plan = self._planes.get(clave)
+        if plan is not None:
+            self._planes.move_to_end(clave)
+            return plan
+        consultadas, observadas = set(clave[0]), clave[1]
+        # Los nodos que no son ancestros de consultadas u observadas son estériles
+        relevantes = self.red.ancestros(consultadas | observadas)
+        factores = tuple(v for v in self.red.estados if v in relevantes)
+        ambitos = [set(self.red.padres[v] + (v,)) - observadas for v in factores]
+        orden = tuple(orden_min_fill(ambitos, relevantes - consultadas - observadas))
+        plan = self._planes[clave] = _Plan(factores, orden)
+        self.contadores['planes_compilados'] += 1
+        if len(self._planes) > self.capacidad_planes:
+            self._planes.popitem(last=False)
+        return plan
+
+    def _factor(self, clave: Hashable, calcular: Callable[[], Factor]) -> Factor:
+        factor = self._factores.get(clave)
+        if factor is not None:
+            self._factores.move_to_end(clave)
+            self.contadores['factores_reutilizados'] += 1
+            return factor
+        factor = self._factores[clave] = calcular()
+        self.contadores['factores_calculados'] += 1
+        if len(self._factores) > self.capacidad_factores:
+            self._factores.popitem(last=False)
+        return factor
+
+    def _indices_evidencia(self, evidencia: Dict[str, Any]) -> Dict[str, int]:
+        indices = {}
+        for variable, estado in evidencia.items():
+            if variable not in self.red.estados:
+                raise KeyError(f'Variable desconocida en la evidencia: {variable!r}')
+            try:
+                indices[variable] = self.red.indice_estado[variable][str(estado)]
+            except KeyError:
+                raise ValueError(f'Estado {estado!r} no válido para {variable!r}') from None
+        return indices
+
+    def consultar(self, variables: Sequence[str], evidencia: Optional[Dict[str, Any]] = None) -> Factor:
+        """Distribución conjunta de `variables` dada `evidencia` ({variable: estado}).
+
+        El factor devuelto (ejes en el orden de `variables`, estados en el
+        orden de `red.estados`) puede estar cacheado: no debe modificarse.
+        """
+        with self._candado:
+            return self._consultar(variables, evidencia)
+
+    def _consultar(self, variables: Sequence[str], evidencia: Optional[Dict[str, Any]]) -> Factor:
+        self.contadores['consultas'] += 1
+        evidencia = self._indices_evidencia(evidencia or {})
+        if any(v in evidencia for v in variables):
+            raise ValueError('Una variable consultada no puede estar en la evidencia')
+        plan = self._plan(variables, evidencia)
+
+        trabajo: List[Tuple[Hashable, Factor]] = []
+        for v in plan.factores:
+            fijadas = tuple((x, evidencia[x]) for x in self.red.padres[v] + (v,) if x in evidencia)
+            clave = ('cpd', v, fijadas)
+            trabajo.append((clave, self._factor(clave, lambda v=v, fijadas=fijadas: self.red.factor(v).reducir(dict(fijadas)))))
+
+        for x in plan.orden:
+            usan = [(c, f) for c, f in trabajo if x in f.variables]
+            trabajo = [(c, f) for c, f in trabajo if x not in f.variables]
+            clave = ('suma', x, frozenset(c for c, _ in usan))
+            trabajo.append((clave, self._factor(clave, lambda usan=usan, x=x: producto([f for _, f in usan]).sumar(x))))
+
+        clave = ('posterior', tuple(variables), frozenset(c for c, _ in trabajo))
+        return self._factor(clave, lambda: self._posterior(variables, [f for _, f in trabajo]))
+
+    @staticmethod
+    def _posterior(variables: Sequence[str], factores: List[Factor]) -> Factor:
+        conjunto = producto(factores).normalizado()
+        return Factor(variables, conjunto.alineado(variables).copy())
+
+    def distribucion(self, variable: str, evidencia: Optional[Dict[str, Any]] = None) -> Dict[str, float]:
+        """P(variable | evidencia) como {estado: probabilidad}."""
+        valores = self.consultar([variable], evidencia).valores
+        return dict(zip(self.red.estados[variable], valores.tolist()))
+
+    def vaciar_cache(self) -> None:
+        with self._candado:
+            self._planes.clear()
+            self._factores.clear()
+
+    def verificar(self, variables: Sequence[str], evidencia: Optional[Dict[str, Any]] = None, inferencia_pgmpy=None) -> float:
+        """Máxima diferencia absoluta entre esta consulta y la de pgmpy `VariableElimination`.
+
+        `inferencia_pgmpy` permite reutilizar un `VariableElimination` ya
+        construido sobre `red.a_pgmpy()`.
+        """
+        if inferencia_pgmpy is None:
+            from pgmpy.inference import VariableElimination
+            inferencia_pgmpy = VariableElimination(self.red.a_pgmpy())
+        evidencia = {v: str(e) for v, e in (evidencia or {}).items()}
+        propio = self.consultar(variables, evidencia)
+        referencia = inferencia_pgmpy.query(variables=list(variables), evidence=evidencia, joint=True, show_progress=False)
+        # Reordenar ejes y estados de pgmpy a los de este motor
+        ejes = [referencia.variables.index(v) for v in variables]
+        valores = np.transpose(referencia.values, ejes)
+        for eje, v in enumerate(variables):
+            orden = [referencia.state_names[v].index(e) for e in self.red.estados[v]]
+            valores = np.take(valores, orden, axis=eje)
+        return float(np.abs(valores - propio.valores).max())
@@ -4,10 +4,37 @@ de triples en formato JSON.
 
 Este módulo agrupa I/O ligero usado por la GUI y el CLI. No contiene
 ninguna lógica de inferencia, solo funciones para persistencia y normalización.
+
+`AlmacenTriples` es un almacén de triples en memoria con índices SPO, POS y
+OSP: pertenencia O(1), consultas por patrón (`consultar(s=..., o=...)`) e
+inserción en bloque. Persistido en JSON Lines (`.jsonl`), cada inserción
+añade una línea al final del archivo en lugar de reescribirlo entero.
+
+`DiarioRed` es el modo de persistencia con diario (write-ahead log) para la
+red semántica: cada cambio de usuario o triple se añade como una línea a
+`<red>.log` y periódicamente se compacta en la instantánea `<red>.json`.
+`cargar_red_simplificada` reproduce instantánea + diario si este existe.
+
+Para redes grandes, `iterar_usuarios_red` recorre los usuarios en streaming
+(memoria constante, sin cargar el JSON entero) e `IndiceRed` busca un
+usuario por id leyendo solo sus bytes, gracias a un índice binario de
+desplazamientos ordenado por uid guardado junto a la red (`<red>.json.idx`).
 """
 
+import codecs
 import json
-from typing import List, Dict, Any
+import mmap
+import os
+import struct
+import threading
+from contextlib import contextmanager
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple, Hashable, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 
 def cargar_triples(path: str) -> List[Dict[str, Any]]:
@@ -33,16 +60,234 @@ def existe_triple(triples: List[Dict[str, Any]], s: str, p: str, o: Any) -> bool
     return False
 
 
+def _clave_objeto(o: Any) -> Hashable:
+    """Clave hashable para el objeto de un triple (listas/dicts se serializan)."""
+    try:
+        hash(o)
+        return o
+    except TypeError:
+        return json.dumps(o, sort_keys=True, ensure_ascii=False)
+
+
+class AlmacenTriples:
+    """Triples (s, p, o) indexados en memoria.
+
+    Índices (diccionarios anidados de conjuntos):
+      - spo: s -> p -> {o}
+      - pos: p -> o -> {s}
+      - osp: o -> s -> {p}
+    Cualquier patrón con alguna posición fija se resuelve desde el índice que
+    empieza por ella, sin recorrer todos los triples. Los objetos no
+    hashables (listas, dicts) se indexan por su serialización JSON.
+
+    Si se crea con `path` terminado en `.jsonl`, cada inserción se añade al
+    final del archivo (una línea por triple). Con cualquier otra extensión se
+    usa el formato JSON de lista de `guardar_triples` y hay que llamar a
+    `guardar()` para persistir.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._objetos: Dict[Hashable, Any] = {}
+        self._triples: set = set()
+        self.spo: Dict[str, Dict[str, set]] = {}
+        self.pos: Dict[str, Dict[Hashable, set]] = {}
+        self.osp: Dict[Hashable, Dict[str, set]] = {}
+
+    @classmethod
+    def cargar(cls, path: str) -> 'AlmacenTriples':
+        """Carga un almacén desde `path` (JSON Lines o lista JSON); vacío si no existe."""
+        almacen = cls(path)
+        if os.path.exists(path):
+            if almacen._es_jsonl():
+                with open(path, 'r', encoding='utf-8') as f:
+                    almacen._indexar_varios(json.loads(linea) for linea in f if linea.strip())
+            else:
+                almacen._indexar_varios(cargar_triples(path))
+        return almacen
+
+    def _es_jsonl(self) -> bool:
+        return bool(self.path) and str(self.path).endswith('.jsonl')
+
+    def _indexar(self, s: str, p: str, o: Any) -> bool:
+        ko = _clave_objeto(o)
+        clave = (s, p, ko)
+        if clave in self._triples:
+            return False
+        self._triples.add(clave)
+        self._objetos.setdefault(ko, o)
+        self.spo.setdefault(s, {}).setdefault(p, set()).add(ko)
+        self.pos.setdefault(p, {}).setdefault(ko, set()).add(s)
+        self.osp.setdefault(ko, {}).setdefault(s, set()).add(p)
+        return True
+
+    def _indexar_varios(self, triples: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        nuevos = []
+        for t in triples:
+            if self._indexar(t.get('s'), t.get('p'), t.get('o')):
+                nuevos.append({'s': t.get('s'), 'p': t.get('p'), 'o': t.get('o')})
+        return nuevos
+
+    def _anexar(self, triples: List[Dict[str, Any]]) -> None:
+        """Persiste `triples` al final del archivo JSON Lines (si lo hay)."""
+        if not triples or not self._es_jsonl():
+            return
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(''.join(json.dumps(t, ensure_ascii=False) + '\n' for t in triples))
+
+    def existe(self, s: str, p: str, o: Any) -> bool:
+        return (s, p, _clave_objeto(o)) in self._triples
+
+    def __contains__(self, triple: Tuple[str, str, Any]) -> bool:
+        return self.existe(*triple)
+
+    def __len__(self) -> int:
+        return len(self._triples)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return self.consultar()
+
+    def añadir(self, s: str, p: str, o: Any) -> bool:
+        """Añade el triple si no existía. Devuelve True si se añadió."""
+        if not self._indexar(s, p, o):
+            return False
+        self._anexar([{'s': s, 'p': p, 'o': o}])
+        return True
+
+    def añadir_varios(self, triples: Iterable[Dict[str, Any]]) -> int:
+        """Inserción en bloque (dicts con 's', 'p', 'o'); una sola escritura. Devuelve cuántos eran nuevos."""
+        nuevos = self._indexar_varios(triples)
+        self._anexar(nuevos)
+        return len(nuevos)
+
+    def eliminar(self, s: str, p: str, o: Any) -> bool:
+        """Quita el triple de los índices. Devuelve True si existía.
+
+        En modo JSON Lines el borrado no se refleja en disco hasta `guardar()`.
+        """
+        ko = _clave_objeto(o)
+        if (s, p, ko) not in self._triples:
+            return False
+        self._triples.discard((s, p, ko))
+        for indice, a, b, c in ((self.spo, s, p, ko), (self.pos, p, ko, s), (self.osp, ko, s, p)):
+            nivel = indice[a]
+            nivel[b].discard(c)
+            if not nivel[b]:
+                del nivel[b]
+            if not nivel:
+                del indice[a]
+        if ko not in self.osp:
+            self._objetos.pop(ko, None)
+        return True
+
+    def consultar(self, s: Optional[str] = None, p: Optional[str] = None, o: Any = None) -> Iterator[Dict[str, Any]]:
+        """Triples que encajan con el patrón; `None` es comodín (p. ej. `(s, ?, ?)` o `(?, p, o)`)."""
+        ko = _clave_objeto(o) if o is not None else None
+        if s is not None and p is not None and o is not None:
+            claves = [(s, p, ko)] if (s, p, ko) in self._triples else []
+        elif s is not None and p is not None:
+            claves = ((s, p, x) for x in self.spo.get(s, {}).get(p, ()))
+        elif p is not None and o is not None:
+            claves = ((x, p, ko) for x in self.pos.get(p, {}).get(ko, ()))
+        elif s is not None and o is not None:
+            claves = ((s, x, ko) for x in self.osp.get(ko, {}).get(s, ()))
+        elif s is not None:
+            claves = ((s, pp, x) for pp, os_ in self.spo.get(s, {}).items() for x in os_)
+        elif p is not None:
+            claves = ((x, p, oo) for oo, ss in self.pos.get(p, {}).items() for x in ss)
+        elif o is not None:
+            claves = ((x, pp, ko) for x, ps in self.osp.get(ko, {}).items() for pp in ps)
+        else:
+            claves = iter(self._triples)
+        for ts, tp, to in claves:
+            yield {'s': ts, 'p': tp, 'o': self._objetos[to]}
+
+    def guardar(self, path: Optional[str] = None) -> None:
+        """Escribe el almacén completo en `path` (o en el suyo) según su extensión.
+
+        En JSON Lines también sirve para compactar tras borrados.
+        """
+        destino = path or self.path
+        triples = list(self.consultar())
+        if str(destino).endswith('.jsonl'):
+            tmp = f'{destino}.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(''.join(json.dumps(t, ensure_ascii=False) + '\n' for t in triples))
+            os.replace(tmp, destino)
+        else:
+            guardar_triples(destino, triples)
+
+
+# Almacenes abiertos por ruta, con la firma (mtime, tamaño) del archivo
+# tras la última lectura/escritura propia para detectar cambios externos.
+_ALMACENES: Dict[str, Tuple[AlmacenTriples, Tuple[int, int]]] = {}
+
+
+def _firma_archivo(path: str) -> Tuple[int, int]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return (0, -1)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def abrir_almacen(path: str) -> AlmacenTriples:
+    """`AlmacenTriples` de `path`, reutilizado entre llamadas mientras el archivo no cambie por fuera."""
+    path = str(path)
+    abierto = _ALMACENES.get(path)
+    if abierto is not None and abierto[1] == _firma_archivo(path):
+        return abierto[0]
+    almacen = AlmacenTriples.cargar(path)
+    _ALMACENES[path] = (almacen, _firma_archivo(path))
+    return almacen
+
+
+def _anexar_lista_json(path: str, triples: List[Dict[str, Any]]) -> bool:
+    """Añade `triples` al final de la lista JSON de `path` sin reescribirla.
+
+    Sustituye el `]` final por los nuevos elementos (con el mismo sangrado
+    que `guardar_triples`) y vuelve a cerrar la lista. Devuelve False si el
+    archivo no existe o no termina en una lista.
+    """
+    try:
+        f = open(path, 'r+b')
+    except FileNotFoundError:
+        return False
+    with f:
+        tam = f.seek(0, os.SEEK_END)
+        f.seek(max(0, tam - 4096))
+        cola = f.read()
+        previo = cola.rstrip()
+        if not previo.endswith(b']'):
+            return False
+        previo = previo[:-1].rstrip()
+        if not previo:
+            return False
+        cuerpo = ',\n'.join('  ' + json.dumps(t, indent=2, ensure_ascii=False).replace('\n', '\n  ') for t in triples)
+        f.seek(tam - len(cola) + len(previo))
+        f.write(('\n' if previo.endswith(b'[') else ',\n').encode('utf-8') + cuerpo.encode('utf-8') + b'\n]')
+        f.truncate()
+    return True
+
+
 def añadir_triple(path: str, s: str, p: str, o: Any) -> bool:
     """Añade un triple a `path` si no existía.
 
-    Devuelve True si se añadió; False si ya existía.
+    Devuelve True si se añadió; False si ya existía. La comprobación usa el
+    `AlmacenTriples` abierto de esa ruta (indexado, se carga una vez) y la
+    escritura solo añade el triple: una línea en `.jsonl`, o el elemento al
+    final de la lista en el formato JSON de siempre.
     """
-    triples = cargar_triples(path)
-    if existe_triple(triples, s, p, o):
+    path = str(path)
+    almacen = abrir_almacen(path)
+    if not almacen.añadir(s, p, o):
         return False
-    triples.append({"s": s, "p": p, "o": o})
-    guardar_triples(path, triples)
+    if not almacen._es_jsonl() and not _anexar_lista_json(path, [{"s": s, "p": p, "o": o}]):
+        # Archivo ausente o con otro formato: se escribe la lista completa
+        triples = cargar_triples(path) if os.path.exists(path) else []
+        triples.append({"s": s, "p": p, "o": o})
+        guardar_triples(path, triples)
+    _ALMACENES[path] = (almacen, _firma_archivo(path))
     return True
 
 
@@ -50,8 +295,15 @@ def cargar_red_simplificada(path: str) -> Dict[str, Any]:
     """Carga la estructura simplificada de la red semántica.
 
     Formato esperado: { 'usuarios': { <uid>: { ...perfil... } } }
-    Se usa directamente por la GUI y por el CLI.
+    Se usa directamente por la GUI y por el CLI. Si existe el diario
+    `<path>.log` (ver `DiarioRed`), se aplican también sus cambios pendientes.
     """
+    if os.path.exists(DiarioRed.ruta_diario(path)):
+        diario = DiarioRed(path)
+        red = diario.cargar()
+        if len(diario.triples):
+            red['triples'] = list(diario.triples.consultar())
+        return red
     with open(path, 'r', encoding='utf-8') as f:
         return json.load(f)
 
@@ -62,26 +314,603 @@ def guardar_red_simplificada(path: str, estructura: Dict[str, Any]):
         json.dump(estructura, f, indent=2, ensure_ascii=False)
 
 
-def agregar_o_actualizar_usuario_en_red(path: str, usuario: Dict[str, Any]) -> None:
+def _perfil_para_red(usuario: Dict[str, Any]) -> Dict[str, Any]:
+    """Campos del perfil que se guardan en la red (ingredientes en minúsculas)."""
+    return {
+        'platos_gustan': usuario.get('platos_gustan', []),
+        'platos_no_gustan': usuario.get('platos_no_gustan', []),
+        'ingredientes_gustan': [i.lower() for i in usuario.get('ingredientes_gustan', [])],
+        'alergias': [i.lower() for i in usuario.get('alergias', [])],
+        'restricciones': [r.lower() for r in usuario.get('restricciones', [])]
+    }
+
+
+def agregar_o_actualizar_usuario_en_red(path: str, usuario: Dict[str, Any], diario: bool = False) -> None:
     """Helper para añadir o actualizar un usuario en el archivo de red.
 
     Normaliza a minúsculas ciertos campos y asegura la clave `usuarios`.
     `usuario` debe contener al menos una clave 'id' o 'nombre' para usarla
-    como identificador.
+    como identificador. Con `diario=True` el cambio se añade al diario de la
+    red (O(cambio)) en lugar de reescribir el archivo completo.
     """
+    uid = usuario.get('id') or usuario.get('nombre')
+    if diario:
+        abrir_diario(path).registrar_usuario(uid, _perfil_para_red(usuario))
+        return
+
     try:
         red = cargar_red_simplificada(path)
     except FileNotFoundError:
         red = {'usuarios': {}}
 
-    uid = usuario.get('id') or usuario.get('nombre')
     red.setdefault('usuarios', {})
     # normalizar campos
-    red['usuarios'][uid] = {
-        'platos_gustan': usuario.get('platos_gustan', []),
-        'platos_no_gustan': usuario.get('platos_no_gustan', []),
-        'ingredientes_gustan': [i.lower() for i in usuario.get('ingredientes_gustan', [])],
-        'alergias': [i.lower() for i in usuario.get('alergias', [])],
-        'restricciones': [r.lower() for r in usuario.get('restricciones', [])]
-    }
+    red['usuarios'][uid] = _perfil_para_red(usuario)
     guardar_red_simplificada(path, red)
+
+
+# Candados de cada diario dentro del proceso (ver `_bloquear_diario`)
+_CANDADOS_DIARIO: Dict[str, threading.Lock] = {}
+_CANDADO_REGISTRO = threading.Lock()
+
+
+@contextmanager
+def _bloquear_diario(path_diario: str):
+    """Exclusión mutua sobre el diario entre hilos y entre procesos (archivo `<diario>.lock`)."""
+    with _CANDADO_REGISTRO:
+        candado = _CANDADOS_DIARIO.setdefault(os.path.abspath(path_diario), threading.Lock())
+    with candado, open(f'{path_diario}.lock', 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    # LK_LOCK reintenta durante ~10 s y luego falla: se insiste
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass
+        # El candado se libera al cerrar el archivo
+        yield
+
+
+class DiarioRed:
+    """Persistencia de la red semántica con instantánea + diario de cambios.
+
+    - Instantánea: `path` (el `red_semantica.json` de siempre).
+    - Diario: `<path>.log`, JSON Lines con una operación por línea:
+      `{"op": "usuario", "uid": ..., "perfil": {...}}`,
+      `{"op": "borrar_usuario", "uid": ...}`,
+      `{"op": "triple" | "borrar_triple", "s": ..., "p": ..., "o": ...}`.
+
+    Cada cambio cuesta una línea añadida (O(cambio)) y queda en disco en
+    cuanto se registra, así que un cierre inesperado no pierde la sesión.
+    `compactar()` (automático cada `compactar_cada` operaciones) vuelca el
+    estado en la instantánea de forma atómica y vacía el diario. El umbral
+    se respeta también sin `cargar()`: la primera escritura cuenta las
+    líneas que ya tiene el diario. Todas las operaciones fijan un estado
+    completo, así que reaplicar un diario sobre una instantánea que ya lo
+    incluye (caída entre ambos pasos) es inocuo.
+    Una última línea incompleta (caída a mitad de escritura, o un escritor
+    concurrente que aún no ha terminado) se ignora al leer; solo la recorta
+    el siguiente escritor, antes de añadir su línea.
+    Escrituras, carga y compactación se excluyen con `<diario>.lock` (entre
+    hilos y procesos): una línea añadida mientras otro compacta no se pierde
+    y un lector no ve la instantánea vieja con el diario ya vaciado.
+    """
+
+    def __init__(self, path: str, compactar_cada: int = 1000, sincronizar: bool = False):
+        self.path = str(path)
+        self.path_diario = self.ruta_diario(self.path)
+        self.compactar_cada = compactar_cada
+        self.sincronizar = sincronizar
+        self.red: Optional[Dict[str, Any]] = None
+        self.triples = AlmacenTriples()
+        # Líneas del diario (None: aún sin contar, instancia sin cargar)
+        self._operaciones: Optional[int] = None
+
+    @staticmethod
+    def ruta_diario(path: str) -> str:
+        return f'{path}.log'
+
+    def cargar(self) -> Dict[str, Any]:
+        """Carga la instantánea y reproduce el diario. Devuelve la red resultante.
+
+        Los triples quedan en `self.triples`, no en el dict devuelto.
+        """
+        with _bloquear_diario(self.path_diario):
+            return self._cargar()
+
+    def _cargar(self) -> Dict[str, Any]:
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                red = json.load(f)
+        else:
+            red = {'usuarios': {}}
+        red.setdefault('usuarios', {})
+        self.red = red
+        # Los triples viven en `self.triples` (indexados) y no dentro de `red`
+        self.triples = AlmacenTriples()
+        self.triples.añadir_varios(red.pop('triples', []))
+
+        self._operaciones = 0
+        if os.path.exists(self.path_diario):
+            with open(self.path_diario, 'rb') as f:
+                for linea in f:
+                    if not linea.endswith(b'\n'):
+                        break
+                    try:
+                        op = json.loads(linea.decode('utf-8'))
+                    except ValueError:
+                        break
+                    self._aplicar(op)
+                    self._operaciones += 1
+        return red
+
+    def _contar_operaciones(self) -> int:
+        """Líneas completas del diario en disco (sin decodificarlas)."""
+        if not os.path.exists(self.path_diario):
+            return 0
+        n = 0
+        with open(self.path_diario, 'rb') as f:
+            for bloque in iter(lambda: f.read(TAM_BLOQUE_LECTURA), b''):
+                n += bloque.count(b'\n')
+        return n
+
+    @staticmethod
+    def _recortar_cola(f) -> None:
+        """Quita una última línea sin '\\n' (escritura interrumpida) de `f` (abierto en 'a+b')."""
+        fin = f.seek(0, os.SEEK_END)
+        if not fin:
+            return
+        f.seek(fin - 1)
+        if f.read(1) == b'\n':
+            return
+        pos = fin
+        while pos > 0:
+            inicio = max(0, pos - TAM_BLOQUE_LECTURA)
+            f.seek(inicio)
+            i = f.read(pos - inicio).rfind(b'\n')
+            if i >= 0:
+                f.truncate(inicio + i + 1)
+                return
+            pos = inicio
+        f.truncate(0)
+
+    def _aplicar(self, op: Dict[str, Any]) -> None:
+        if self.red is None:
+            return
+        tipo = op.get('op')
+        if tipo == 'usuario':
+            self.red['usuarios'][op['uid']] = op['perfil']
+        elif tipo == 'borrar_usuario':
+            self.red['usuarios'].pop(op['uid'], None)
+        elif tipo == 'triple':
+            self.triples.añadir(op['s'], op['p'], op['o'])
+        elif tipo == 'borrar_triple':
+            self.triples.eliminar(op['s'], op['p'], op['o'])
+
+    def _registrar(self, op: Dict[str, Any]) -> None:
+        self._registrar_varios([op])
+
+    def _registrar_varios(self, ops: List[Dict[str, Any]]) -> None:
+        """Añade `ops` al diario con una sola escritura."""
+        if not ops:
+            return
+        with _bloquear_diario(self.path_diario):
+            if self._operaciones is None:
+                self._operaciones = self._contar_operaciones()
+            with open(self.path_diario, 'a+b') as f:
+                # Solo el escritor repara el diario: una línea a medias pegada a
+                # la nueva la haría ilegible (y con ella todo lo posterior)
+                self._recortar_cola(f)
+                f.write(''.join(json.dumps(op, ensure_ascii=False, separators=(',', ':')) + '\n' for op in ops).encode('utf-8'))
+                if self.sincronizar:
+                    f.flush()
+                    os.fsync(f.fileno())
+            for op in ops:
+                self._aplicar(op)
+            self._operaciones += len(ops)
+            if self.compactar_cada and self._operaciones >= self.compactar_cada:
+                self._compactar()
+
+    def registrar_usuario(self, uid: str, perfil: Dict[str, Any]) -> None:
+        """Añade o reemplaza el perfil de `uid`."""
+        self._registrar({'op': 'usuario', 'uid': uid, 'perfil': perfil})
+
+    def eliminar_usuario(self, uid: str) -> None:
+        self._registrar({'op': 'borrar_usuario', 'uid': uid})
+
+    def registrar_triple(self, s: str, p: str, o: Any) -> None:
+        if self.red is None or not self.triples.existe(s, p, o):
+            self._registrar({'op': 'triple', 's': s, 'p': p, 'o': o})
+
+    def registrar_triples(self, triples: Iterable[Dict[str, Any]]) -> None:
+        """Inserción en bloque (dicts con 's', 'p', 'o') con una sola escritura en el diario."""
+        self._registrar_varios([
+            {'op': 'triple', 's': t['s'], 'p': t['p'], 'o': t['o']}
+            for t in triples
+            if self.red is None or not self.triples.existe(t['s'], t['p'], t['o'])
+        ])
+
+    def eliminar_triple(self, s: str, p: str, o: Any) -> None:
+        self._registrar({'op': 'borrar_triple', 's': s, 'p': p, 'o': o})
+
+    def compactar(self) -> None:
+        """Escribe la red en la instantánea (archivo temporal + rename) y vacía el diario.
+
+        Antes se recarga instantánea + diario desde disco para incluir las
+        operaciones que otros escritores hayan añadido al mismo diario; el
+        candado del diario se mantiene hasta vaciarlo, así que ninguna línea
+        puede colarse entre la recarga y el vaciado.
+        """
+        with _bloquear_diario(self.path_diario):
+            self._compactar()
+
+    def _compactar(self) -> None:
+        self._cargar()
+        estructura = dict(self.red)
+        if len(self.triples):
+            estructura['triples'] = list(self.triples.consultar())
+        else:
+            estructura.pop('triples', None)
+        tmp = f'{self.path}.tmp'
+        guardar_red_simplificada(tmp, estructura)
+        os.replace(tmp, self.path)
+        # Diario vacío también por rename: nunca queda a medio truncar
+        tmp_diario = f'{self.path_diario}.tmp'
+        open(tmp_diario, 'wb').close()
+        os.replace(tmp_diario, self.path_diario)
+        self._operaciones = 0
+
+
+# Diarios abiertos por ruta (ver `abrir_diario`)
+_DIARIOS: Dict[str, DiarioRed] = {}
+
+
+def abrir_diario(path: str) -> DiarioRed:
+    """`DiarioRed` de `path`, reutilizado entre llamadas (lleva la cuenta para compactar)."""
+    path = str(path)
+    diario = _DIARIOS.get(path)
+    if diario is None:
+        diario = _DIARIOS[path] = DiarioRed(path)
+    return diario
+
+
+# --- Lectura en streaming de red_semantica.json ---
+
+TAM_BLOQUE_LECTURA = 1 << 16
+
+
+class _LectorJSON:
+    """Lector incremental de valores JSON sobre un archivo UTF-8.
+
+    Mantiene en memoria solo el texto pendiente de decodificar (a lo sumo un
+    valor completo más un bloque), y lleva la cuenta del desplazamiento en
+    bytes de cada posición para poder indexar el archivo.
+    """
+
+    _decodificador = json.JSONDecoder()
+
+    def __init__(self, f, tam_bloque: int = TAM_BLOQUE_LECTURA):
+        self.f = f
+        self.tam_bloque = tam_bloque
+        self.utf8 = codecs.getincrementaldecoder('utf-8')()
+        self.buf = ''
+        self.pos = 0
+        # buf[marca] está en el byte `offset_marca` del archivo; la posición
+        # en bytes se actualiza por tramos, así que calcularla es lineal en total
+        self.marca = 0
+        self.offset_marca = 0
+        self.fin = False
+
+    def _rellenar(self) -> bool:
+        if self.fin:
+            return False
+        datos = self.f.read(self.tam_bloque)
+        if not datos:
+            self.fin = True
+            self.buf += self.utf8.decode(b'', final=True)
+            return False
+        # Se descarta lo ya consumido para no acumular el archivo entero
+        self.offset_actual()
+        self.buf = self.buf[self.pos:] + self.utf8.decode(datos)
+        self.pos = self.marca = 0
+        return True
+
+    def offset_actual(self) -> int:
+        """Desplazamiento en bytes de `buf[pos]` dentro del archivo."""
+        if self.pos != self.marca:
+            self.offset_marca += len(self.buf[self.marca:self.pos].encode('utf-8'))
+            self.marca = self.pos
+        return self.offset_marca
+
+    def saltar_espacios(self) -> str:
+        """Avanza hasta el siguiente carácter significativo y lo devuelve ('' al final)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._rellenar():
+                return ''
+
+    def esperar(self, caracter: str) -> None:
+        if self.saltar_espacios() != caracter:
+            raise ValueError(f'JSON inesperado en byte {self.offset_actual()}: se esperaba {caracter!r}')
+        self.pos += 1
+
+    def valor(self) -> Tuple[Any, int, int]:
+        """Decodifica el siguiente valor. Devuelve (valor, byte_inicio, byte_fin)."""
+        self.saltar_espacios()
+        inicio = self.offset_actual()
+        while True:
+            try:
+                valor, fin = self._decodificador.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self._rellenar():
+                    continue
+                raise
+            # Un número al borde del buffer podría seguir en el siguiente bloque
+            if fin == len(self.buf) and not self.fin and self._rellenar():
+                continue
+            self.pos = fin
+            return valor, inicio, self.offset_actual()
+
+
+def _iterar_miembros(lector: _LectorJSON) -> Iterator[str]:
+    """Recorre las claves de un objeto JSON; el llamador consume cada valor."""
+    lector.esperar('{')
+    if lector.saltar_espacios() == '}':
+        lector.pos += 1
+        return
+    while True:
+        clave, _, _ = lector.valor()
+        lector.esperar(':')
+        yield clave
+        c = lector.saltar_espacios()
+        lector.pos += 1
+        if c == '}':
+            return
+        if c != ',':
+            raise ValueError(f'JSON inesperado en byte {lector.offset_actual()}: se esperaba "," o "}}"')
+
+
+def _iterar_instantanea(path: str) -> Iterator[Tuple[str, Dict[str, Any], int, int]]:
+    """(uid, perfil, byte_inicio, byte_fin) de cada usuario de la instantánea, en streaming."""
+    if not os.path.exists(path):
+        return
+    with open(path, 'rb') as f:
+        lector = _LectorJSON(f)
+        for clave in _iterar_miembros(lector):
+            if clave != 'usuarios':
+                lector.valor()
+                continue
+            for uid in _iterar_miembros(lector):
+                perfil, inicio, fin = lector.valor()
+                yield uid, perfil, inicio, fin
+
+
+def _usuarios_del_diario(path: str) -> Tuple[Dict[str, Optional[Dict[str, Any]]], List[str], set]:
+    """Estado final de los usuarios tocados por el diario de `path`.
+
+    Devuelve (finales, orden, movidos): `finales[uid]` es el perfil final o
+    None si quedó borrado; `orden` es el orden en que un dict colocaría los
+    usuarios añadidos por el diario, y `movidos` los que el diario borró y
+    volvió a crear (pasan al final, como al reproducirlo sobre un dict).
+    """
+    finales: Dict[str, Optional[Dict[str, Any]]] = {}
+    orden: Dict[str, None] = {}
+    borrados = set()
+    movidos = set()
+    ruta = DiarioRed.ruta_diario(path)
+    if not os.path.exists(ruta):
+        return finales, [], movidos
+    with open(ruta, 'rb') as f:
+        for linea in f:
+            if not linea.endswith(b'\n'):
+                break
+            try:
+                op = json.loads(linea.decode('utf-8'))
+            except ValueError:
+                break
+            uid = op.get('uid')
+            if op.get('op') == 'usuario':
+                if uid in borrados:
+                    movidos.add(uid)
+                    borrados.discard(uid)
+                finales[uid] = op['perfil']
+                orden.setdefault(uid, None)
+            elif op.get('op') == 'borrar_usuario':
+                finales[uid] = None
+                orden.pop(uid, None)
+                borrados.add(uid)
+    return finales, list(orden), movidos
+
+
+def iterar_usuarios_red(path: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Pares (uid, perfil) de la red en `path`, leyendo la instantánea en streaming.
+
+    Equivale a `cargar_red_simplificada(path)['usuarios'].items()` (diario
+    incluido y en el mismo orden), pero solo mantiene en memoria el usuario
+    en curso y los cambios del diario, así que recorrer una red enorme usa
+    memoria constante.
+    """
+    path = str(path)
+    finales, orden, movidos = _usuarios_del_diario(path)
+    vistos = set()
+    for uid, perfil, _, _ in _iterar_instantanea(path):
+        if uid in finales:
+            vistos.add(uid)
+            if finales[uid] is None or uid in movidos:
+                continue
+            perfil = finales[uid]
+        yield uid, perfil
+    for uid in orden:
+        if finales[uid] is not None and (uid in movidos or uid not in vistos):
+            yield uid, finales[uid]
+
+
+class IndiceRed:
+    """Índice de desplazamientos de los usuarios de una red semántica.
+
+    Se guarda junto a la instantánea como `<path>.idx`: una cabecera con la
+    firma del archivo seguida de registros de ancho fijo ordenados por uid
+    (uid en UTF-8 rellenado con ceros hasta el más largo, byte_inicio y
+    byte_fin del perfil). El índice se abre con mmap y `obtener(uid)` hace
+    una búsqueda binaria sobre los registros y lee solo los bytes de ese
+    usuario: ni el índice ni la instantánea se recorren enteros por consulta.
+    Si la instantánea cambió desde que se construyó el índice (otra firma),
+    se reconstruye con una pasada en streaming.
+
+    Los cambios del diario, que aún no están en la instantánea, tienen
+    prioridad. El diario se lee de forma incremental: cada consulta solo
+    decodifica las líneas añadidas desde la anterior. Si la instantánea se
+    reemplaza (compactación) o el diario encoge, se vuelve a leer desde el
+    principio.
+    """
+
+    MAGIA = b'REDIDX01'
+    # firma (mtime_ns, tamaño), ancho de la clave, número de registros
+    _CABECERA = struct.Struct('<qqII')
+    _RANGO = struct.Struct('<QQ')
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        self.path_indice = self.ruta_indice(self.path)
+        self.path_diario = DiarioRed.ruta_diario(self.path)
+        self._firma: Optional[Tuple[int, int]] = None
+        # mmap del índice (o sus bytes, si no se pudo escribir)
+        self._mapa: Union[mmap.mmap, bytes, None] = None
+        self._ancho = 0
+        self._n = 0
+        # Estado del diario consumido: firma de la instantánea con la que se
+        # leyó, bytes consumidos y perfil final (None: borrado) por uid
+        self._firma_diario: Optional[Tuple[int, int]] = None
+        self._offset_diario = 0
+        self._cambios: Dict[str, Optional[Dict[str, Any]]] = {}
+
+    @staticmethod
+    def ruta_indice(path: str) -> str:
+        return f'{path}.idx'
+
+    def _vigente(self) -> None:
+        """Asegura que el índice mapeado corresponde a la instantánea actual."""
+        firma = _firma_archivo(self.path)
+        if self._firma == firma:
+            return
+        if not self._abrir(firma):
+            self.construir()
+
+    def _abrir(self, firma: Tuple[int, int]) -> bool:
+        """Mapea `<path>.idx` si existe y es de la instantánea con `firma`."""
+        self.cerrar()
+        try:
+            with open(self.path_indice, 'rb') as f:
+                mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return False
+        inicio = len(self.MAGIA)
+        if mapa[:inicio] != self.MAGIA or len(mapa) < inicio + self._CABECERA.size:
+            mapa.close()
+            return False
+        mtime, tam, ancho, n = self._CABECERA.unpack_from(mapa, inicio)
+        if (mtime, tam) != firma or len(mapa) != inicio + self._CABECERA.size + n * (ancho + self._RANGO.size):
+            mapa.close()
+            return False
+        self._mapa, self._ancho, self._n, self._firma = mapa, ancho, n, firma
+        return True
+
+    def cerrar(self) -> None:
+        if isinstance(self._mapa, mmap.mmap):
+            self._mapa.close()
+        self._mapa = None
+        self._firma = None
+
+    def construir(self) -> None:
+        """Recorre la instantánea y escribe el índice (si el directorio lo permite)."""
+        firma = _firma_archivo(self.path)
+        registros = sorted((uid.encode('utf-8'), inicio, fin) for uid, _, inicio, fin in _iterar_instantanea(self.path))
+        ancho = max((len(clave) for clave, _, _ in registros), default=0)
+        datos = b''.join(
+            [self.MAGIA, self._CABECERA.pack(firma[0], firma[1], ancho, len(registros))]
+            + [clave.ljust(ancho, b'\0') + self._RANGO.pack(inicio, fin) for clave, inicio, fin in registros]
+        )
+        self.cerrar()
+        tmp = f'{self.path_indice}.tmp'
+        try:
+            with open(tmp, 'wb') as f:
+                f.write(datos)
+            os.replace(tmp, self.path_indice)
+        except OSError:
+            pass
+        if not self._abrir(firma):
+            # Directorio de solo lectura: el índice queda en memoria
+            self._mapa, self._ancho, self._n, self._firma = datos, ancho, len(registros), firma
+
+    def _rango(self, uid: str) -> Optional[Tuple[int, int]]:
+        """(byte_inicio, byte_fin) del perfil de `uid` por búsqueda binaria, o None."""
+        clave = uid.encode('utf-8')
+        if len(clave) > self._ancho:
+            return None
+        clave = clave.ljust(self._ancho, b'\0')
+        tam_registro = self._ancho + self._RANGO.size
+        base = len(self.MAGIA) + self._CABECERA.size
+        bajo, alto = 0, self._n
+        while bajo < alto:
+            medio = (bajo + alto) // 2
+            pos = base + medio * tam_registro
+            if self._mapa[pos:pos + self._ancho] < clave:
+                bajo = medio + 1
+            else:
+                alto = medio
+        pos = base + bajo * tam_registro
+        if bajo == self._n or self._mapa[pos:pos + self._ancho] != clave:
+            return None
+        return self._RANGO.unpack_from(self._mapa, pos + self._ancho)
+
+    def _cambios_diario(self) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Cambios del diario, leyendo solo lo añadido desde la última consulta."""
+        firma = _firma_archivo(self.path)
+        try:
+            tam = os.path.getsize(self.path_diario)
+        except OSError:
+            tam = 0
+        if firma != self._firma_diario or tam < self._offset_diario:
+            self._firma_diario, self._offset_diario, self._cambios = firma, 0, {}
+        if tam == self._offset_diario:
+            return self._cambios
+        with open(self.path_diario, 'rb') as f:
+            f.seek(self._offset_diario)
+            for linea in f:
+                # Línea a medias (escritor en curso) o corrupta: se reintenta en la próxima consulta
+                if not linea.endswith(b'\n'):
+                    break
+                try:
+                    op = json.loads(linea.decode('utf-8'))
+                except ValueError:
+                    break
+                if op.get('op') == 'usuario':
+                    self._cambios[op['uid']] = op['perfil']
+                elif op.get('op') == 'borrar_usuario':
+                    self._cambios[op['uid']] = None
+                self._offset_diario += len(linea)
+        return self._cambios
+
+    def obtener(self, uid: str) -> Optional[Dict[str, Any]]:
+        """Perfil de `uid` (con el diario aplicado), o None si no existe."""
+        cambios = self._cambios_diario()
+        if uid in cambios:
+            return cambios[uid]
+        self._vigente()
+        rango = self._rango(uid)
+        if rango is None:
+            return None
+        inicio, fin = rango
+        with open(self.path, 'rb') as f:
+            f.seek(inicio)
+            return json.loads(f.read(fin - inicio).decode('utf-8'))
+
+    def __contains__(self, uid: str) -> bool:
+        return self.obtener(uid) is not None
@@ -1,11 +1,16 @@
 import tkinter as tk
-from tkinter import messagebox, simpledialog
+from tkinter import messagebox, simpledialog, ttk
+import tkinter.font as tkfont
 from pathlib import Path
 import json
-from typing import Dict, Any, List
+import queue
+import threading
+from typing import Dict, Any, List, Callable, Optional
 
-from herramientas_semanticas import cargar_red_simplificada, guardar_red_simplificada
-from recomendador import recomendar_platillos_bn
+from herramientas_semanticas import DiarioRed
+from recomendador import RecommenderModel
+from cache_recomendaciones import CacheRecomendaciones
+from busqueda_platos import IndicePrefijos
 
 DATA_DIR = Path(__file__).parent / 'data'
 SN_PATH = DATA_DIR / 'red_semantica.json'
@@ -41,9 +46,200 @@ UI = {
     'pady': 8,
     'btn_width': 18,
     'list_height': 12,
+    # Número de platos mostrados en la ventana de recomendaciones
+    'top_recs': 10,
+    # Cada cuántos ms se revisa si terminó un cálculo en segundo plano
+    'sondeo_ms': 50,
+    # Espera (ms) tras el último cambio de perfil antes de recalcular
+    'debounce_ms': 400,
 }
 
 
+class TareaSegundoPlano:
+    """Ejecuta `funcion(cancelada, progreso)` en un hilo sin bloquear Tk.
+
+    Tk no es seguro entre hilos, así que el hilo de trabajo solo deja
+    eventos en una cola; el hilo de Tk la sondea con `root.after` y llama a
+    `al_progresar(fraccion, texto)`, `al_terminar(resultado)` o
+    `al_fallar(error)`. `cancelar()` activa el `threading.Event` que recibe
+    la función (para que pueda abandonar entre fases) y descarta cualquier
+    resultado posterior, pero el hilo sigue hasta que la función vuelve. Con
+    `tras` (la tarea anterior sobre los mismos datos) el hilo espera a que
+    esa termine antes de empezar, así que los recálculos nunca se solapan.
+    """
+
+    def __init__(self, root: tk.Misc, funcion: Callable, al_terminar: Callable[[Any], None], al_fallar: Optional[Callable[[Exception], None]] = None, al_progresar: Optional[Callable[[float, str], None]] = None, tras: Optional['TareaSegundoPlano'] = None):
+        self.root = root
+        self.al_terminar = al_terminar
+        self.al_fallar = al_fallar
+        self.al_progresar = al_progresar
+        self.cancelada = threading.Event()
+        self.terminada = False
+        self._eventos: queue.Queue = queue.Queue()
+        self._hilo = threading.Thread(target=self._ejecutar, args=(funcion, tras._hilo if tras is not None else None), daemon=True)
+        self._hilo.start()
+        self._id_sondeo = self.root.after(UI['sondeo_ms'], self._sondear)
+
+    def _ejecutar(self, funcion: Callable, anterior: Optional[threading.Thread]) -> None:
+        if anterior is not None:
+            anterior.join()
+            if self.cancelada.is_set():
+                return
+        try:
+            self._eventos.put(('ok', funcion(self.cancelada, self._progreso)))
+        except Exception as e:
+            self._eventos.put(('error', e))
+
+    def _progreso(self, fraccion: float, texto: str = '') -> None:
+        self._eventos.put(('progreso', (fraccion, texto)))
+
+    def _sondear(self) -> None:
+        self._id_sondeo = None
+        while not self.cancelada.is_set():
+            try:
+                tipo, dato = self._eventos.get_nowait()
+            except queue.Empty:
+                self._id_sondeo = self.root.after(UI['sondeo_ms'], self._sondear)
+                return
+            if tipo == 'progreso':
+                if self.al_progresar is not None:
+                    self.al_progresar(*dato)
+                continue
+            self.terminada = True
+            if tipo == 'ok':
+                self.al_terminar(dato)
+            elif self.al_fallar is not None:
+                self.al_fallar(dato)
+            return
+
+    def activa(self) -> bool:
+        return not self.terminada and not self.cancelada.is_set()
+
+    def cancelar(self) -> None:
+        self.cancelada.set()
+        if self._id_sondeo is not None:
+            try:
+                self.root.after_cancel(self._id_sondeo)
+            except tk.TclError:
+                pass
+            self._id_sondeo = None
+
+
+class ListaVirtual(tk.Frame):
+    """Lista desplazable que solo muestra en pantalla las filas visibles.
+
+    `elementos` es la lista completa (p. ej. índices de platos), pero el
+    `Listbox` interno solo contiene las filas que caben en la ventana; la
+    barra de desplazamiento y la rueda mueven `inicio` y se vuelven a pintar
+    esas filas. Al pintar se compara con el texto ya mostrado y solo se
+    reescriben las filas que cambian. `formatear(elemento)` da el texto de
+    cada fila.
+    """
+
+    def __init__(self, master: tk.Misc, formatear: Callable[[Any], str], font=None):
+        super().__init__(master)
+        self.formatear = formatear
+        self.elementos: List[Any] = []
+        self.inicio = 0
+        self.filas = UI['list_height']
+        self.seleccionado: Any = None
+        self._visibles: List[str] = []
+        self.listbox = tk.Listbox(self, height=self.filas, font=font, exportselection=False, activestyle='none')
+        self.listbox.pack(side='left', fill='both', expand=True)
+        self.scrollbar = tk.Scrollbar(self, command=self._desplazar)
+        self.scrollbar.pack(side='right', fill='y')
+        self._alto_fila = tkfont.Font(font=self.listbox.cget('font')).metrics('linespace') + 1
+        self.listbox.bind('<<ListboxSelect>>', self._al_seleccionar)
+        self.listbox.bind('<Configure>', self._al_redimensionar)
+        self.listbox.bind('<MouseWheel>', self._rueda)
+        self.listbox.bind('<Button-4>', self._rueda)
+        self.listbox.bind('<Button-5>', self._rueda)
+        self.listbox.bind('<Up>', lambda e: self._mover(-1))
+        self.listbox.bind('<Down>', lambda e: self._mover(1))
+        self.listbox.bind('<Prior>', lambda e: self._mover(-self.filas))
+        self.listbox.bind('<Next>', lambda e: self._mover(self.filas))
+
+    def establecer(self, elementos: List[Any]) -> None:
+        """Sustituye la lista completa (p. ej. tras filtrar) conservando la selección si sigue en ella."""
+        self.elementos = elementos
+        if self.seleccionado is not None and self.seleccionado not in elementos:
+            self.seleccionado = None
+        self.inicio = max(0, min(self.inicio, len(elementos) - self.filas))
+        self._pintar()
+
+    def refrescar(self) -> None:
+        """Vuelve a formatear las filas visibles (solo se reescriben las que cambian)."""
+        self._pintar()
+
+    def seleccion(self) -> Any:
+        return self.seleccionado
+
+    def ver(self, inicio: int) -> None:
+        inicio = max(0, min(int(inicio), len(self.elementos) - self.filas))
+        if inicio != self.inicio:
+            self.inicio = inicio
+            self._pintar()
+
+    def _pintar(self) -> None:
+        nuevos = [self.formatear(e) for e in self.elementos[self.inicio:self.inicio + self.filas]]
+        for i, texto in enumerate(nuevos):
+            if i >= len(self._visibles):
+                self.listbox.insert('end', texto)
+            elif self._visibles[i] != texto:
+                self.listbox.delete(i)
+                self.listbox.insert(i, texto)
+        if len(self._visibles) > len(nuevos):
+            self.listbox.delete(len(nuevos), 'end')
+        self._visibles = nuevos
+
+        self.listbox.selection_clear(0, 'end')
+        visibles = self.elementos[self.inicio:self.inicio + self.filas]
+        if self.seleccionado in visibles:
+            self.listbox.selection_set(visibles.index(self.seleccionado))
+        total = len(self.elementos)
+        if total:
+            self.scrollbar.set(self.inicio / total, min(1.0, (self.inicio + self.filas) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _desplazar(self, *args) -> None:
+        if args[0] == 'moveto':
+            self.ver(float(args[1]) * len(self.elementos))
+        elif args[0] == 'scroll':
+            paso = self.filas if args[2] == 'pages' else 1
+            self.ver(self.inicio + int(args[1]) * paso)
+
+    def _rueda(self, event) -> str:
+        arriba = event.num == 4 or getattr(event, 'delta', 0) > 0
+        self.ver(self.inicio + (-3 if arriba else 3))
+        return 'break'
+
+    def _al_redimensionar(self, event) -> None:
+        filas = max(1, event.height // self._alto_fila)
+        if filas != self.filas:
+            self.filas = filas
+            self.inicio = max(0, min(self.inicio, len(self.elementos) - self.filas))
+            self._pintar()
+
+    def _al_seleccionar(self, event) -> None:
+        sel = self.listbox.curselection()
+        if sel and self.inicio + sel[0] < len(self.elementos):
+            self.seleccionado = self.elementos[self.inicio + sel[0]]
+
+    def _mover(self, delta: int) -> str:
+        if not self.elementos:
+            return 'break'
+        pos = self.elementos.index(self.seleccionado) if self.seleccionado in self.elementos else self.inicio - (1 if delta > 0 else 0)
+        pos = max(0, min(pos + delta, len(self.elementos) - 1))
+        self.seleccionado = self.elementos[pos]
+        if pos < self.inicio:
+            self.inicio = pos
+        elif pos >= self.inicio + self.filas:
+            self.inicio = pos - self.filas + 1
+        self._pintar()
+        return 'break'
+
+
 class RecommenderGUI:
     def __init__(self, root: tk.Tk):
         # Guardar referencia a la raíz y ajustar tamaño inicial
@@ -53,17 +249,79 @@ class RecommenderGUI:
         # Esto evita mucho espacio vacío en la pantalla de login.
         self.root.resizable(False, False)
         self._center_window(self.root, 520, 260)
-        self.red = cargar_red_simplificada(str(SN_PATH)) if SN_PATH.exists() else {'usuarios': {}}
-        self.platillos = self._load_json(DISHES_PATH)
-        self.disponibilidad = self._load_json(ING_DISP_PATH)
+        # Cada cambio de perfil se añade al diario de la red (no se pierde la
+        # sesión si la aplicación se cierra de golpe); al salir se compacta.
+        self.diario = DiarioRed(str(SN_PATH))
+        # Red, catálogo y modelo se cargan en segundo plano (`_cargar_datos`);
+        # mientras tanto la ventana de login responde y muestra el progreso.
+        self.platillos: List[Dict[str, Any]] = []
+        self.disponibilidad: Dict[str, bool] = {}
+        self.modelo = None
+        # Derivados del catálogo, calculados una vez al cargar
+        self.nombre_plato: Dict[str, str] = {}
+        self.indice_busqueda: Optional[IndicePrefijos] = None
+        # Último texto puesto en cada label del panel lateral
+        self._textos_panel: Dict[str, str] = {}
+        self.cache = None
         self.usuario_id = None
+        # Cálculo de recomendaciones en curso y recálculo pendiente (debounce)
+        self._tarea_recs: Optional[TareaSegundoPlano] = None
+        self._id_debounce = None
+        self._win_recs = None
 
         self._build_login()
+        self._tarea_carga = TareaSegundoPlano(self.root, self._cargar_datos, self._datos_cargados, self._error_carga, self._progreso_carga)
+
+    @property
+    def red(self) -> Optional[Dict[str, Any]]:
+        # Siempre la del diario: cada compactación (también la automática al
+        # registrar un cambio) la sustituye por una recién cargada
+        return self.diario.red
 
     def _load_json(self, path: Path):
         with open(path, 'r', encoding='utf-8') as f:
             return json.load(f)
 
+    def _cargar_datos(self, cancelada: threading.Event, progreso: Callable[[float, str], None]):
+        """Hilo de fondo: lee la red y el catálogo y compila el modelo."""
+        progreso(0.0, 'Leyendo red semántica...')
+        self.diario.cargar()
+        if cancelada.is_set():
+            return None
+        progreso(0.3, 'Leyendo catálogo...')
+        platillos = self._load_json(DISHES_PATH)
+        disponibilidad = self._load_json(ING_DISP_PATH)
+        if cancelada.is_set():
+            return None
+        progreso(0.5, 'Compilando catálogo...')
+        # Catálogo compilado una vez; cada recomendación solo procesa el perfil
+        modelo = RecommenderModel(platillos, disponibilidad)
+        progreso(0.9, 'Indexando búsqueda...')
+        indice = IndicePrefijos(platillos)
+        progreso(1.0, 'Listo')
+        return platillos, disponibilidad, modelo, indice
+
+    def _datos_cargados(self, datos):
+        self.platillos, self.disponibilidad, self.modelo, self.indice_busqueda = datos
+        self.nombre_plato = {p['id']: p.get('name', '') for p in self.platillos}
+        # Caché LRU por huella de perfil: repetir "Ver recomendaciones" sin
+        # cambios es un acierto de diccionario
+        self.cache = CacheRecomendaciones(self.modelo)
+        if self.btn_login.winfo_exists():
+            self.progreso_carga['value'] = 100
+            self.lbl_carga.config(text=f'{len(self.platillos)} platos cargados')
+            self.btn_login.config(state='normal')
+
+    def _error_carga(self, error: Exception):
+        messagebox.showerror('Error', f'Error al cargar los datos: {error}')
+        if self.lbl_carga.winfo_exists():
+            self.lbl_carga.config(text='Error al cargar los datos')
+
+    def _progreso_carga(self, fraccion: float, texto: str):
+        if self.lbl_carga.winfo_exists():
+            self.progreso_carga['value'] = fraccion * 100
+            self.lbl_carga.config(text=texto)
+
     def _center_window(self, win: tk.Toplevel | tk.Tk, width: int, height: int):
         """Centra la ventana `win` en la pantalla con el tamaño dado."""
         win.update_idletasks()
@@ -86,9 +344,15 @@ class RecommenderGUI:
         tk.Label(frm, text='Nombre de usuario:', font=UI['font_med']).grid(row=0, column=0, sticky='e', padx=(0,8))
         self.entry_user = tk.Entry(frm, font=UI['font_med'], width=28)
         self.entry_user.grid(row=0, column=1, sticky='w')
-        tk.Button(frm, text='Entrar', font=UI['font_med'], width=14, command=self._on_login).grid(row=1, column=0, columnspan=2, pady=10)
+        self.btn_login = tk.Button(frm, text='Entrar', font=UI['font_med'], width=14, command=self._on_login,
+                                   state='normal' if self.modelo is not None else 'disabled')
+        self.btn_login.grid(row=1, column=0, columnspan=2, pady=10)
+        # Progreso de la carga en segundo plano (el botón se activa al terminar)
+        self.progreso_carga = ttk.Progressbar(frm, mode='determinate', maximum=100, length=300)
+        self.progreso_carga.grid(row=2, column=0, columnspan=2)
+        self.lbl_carga = tk.Label(frm, text='Cargando datos...' if self.modelo is None else '', font=UI['font_med'])
+        self.lbl_carga.grid(row=3, column=0, columnspan=2)
 
-        
         self.entry_user.focus_set()
 
     def _on_login(self):
@@ -96,6 +360,9 @@ class RecommenderGUI:
         if not nombre:
             messagebox.showwarning('Usuario', 'Introduce un nombre')
             return
+        if self.modelo is None:
+            # Aún cargando en segundo plano
+            return
         uid = nombre
         # crear en la red si no existe
         self.red.setdefault('usuarios', {})
@@ -108,6 +375,7 @@ class RecommenderGUI:
                 'restricciones': [],
                 'ingredientes_no_gustan': []
             }
+            self.diario.registrar_usuario(uid, self.red['usuarios'][uid])
         self.usuario_id = uid
         
         self.root.resizable(True, True)
@@ -117,6 +385,8 @@ class RecommenderGUI:
     def _build_main(self):
         for w in self.root.winfo_children():
             w.destroy()
+        # Los labels del panel se crean de nuevo: olvidar los textos cacheados
+        self._textos_panel = {}
         
         frm = tk.Frame(self.root, padx=UI['padx'], pady=UI['pady'])
         frm.pack(fill='both', expand=True)
@@ -136,13 +406,18 @@ class RecommenderGUI:
         left.rowconfigure(0, weight=1)
 
         
+        # Búsqueda incremental (nombre, id o ingrediente) sobre la lista virtual
         list_frame = tk.Frame(left)
         list_frame.grid(row=0, column=0, sticky='nsew', padx=(0,8))
-        self.plat_listbox = tk.Listbox(list_frame, height=UI['list_height'], font=UI['font_med'])
-        self.plat_listbox.pack(side='left', fill='both', expand=True)
-        scrollbar = tk.Scrollbar(list_frame, command=self.plat_listbox.yview)
-        scrollbar.pack(side='right', fill='y')
-        self.plat_listbox.config(yscrollcommand=scrollbar.set)
+        buscador = tk.Frame(list_frame)
+        buscador.pack(side='top', fill='x', pady=(0,4))
+        tk.Label(buscador, text='Buscar:', font=UI['font_med']).pack(side='left')
+        self.var_busqueda = tk.StringVar()
+        tk.Entry(buscador, textvariable=self.var_busqueda, font=UI['font_med']).pack(side='left', fill='x', expand=True)
+        self.var_busqueda.trace_add('write', lambda *_: self._filtrar_platos())
+        self.lista_platos = ListaVirtual(list_frame, self._fila_plato, font=UI['font_med'])
+        self.lista_platos.pack(side='top', fill='both', expand=True)
+        self.lista_platos.establecer(list(range(len(self.platillos))))
 
         
         btns = tk.Frame(left)
@@ -151,9 +426,6 @@ class RecommenderGUI:
         tk.Button(btns, text='No me gusta', font=UI['font_med'], width=UI['btn_width'], command=self._mark_no_gusta).pack(pady=4)
         tk.Button(btns, text='Neutral', font=UI['font_med'], width=UI['btn_width'], command=self._mark_neutral).pack(pady=4)
 
-        for p in self.platillos:
-            self.plat_listbox.insert('end', f"{p['id']} - {p.get('name','')}")
-
         # Panel lateral para mostrar restricciones, alergias, gustos y no gustos
         tk.Label(side_panel, text='Restricciones activas:', font=UI['font_med']).pack(anchor='w')
         self.lbl_restr = tk.Label(side_panel, text='', font=UI['font_med'], wraplength=220, justify='left')
@@ -192,6 +464,26 @@ class RecommenderGUI:
     def _current_usuario(self) -> Dict[str, Any]:
         return self.red['usuarios'][self.usuario_id]
 
+    def _fila_plato(self, idx: int) -> str:
+        """Texto de la fila del plato `idx` ('+' gusta, '-' no gusta)."""
+        p = self.platillos[idx]
+        u = self._current_usuario()
+        marca = '+' if p['id'] in u.get('platos_gustan', []) else '-' if p['id'] in u.get('platos_no_gustan', []) else ' '
+        return f"{marca} {p['id']} - {p.get('name','')}"
+
+    def _filtrar_platos(self):
+        self.lista_platos.establecer(self.indice_busqueda.buscar(self.var_busqueda.get()))
+
+    def _plato_seleccionado(self) -> Optional[str]:
+        idx = self.lista_platos.seleccion()
+        return None if idx is None else self.platillos[idx]['id']
+
+    def _poner_texto(self, nombre: str, texto: str):
+        """Actualiza el label `nombre` del panel lateral solo si su texto cambia."""
+        if self._textos_panel.get(nombre) != texto:
+            self._textos_panel[nombre] = texto
+            getattr(self, nombre).config(text=texto)
+
     def _update_side_panel(self):
         """Actualiza los labels laterales que muestran restricciones y alergias.
 
@@ -201,7 +493,7 @@ class RecommenderGUI:
         if not self.usuario_id:
             for lbl in ('lbl_restr', 'lbl_alerg', 'lbl_platos_gustan', 'lbl_platos_no_gustan', 'lbl_ings_gustan', 'lbl_ings_no_gustan'):
                 if hasattr(self, lbl):
-                    getattr(self, lbl).config(text='')
+                    self._poner_texto(lbl, '')
             return
 
         u = self._current_usuario()
@@ -213,69 +505,76 @@ class RecommenderGUI:
         ings_ng = u.get('ingredientes_no_gustan', []) or []
 
         # Mostrar restricciones y alergias
-        self.lbl_restr.config(text=', '.join(restr) if restr else '(ninguna)')
-        self.lbl_alerg.config(text=', '.join(alerg) if alerg else '(ninguna)')
-
-        # Mapa id->nombre para mostrar nombres legibles de platos
-        id2name = {p['id']: p.get('name', '') for p in self.platillos}
+        self._poner_texto('lbl_restr', ', '.join(restr) if restr else '(ninguna)')
+        self._poner_texto('lbl_alerg', ', '.join(alerg) if alerg else '(ninguna)')
 
         def _format_platos_list(plist):
             if not plist:
                 return '(ninguno)'
             items = []
             for pid in plist:
-                name = id2name.get(pid, '')
+                # `nombre_plato` (id -> nombre) se construye una vez al cargar
+                name = self.nombre_plato.get(pid, '')
                 items.append(f"{pid} - {name}" if name else pid)
             return ', '.join(items)
 
-        self.lbl_platos_gustan.config(text=_format_platos_list(platos_g))
-        self.lbl_platos_no_gustan.config(text=_format_platos_list(platos_ng))
+        self._poner_texto('lbl_platos_gustan', _format_platos_list(platos_g))
+        self._poner_texto('lbl_platos_no_gustan', _format_platos_list(platos_ng))
 
         # Ingredientes
-        self.lbl_ings_gustan.config(text=', '.join(ings_g) if ings_g else '(ninguno)')
-        self.lbl_ings_no_gustan.config(text=', '.join(ings_ng) if ings_ng else '(ninguno)')
+        self._poner_texto('lbl_ings_gustan', ', '.join(ings_g) if ings_g else '(ninguno)')
+        self._poner_texto('lbl_ings_no_gustan', ', '.join(ings_ng) if ings_ng else '(ninguno)')
+
+    def _perfil_modificado(self):
+        """Se llama tras cualquier cambio del perfil (gustos, alergias, presets...).
+
+        Registra el perfil en el diario, descarta la entrada cacheada del
+        usuario, refresca el panel lateral y, si la ventana de recomendaciones
+        está abierta, programa su recálculo.
+        """
+        if self.usuario_id:
+            self.diario.registrar_usuario(self.usuario_id, self._current_usuario())
+            self.cache.invalidar_usuario(self.usuario_id)
+            # Las marcas +/- de la lista: solo cambian las filas afectadas
+            self.lista_platos.refrescar()
+        self._update_side_panel()
+        self._programar_recalculo()
 
     def _mark_gusta(self):
-        sel = self.plat_listbox.curselection()
-        if not sel:
+        pid = self._plato_seleccionado()
+        if pid is None:
             return
-        idx = sel[0]
-        pid = self.platillos[idx]['id']
         u = self._current_usuario()
         if pid in u.get('platos_no_gustan', []):
             u['platos_no_gustan'].remove(pid)
         if pid not in u.get('platos_gustan', []):
             u['platos_gustan'].append(pid)
         messagebox.showinfo('OK', 'Marcado como gusta')
-        self._update_side_panel()
+        self._perfil_modificado()
 
     def _mark_no_gusta(self):
-        sel = self.plat_listbox.curselection()
-        if not sel:
+        pid = self._plato_seleccionado()
+        if pid is None:
             return
-        idx = sel[0]
-        pid = self.platillos[idx]['id']
         u = self._current_usuario()
         if pid in u.get('platos_gustan', []):
             u['platos_gustan'].remove(pid)
         if pid not in u.get('platos_no_gustan', []):
             u['platos_no_gustan'].append(pid)
         messagebox.showinfo('OK', 'Marcado como no gusta')
-        self._update_side_panel()
+        self._perfil_modificado()
 
     def _mark_neutral(self):
-        sel = self.plat_listbox.curselection()
-        if not sel:
+        pid = self._plato_seleccionado()
+        if pid is None:
             return
-        idx = sel[0]
-        pid = self.platillos[idx]['id']
         u = self._current_usuario()
         if pid in u.get('platos_gustan', []):
             u['platos_gustan'].remove(pid)
         if pid in u.get('platos_no_gustan', []):
             u['platos_no_gustan'].remove(pid)
         messagebox.showinfo('OK', 'Marcado como neutral')
-        self._update_side_panel()
+        self._perfil_modificado()
 
     def _open_ingredientes(self):
         # Ventana para gestionar ingredientes (like/dislike)
@@ -289,7 +588,8 @@ class RecommenderGUI:
         scrollbar = tk.Scrollbar(list_frame, command=lst.yview)
         scrollbar.pack(side='right', fill='y')
         lst.config(yscrollcommand=scrollbar.set)
-        for ing in sorted({ing.lower() for p in self.platillos for ing in p.get('ingredients', [])}):
+        # `modelo.ingredientes`: ingredientes del catálogo, ya en minúsculas y ordenados
+        for ing in self.modelo.ingredientes:
             lst.insert('end', ing)
         btns = tk.Frame(win)
         btns.pack(side='left', padx=8, pady=8)
@@ -309,14 +609,14 @@ class RecommenderGUI:
             if ing not in u.get('ingredientes_gustan', []):
                 u['ingredientes_gustan'].append(ing)
             messagebox.showinfo('OK', f'{ing} marcado como gusta')
-            self._update_side_panel()
+            self._perfil_modificado()
         else:
             if ing in u.get('ingredientes_gustan', []):
                 u['ingredientes_gustan'].remove(ing)
             if ing not in u.get('ingredientes_no_gustan', []):
                 u['ingredientes_no_gustan'].append(ing)
             messagebox.showinfo('OK', f'{ing} marcado como no gusta')
-            self._update_side_panel()
+            self._perfil_modificado()
 
     def _mark_ingred_neutral(self, listbox: tk.Listbox):
         sel = listbox.curselection()
@@ -329,7 +629,7 @@ class RecommenderGUI:
         if ing in u.get('ingredientes_no_gustan', []):
             u['ingredientes_no_gustan'].remove(ing)
         messagebox.showinfo('OK', f'{ing} marcado como neutral')
-        self._update_side_panel()
+        self._perfil_modificado()
 
     def _open_restricciones(self):
         # Ventana para ver y editar restricciones y alergias
@@ -343,8 +643,7 @@ class RecommenderGUI:
         scrollbar = tk.Scrollbar(list_frame, command=lst.yview)
         scrollbar.pack(side='right', fill='y')
         lst.config(yscrollcommand=scrollbar.set)
-        options = sorted({ing.lower() for p in self.platillos for ing in p.get('ingredients', [])})
-        for opt in options:
+        for opt in self.modelo.ingredientes:
             lst.insert('end', opt)
         btns = tk.Frame(win)
         btns.pack(side='left', padx=8, pady=8)
@@ -405,7 +704,7 @@ class RecommenderGUI:
             messagebox.showinfo('Preset aplicado', f"Se añadieron a restricciones: {', '.join(added)}")
         else:
             messagebox.showinfo('Preset', 'No había cambios (ya aplicado)')
-        self._update_side_panel()
+        self._perfil_modificado()
 
     def _remove_preset(self, name: str):
         u = self._current_usuario()
@@ -420,7 +719,7 @@ class RecommenderGUI:
             messagebox.showinfo('Preset removido', f"Se quitaron de restricciones: {', '.join(removed)}")
         else:
             messagebox.showinfo('Preset', 'No había elementos del preset en las restricciones')
-        self._update_side_panel()
+        self._perfil_modificado()
 
     def _toggle_alergia(self, listbox: tk.Listbox):
         sel = listbox.curselection()
@@ -434,7 +733,7 @@ class RecommenderGUI:
         else:
             u['alergias'].append(ing)
             messagebox.showinfo('OK', f'{ing} añadida a alergias')
-        self._update_side_panel()
+        self._perfil_modificado()
 
     def _toggle_restriccion(self, listbox: tk.Listbox):
         sel = listbox.curselection()
@@ -448,24 +747,98 @@ class RecommenderGUI:
         else:
             u['restricciones'].append(ing)
             messagebox.showinfo('OK', f'{ing} añadida a restricciones')
-        self._update_side_panel()
+        self._perfil_modificado()
 
     def _ver_recomendaciones(self):
-        try:
-            u = self._current_usuario()
-            recs = recomendar_platillos_bn(self.platillos, u, disponibilidad_ingredientes=self.disponibilidad, normalize=True)
-        except Exception as e:
-            messagebox.showerror('Error', f'Error al calcular recomendaciones: {e}')
+        """Abre (o trae al frente) la ventana de recomendaciones y lanza el cálculo.
+
+        El cálculo corre en segundo plano; mientras, la ventana muestra una
+        barra de progreso y un botón para cancelarlo. Con la ventana abierta,
+        cada cambio de perfil la recalcula (ver `_programar_recalculo`).
+        """
+        if self._win_recs is not None and self._win_recs.winfo_exists():
+            self._win_recs.lift()
+        else:
+            win = tk.Toplevel(self.root)
+            win.title('Recomendaciones')
+            win.protocol('WM_DELETE_WINDOW', self._cerrar_recomendaciones)
+            estado = tk.Frame(win)
+            estado.pack(fill='x', padx=6, pady=6)
+            self.lbl_recs = tk.Label(estado, text='', font=UI['font_med'])
+            self.lbl_recs.pack(side='left')
+            self.btn_cancelar_recs = tk.Button(estado, text='Cancelar', font=UI['font_med'], command=self._cancelar_recomendaciones)
+            self.btn_cancelar_recs.pack(side='right')
+            self.progreso_recs = ttk.Progressbar(estado, mode='indeterminate', length=160)
+            self.progreso_recs.pack(side='right', padx=6)
+            self.txt_recs = tk.Text(win, width=80, height=20)
+            self.txt_recs.pack()
+            self._win_recs = win
+        self._recalcular_recomendaciones()
+
+    def _programar_recalculo(self):
+        """Recalcula las recomendaciones abiertas cuando el perfil deja de cambiar.
+
+        Cada cambio reinicia la espera de `UI['debounce_ms']`, así que marcar
+        muchos gustos seguidos produce un único cálculo.
+        """
+        if self._win_recs is None or not self._win_recs.winfo_exists():
             return
-        win = tk.Toplevel(self.root)
-        win.title('Recomendaciones')
-        txt = tk.Text(win, width=80, height=20)
-        txt.pack()
+        if self._id_debounce is not None:
+            self.root.after_cancel(self._id_debounce)
+        self._id_debounce = self.root.after(UI['debounce_ms'], self._recalcular_recomendaciones)
+
+    def _recalcular_recomendaciones(self):
+        self._id_debounce = None
+        if self._tarea_recs is not None and self._tarea_recs.activa():
+            self._tarea_recs.cancelar()
+        # El hilo trabaja sobre una copia: el perfil puede seguir cambiando
+        u = {k: list(v) if isinstance(v, list) else v for k, v in self._current_usuario().items()}
+        uid = self.usuario_id
+        self.lbl_recs.config(text='Calculando recomendaciones...')
+        self.btn_cancelar_recs.config(state='normal')
+        self.progreso_recs.start(10)
+        self._tarea_recs = TareaSegundoPlano(
+            self.root,
+            lambda cancelada, progreso: self.cache.recomendar(u, uid=uid, top_k=UI['top_recs']),
+            self._mostrar_recomendaciones,
+            self._error_recomendaciones,
+            tras=self._tarea_recs,
+        )
+
+    def _fin_calculo_recs(self, texto: str):
+        self.progreso_recs.stop()
+        self.btn_cancelar_recs.config(state='disabled')
+        self.lbl_recs.config(text=texto)
+
+    def _mostrar_recomendaciones(self, recs):
+        if self._win_recs is None or not self._win_recs.winfo_exists():
+            return
+        self._fin_calculo_recs(f'{len(recs)} recomendaciones')
+        self.txt_recs.delete('1.0', 'end')
         for p in recs:
-            txt.insert('end', f"[{p['id']}] {p.get('name','')} - P={p.get('probability',0):.2f}\n")
+            self.txt_recs.insert('end', f"[{p['id']}] {p.get('name','')} - P={p.get('probability',0):.2f}\n")
+
+    def _error_recomendaciones(self, error: Exception):
+        if self._win_recs is not None and self._win_recs.winfo_exists():
+            self._fin_calculo_recs('Error')
+        messagebox.showerror('Error', f'Error al calcular recomendaciones: {error}')
+
+    def _cancelar_recomendaciones(self):
+        if self._id_debounce is not None:
+            self.root.after_cancel(self._id_debounce)
+            self._id_debounce = None
+        if self._tarea_recs is not None and self._tarea_recs.activa():
+            self._tarea_recs.cancelar()
+            self._fin_calculo_recs('Cálculo cancelado')
+
+    def _cerrar_recomendaciones(self):
+        self._cancelar_recomendaciones()
+        self._win_recs.destroy()
+        self._win_recs = None
 
     def _guardar_y_salir(self):
-        guardar_red_simplificada(str(SN_PATH), self.red)
+        self._cancelar_recomendaciones()
+        self.diario.compactar()
         messagebox.showinfo('Guardado', 'Red semántica guardada. Saliendo...')
         self.root.quit()
 
@@ -2,19 +2,23 @@
 CLI de demostración para el recomendador.
 
 Este archivo contiene un cliente mínimo que carga los datos de platos y la
-red semántica (usuarios) desde `data/` y muestra por consola las
-recomendaciones devueltas por la función `recomendar_platillos_bn`.
+red semántica (usuarios) desde `data/` (o desde otro backend, ver
+`almacenamiento.py` y `--almacen`) y muestra por consola las
+recomendaciones devueltas por `RecommenderModel.recommend` (la misma lógica
+que `recomendar_platillos_bn`, pero compilando el catálogo una sola vez).
 
 Propósito: facilitar pruebas manuales rápidas y debugging.
 """
 
 import json
 from pathlib import Path
-from typing import Dict, Any
+from typing import List, Dict, Any
 import argparse
+import sys
+from contextlib import nullcontext
 
-from recomendador import recomendar_platillos_bn
-from herramientas_semanticas import cargar_red_simplificada
+from recomendador import RecommenderModel, EstadisticasRecomendacion, MOTORES
+from almacenamiento import Almacenamiento, AlmacenamientoJSON, abrir_almacenamiento
 
 
 # Rutas de datos relativas al proyecto
@@ -40,43 +44,76 @@ def pretty_platillo(p: Dict[str, Any]) -> str:
     return f"[{p['id']}] {p.get('name', '')} - ingredientes: {', '.join(p.get('ingredients', []))}"
 
 
-def main(user_id: str | None = None):
+def serializar_recomendaciones(recs) -> List[Dict[str, Any]]:
+    """Recomendaciones como dicts JSON-serializables (id, name, probability, score).
+
+    Las probabilidades nulas tienen score -inf, que no es JSON válido; se
+    emiten como `None` (`null`).
+    """
+    return [
+        {
+            'id': p['id'],
+            'name': p.get('name', ''),
+            'probability': p.get('probability', 0.0),
+            'score': p.get('score') if p.get('probability', 0.0) > 0 else None,
+        }
+        for p in recs
+    ]
+
+
+def registro_jsonl(uid: str, recs) -> str:
+    """Serializa las recomendaciones de un usuario como una línea JSON."""
+    return json.dumps({'usuario': uid, 'recomendaciones': serializar_recomendaciones(recs)}, ensure_ascii=False)
+
+
+def main(user_id: str | None = None, formato: str = 'text', top_k: int | None = None, motor: str = 'numpy', perfilar: bool = False, almacen: Almacenamiento | None = None, catalogo: str | None = None):
     """Punto de entrada principal usado cuando se ejecuta el módulo.
 
     Si `user_id` es None se mostrarán las recomendaciones para todos los
-    usuarios presentes en `data/red_semantica.json`. La función carga
-    platos, disponibilidad de ingredientes y la red semántica antes de
-    invocar a la BN.
+    usuarios presentes en `data/red_semantica.json`, calculadas en lote con
+    `RecommenderModel.recomendar_lote` mientras se leen en streaming (memoria
+    constante). Un `user_id` concreto se busca con el índice de
+    desplazamientos de la red, sin cargarla entera. La función carga platos,
+    disponibilidad de ingredientes y la red semántica antes de invocar a la BN.
+
+    `formato` puede ser 'text' (salida legible) o 'jsonl' (una línea JSON por
+    usuario, emitida en cuanto está lista). Con `top_k` solo se muestran los
+    `top_k` mejores platos no vetados de cada usuario. `motor` elige la
+    inferencia ('numpy', 've' o 'pgmpy'). Con `perfilar` se imprime al final el
+    tiempo acumulado de cada fase del recomendador (a stderr en modo jsonl,
+    para no mezclarlo con el flujo de resultados). `almacen` es el backend de
+    datos (por defecto los JSON de `data/`). Con `catalogo` (ruta de un
+    catálogo binario, ver `catalogo_compilado.py`) el modelo se carga ya
+    compilado en lugar de compilar platos y disponibilidad del backend.
     """
-    platillos = load_json(DISHESPATH)
-    disponibilidad = load_json(DISP_INGS_PATH)
-
-    sn_path = DATA_DIR / 'red_semantica.json'
-    red = cargar_red_simplificada(str(sn_path)) if sn_path.exists() else {'usuarios': {}}
+    if almacen is None:
+        almacen = AlmacenamientoJSON(str(DATA_DIR))
+    estadisticas = EstadisticasRecomendacion() if perfilar else None
+    # El catálogo se compila una vez y se reutiliza para todos los usuarios
+    with estadisticas.fase('compilacion') if estadisticas is not None else nullcontext():
+        if catalogo is not None:
+            modelo = RecommenderModel.desde_catalogo(catalogo)
+        else:
+            modelo = RecommenderModel(almacen.platillos(), almacen.disponibilidad())
 
-    if not red['usuarios']:
+    def red_vacia():
         print('La red semántica está vacía. Pobla `data/red_semantica.json` con usuarios.')
-        return
 
-
-    def show_for(uid, perfil):
+    def show_for(uid, perfil, recs_post):
         """Imprime por consola las recomendaciones (posterior BN) del usuario.
 
-        Se encapsula la llamada a `recomendar_platillos_bn` para separar
-        la lógica de presentación del resto del flujo.
+        Recibe las recomendaciones ya calculadas para separar la lógica de
+        presentación del cálculo (individual o en lote).
         """
-        print(f"Usuario: {perfil.get('nombre', uid)} (id={uid}) [BN]")
-        try:
-            # Usar solo la posterior de la BN (una probabilidad por plato)
-            recs_post = recomendar_platillos_bn(platillos, perfil, disponibilidad_ingredientes=disponibilidad, normalize=True)
-        except Exception as e:
-            print('Error al ejecutar la BN:', e)
+        if formato == 'jsonl':
+            print(registro_jsonl(uid, recs_post), flush=True)
             return
+        print(f"Usuario: {perfil.get('nombre', uid)} (id={uid}) [BN]")
         if not recs_post:
             print('  -> No hay recomendaciones seguras para este usuario.')
             print('\n' + '-'*40 + '\n')
             return
-        # mostrar TODOS los platillos con la probabilidad posterior (BN)
+        # mostrar los platillos (todos, o los top_k) con la probabilidad posterior (BN)
         for p in recs_post:
             print(f"  - {pretty_platillo(p)}  (P_posterior={p.get('probability', 0):.2f}, score={p.get('score'):.3f})")
         print('\n')
@@ -84,28 +121,76 @@ def main(user_id: str | None = None):
 
     # Si se solicitó un user_id concreto, mostrar solo ese usuario
     if user_id:
-        if user_id in red['usuarios']:
-            show_for(user_id, red['usuarios'][user_id])
+        perfil = almacen.obtener_usuario(user_id)
+        if perfil is not None:
+            try:
+                # Usar solo la posterior de la BN (una probabilidad por plato)
+                recs_post = modelo.recommend(perfil, motor=motor, top_k=top_k, estadisticas=estadisticas)
+            except Exception as e:
+                print('Error al ejecutar la BN:', e)
+                return
+            show_for(user_id, perfil, recs_post)
+        elif next(almacen.iterar_usuarios(), None) is None:
+            red_vacia()
+            return
         else:
             print(f"Usuario '{user_id}' no encontrado en la red semántica.")
     else:
-        # Mostrar para todos los usuarios
-        for uid, perfil in red['usuarios'].items():
-            show_for(uid, perfil)
+        # Mostrar para todos los usuarios, puntuados en lote (el lote es la
+        # forma cerrada; con el motor pgmpy se recomienda usuario a usuario).
+        # Los usuarios se leen en streaming del backend; solo se retienen los
+        # perfiles del bloque en curso.
+        perfiles: Dict[str, Dict[str, Any]] = {}
+
+        def pares():
+            for uid, perfil in almacen.iterar_usuarios():
+                perfiles[uid] = perfil
+                yield uid, perfil
+
+        mostrados = 0
+        try:
+            if motor == 'numpy':
+                for uid, recs_post in modelo.recomendar_lote(pares(), top_k=top_k, estadisticas=estadisticas):
+                    show_for(uid, perfiles.pop(uid), recs_post)
+                    mostrados += 1
+            else:
+                for uid, perfil in almacen.iterar_usuarios():
+                    show_for(uid, perfil, modelo.recommend(perfil, motor=motor, top_k=top_k, estadisticas=estadisticas))
+                    mostrados += 1
+        except Exception as e:
+            print('Error al ejecutar la BN:', e)
+        if not mostrados:
+            red_vacia()
+            return
+
+    if estadisticas is not None:
+        print(estadisticas.reporte(), file=sys.stderr if formato == 'jsonl' else sys.stdout)
 
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Mostrar todas las recomendaciones BN desde la red semántica (siempre normalizado)')
     parser.add_argument('user_id', nargs='?', help='ID del usuario a mostrar (opcional)')
+    parser.add_argument('--all', action='store_true', help='Recomendar a todos los usuarios en lote sin preguntar')
+    parser.add_argument('--format', choices=('text', 'jsonl'), default='text', help='Formato de salida (jsonl: una línea por usuario)')
+    parser.add_argument('--top', type=int, default=None, metavar='K', help='Mostrar solo los K mejores platos no vetados')
+    parser.add_argument('--motor', choices=MOTORES, default='numpy', help='Motor de inferencia (ve: eliminación de variables propia; pgmpy: referencia, lento)')
+    parser.add_argument('--profile', action='store_true', help='Mostrar el tiempo acumulado por fase del recomendador')
+    parser.add_argument('--catalogo', metavar='RUTA', default=None, help='Cargar el catálogo binario precompilado (python catalogo_compilado.py construir)')
+    parser.add_argument('--almacen', metavar='SPEC', default=None, help='Backend de datos: json:<directorio> (por defecto data/) o sqlite:<archivo>')
     args = parser.parse_args()
 
     # pedir user_id si no se pasó (ENTER -> mostrar todos)
     user_id = args.user_id
-    if not user_id:
+    if not user_id and not args.all:
         try:
             user_input = input('ID de usuario (ENTER para mostrar todos): ').strip()
         except EOFError:
             user_input = ''
         user_id = user_input or None
 
-    main(user_id)
+    almacen = abrir_almacenamiento(args.almacen) if args.almacen else None
+    try:
+        main(None if args.all else user_id, formato=args.format, top_k=args.top, motor=args.motor, perfilar=args.profile, almacen=almacen, catalogo=args.catalogo)
+    finally:
+        if almacen is not None:
+            almacen.cerrar()
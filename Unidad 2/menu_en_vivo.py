@@ -0,0 +1,163 @@
+"""
+Tablero de recomendaciones "en vivo" para un servicio con stock cambiante.
+
+`MenuEnVivo` mantiene, para cada usuario registrado, los pesos base de cada
+plato (todas las fases del recomendador salvo la penalización por
+disponibilidad) y los pesos actuales. Cuando cambia el stock de un
+ingrediente solo se re-puntúan los platos que lo contienen (aplicando o
+retirando el factor 0.2) y se emiten los rankings que cambiaron, sin volver
+a ejecutar `recomendar_platillos_bn` para cada usuario.
+"""
+
+from bisect import bisect_left, insort
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from recomendador import RecommenderModel, Recomendacion
+
+
+class _RankingUsuario:
+    """Estado de un usuario en el tablero.
+
+    `orden` son las claves `(-peso, plato)` de los platos con peso > 0,
+    ordenadas: el mismo orden que la salida de `recommend` (a igual peso,
+    orden del catálogo). `ceros` son los platos con peso 0 (fijos: un cambio
+    de stock no anula ni recupera un peso) y `total` la suma de los pesos.
+    `ranking` es la lista ya construida, o None hasta que se pida.
+    """
+
+    __slots__ = ('base', 'pesos', 'orden', 'ceros', 'total', 'ranking')
+
+    def __init__(self, base: np.ndarray, factores: np.ndarray):
+        self.base = base
+        self.pesos = base * factores
+        positivos = np.flatnonzero(self.pesos > 0)
+        self.orden: List[Tuple[float, int]] = sorted(zip((-self.pesos[positivos]).tolist(), positivos.tolist()))
+        self.ceros: List[int] = np.flatnonzero(self.pesos <= 0).tolist()
+        self.total = float(self.pesos[positivos].sum())
+        self.ranking: Optional[Sequence[Recomendacion]] = None
+
+
+class RankingCompleto(Sequence):
+    """Ranking completo de un usuario: una `Recomendacion` por plato, de mayor a menor probabilidad.
+
+    Copia el orden y los pesos del momento en que se crea (cambios de stock
+    posteriores no lo alteran) y construye cada `Recomendacion` al acceder a
+    ella: emitirlo cuesta copiar dos arreglos, no crear un objeto por plato.
+    """
+
+    def __init__(self, modelo: RecommenderModel, claves: List[Tuple[float, int]], ceros: List[int], pesos: np.ndarray, total: float):
+        self._modelo = modelo
+        self._claves = claves
+        self._ceros = ceros
+        self._pesos = pesos
+        self._total = total
+
+    def __len__(self) -> int:
+        return len(self._claves) + len(self._ceros)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        d = self._claves[i][1] if i < len(self._claves) else self._ceros[i - len(self._claves)]
+        return self._modelo.recomendacion(d, float(self._pesos[d]) / self._total if self._total > 0 else 0.0)
+
+
+class MenuEnVivo:
+    """Recomendaciones cacheadas por usuario con actualización incremental de stock.
+
+    - `modelo`: catálogo compilado; `aplicar_disponibilidad` lo actualiza.
+    - `top_k`: si se indica, el ranking de cada usuario son sus `top_k`
+      mejores platos (lista de `Recomendacion`); si no, todos los platos
+      (`RankingCompleto`).
+
+    Cada usuario guarda sus platos ordenados por peso (`_RankingUsuario`).
+    Un cambio de stock saca y reinserta (bisect) solo las claves de los
+    platos afectados, y la lista de recomendaciones se construye al pedirla
+    (o al emitirla porque cambió el orden), no en cada cambio.
+    """
+
+    def __init__(self, modelo: RecommenderModel, usuarios: Optional[Dict[str, Dict[str, Any]]] = None, top_k: Optional[int] = None):
+        self.modelo = modelo
+        self.top_k = top_k
+        self._usuarios: Dict[str, _RankingUsuario] = {}
+        for uid, usuario in (usuarios or {}).items():
+            self.registrar_usuario(uid, usuario)
+
+    def registrar_usuario(self, uid: str, usuario: Dict[str, Any]) -> Sequence[Recomendacion]:
+        """Calcula (o recalcula) el ranking de `uid` y lo guarda en el tablero."""
+        base = np.asarray(self.modelo.pesos(self.modelo.normalizar_perfil(usuario), con_disponibilidad=False), dtype=np.float64)
+        self._usuarios[uid] = _RankingUsuario(base, np.asarray(self.modelo.factor_disponibilidad, dtype=np.float64))
+        return self.recomendaciones(uid)
+
+    def quitar_usuario(self, uid: str) -> None:
+        """Elimina a `uid` del tablero."""
+        self._usuarios.pop(uid, None)
+
+    def recomendaciones(self, uid: str) -> Sequence[Recomendacion]:
+        """Ranking actual de `uid` (KeyError si no está registrado)."""
+        estado = self._usuarios[uid]
+        if estado.ranking is None:
+            estado.ranking = self._ranking(estado)
+        return estado.ranking
+
+    def usuarios(self) -> List[str]:
+        return list(self._usuarios)
+
+    def _ranking(self, estado: _RankingUsuario) -> Sequence[Recomendacion]:
+        if self.top_k is None:
+            return RankingCompleto(self.modelo, list(estado.orden), estado.ceros, estado.pesos.copy(), estado.total)
+        mejores = {d: -clave for clave, d in estado.orden[:self.top_k]}
+        return self.modelo.seleccionar_top(mejores, self.top_k, estado.total)
+
+    def aplicar_disponibilidad(self, cambios: Dict[str, bool]) -> Dict[str, Sequence[Recomendacion]]:
+        """Aplica cambios de stock ({ingrediente: disponible}) y re-puntúa lo afectado.
+
+        Solo los platos que contienen algún ingrediente modificado cambian de
+        peso (peso = base · 0.2^k) y de posición en el orden de cada usuario.
+        Los usuarios para los que ninguno de esos platos tenía peso (p. ej.
+        vetados) no se tocan. Devuelve `{uid: ranking}` con los usuarios cuyo
+        orden de platos (con `top_k`, sus `top_k` primeros) cambió; las
+        probabilidades de los demás se recalculan cuando se piden.
+        """
+        afectados = self.modelo.actualizar_disponibilidad(cambios)
+        if not afectados:
+            return {}
+        idx = np.fromiter(afectados, dtype=np.intp, count=len(afectados))
+        factores = np.asarray(self.modelo.factor_disponibilidad, dtype=np.float64)[idx]
+
+        cambiados: Dict[str, Sequence[Recomendacion]] = {}
+        for uid, estado in self._usuarios.items():
+            base_afectada = estado.base[idx]
+            con_peso = np.flatnonzero(base_afectada > 0)
+            if not len(con_peso):
+                continue
+            platos = idx[con_peso].tolist()
+            anteriores = estado.pesos[idx[con_peso]].tolist()
+            nuevos = (base_afectada[con_peso] * factores[con_peso]).tolist()
+            orden = estado.orden
+            if self.top_k is None:
+                # Mismo conjunto de claves: el orden se mantiene si y solo si
+                # ningún plato afectado cambia de posición
+                posiciones = [bisect_left(orden, (-w, d)) for d, w in zip(platos, anteriores)]
+            else:
+                primeros = [d for _, d in orden[:self.top_k]]
+            for d, w in zip(platos, anteriores):
+                del orden[bisect_left(orden, (-w, d))]
+            for d, w in zip(platos, nuevos):
+                insort(orden, (-w, d))
+            estado.pesos[idx[con_peso]] = nuevos
+            estado.total += sum(nuevos) - sum(anteriores)
+            estado.ranking = None
+            if self.top_k is None:
+                cambio = posiciones != [bisect_left(orden, (-w, d)) for d, w in zip(platos, nuevos)]
+            else:
+                cambio = primeros != [d for _, d in orden[:self.top_k]]
+            if cambio:
+                cambiados[uid] = self.recomendaciones(uid)
+        return cambiados
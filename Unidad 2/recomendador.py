@@ -16,37 +16,210 @@ Flujo general:
      platos marcados como `platos_gustan` (Jaccard) y aplicar un pequeño
      "boost" directo a los platos explicitamente marcados como gusta.
   6. Renormalizar y devolver la lista de platos con su probabilidad.
+
+La estructura de la BN es un naive Bayes (Plato -> cada Ingred__), por lo que
+la posterior del paso 2 tiene forma cerrada: con prior uniforme,
+
+    P(Plato=d | likes) ∝ Π_{i ∈ likes} (0.8 si i ∈ d, 0.1 si no)
+
+`posterior_cerrada` la calcula en espacio logarítmico: salvo una constante,
+el log-posterior de cada plato es log(0.8/0.1) por cada ingrediente de la
+evidencia que contiene, y el modelo cuenta esas coincidencias sobre las
+listas del índice invertido. La ruta con
+pgmpy (`motor='pgmpy'`) se conserva como referencia para verificación.
+`motor='ve'` hace inferencia exacta sobre la misma red con el motor propio de
+`eliminacion_variables` (planes y factores cacheados entre consultas); la red
+puede incluir capas extra por plato (`CAPAS_OPCIONALES`, p. ej. cocina o
+categoría) sin cambiar la posterior mientras no se observen.
+
+`RecommenderModel` compila el catálogo (platos + disponibilidad) una sola
+vez: ingredientes internados como enteros, un bitset de ingredientes por
+plato, la matriz de incidencia y, bajo demanda, la BN de pgmpy. Después
+`recommend(usuario)` solo hace el trabajo que depende del perfil.
+`recomendar_platillos_bn` se mantiene como envoltorio de una sola llamada y
+`recomendar_lote` puntúa muchos usuarios a la vez con operaciones matriciales.
+`RecommenderModel.desde_catalogo` carga un catálogo ya compilado en formato
+binario (ver `catalogo_compilado`) sin volver a compilarlo.
+
+Todas las rutas aceptan un `EstadisticasRecomendacion` opcional que acumula
+el tiempo de cada fase y algunos contadores (CPDs construidas, tamaño de la
+evidencia, platos vetados) para saber dónde se va el tiempo por solicitud.
 """
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple, Iterable, Iterator, Optional, Union
+from collections import OrderedDict
+from itertools import islice
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+import heapq
+import json
 import math
+import threading
+import time
 
-# Import directo de pgmpy (se espera que esté instalado en el entorno)
-from pgmpy.models import DiscreteBayesianNetwork
-from pgmpy.factors.discrete import TabularCPD
-from pgmpy.inference import VariableElimination
+import numpy as np
 
+from similitud_platos import similitudes_jaccard, fila_jaccard, IndiceMinHash, MAX_PARES_SIMILITUD
 
-def recomendar_platillos_bn(platillos: List[Dict[str, Any]], usuario: Dict[str, Any], disponibilidad_ingredientes: Dict[str, bool] = None, normalize: bool = True) -> List[Dict[str, Any]]:
-    """Calcula recomendaciones usando una Red Bayesiana simple.
 
-    Entradas:
-      - platillos: lista de dicts con keys 'id', 'name', 'ingredients', 'available'
-      - usuario: perfil con campos esperados (platos_gustan, platos_no_gustan,
-        ingredientes_gustan, alergias, restricciones, ingredientes_no_gustan).
-      - disponibilidad_ingredientes: mapping ingrediente -> bool (opcional).
+# Probabilidades de las CPDs de ingrediente: P(present | Plato)
+PROB_PRESENTE_SI_CONTIENE = 0.8
+PROB_PRESENTE_NO_CONTIENE = 0.1
 
-    Salida: lista de diccionarios de plato con campos adicionales:
-      - 'probability': probabilidad posterior normalizada
-      - 'score': log(probability) para ranking estable
+# Factores de las fases 3-5 (penalizaciones y refuerzos multiplicativos)
+FACTOR_INGRED_NO_GUSTA = 0.1
+FACTOR_NO_DISPONIBLE = 0.2
+ALPHA_SIMILITUD = 1.0
+BOOST_PLATO_GUSTA = 1.3
+
+# Campos opcionales de los platos que se añaden como nodos hijos de `Plato`
+# en la red del motor 've' (solo si algún plato los tiene)
+CAPAS_OPCIONALES = ('cuisine', 'category')
+PROB_CAPA_PROPIA = 0.9
+
+MOTORES = ('numpy', 've', 'pgmpy')
+
+# Usuarios por bloque en `recomendar_lote` (acota la memoria a bloque×platos)
+TAM_BLOQUE_LOTE = 512
+
+# Pares plato-similitud que el modelo guarda como máximo en la caché LRU de
+# filas Jaccard calculadas bajo demanda
+MAX_PARES_FILAS_SIMILITUD = 500_000
+
+
+class EstadisticasRecomendacion:
+    """Tiempos por fase y contadores acumulados de una o varias recomendaciones.
+
+    Se pasa como `estadisticas=` a `recomendar_platillos_bn`,
+    `RecommenderModel.recommend` o `recomendar_lote`; cada fase suma su
+    tiempo de pared en `tiempos` (segundos) y sus contadores en `contadores`.
+    Las fases de la ruta pgmpy son 'construccion_bn', 'check_model' y
+    'consulta_ve' (el motor 've' registra las mismas salvo 'check_model');
+    la forma cerrada registra 'posterior'. Comunes: 'compilacion',
+    'vetos', 'penalizaciones', 'similitud' y 'normalizacion'.
     """
-    # Normalizar diversos campos del perfil de usuario a conjuntos en minúsculas
-    likes = set(i.lower() for i in usuario.get('likes', []) or usuario.get('ingredientes_gustan', []))
-    allergies = set(i.lower() for i in usuario.get('allergies', []) or usuario.get('alergias', []))
-    restrictions = set(i.lower() for i in usuario.get('restricciones', []) or usuario.get('restricciones', []))
-    platos_no_gustan = set(usuario.get('platos_no_gustan', []))
-    platos_gustan = set(str(x) for x in usuario.get('platos_gustan', []) or [])
-    ingredientes_no_gustan = set(i.lower() for i in usuario.get('ingredientes_no_gustan', []) or usuario.get('ingredientes_no_gustan', []))
+
+    def __init__(self):
+        self.tiempos: Dict[str, float] = {}
+        self.contadores: Dict[str, int] = {}
+
+    @contextmanager
+    def fase(self, nombre: str):
+        """Context manager que suma a `tiempos[nombre]` la duración del bloque."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.tiempos[nombre] = self.tiempos.get(nombre, 0.0) + (time.perf_counter() - inicio)
+
+    def contar(self, nombre: str, n: int = 1) -> None:
+        self.contadores[nombre] = self.contadores.get(nombre, 0) + n
+
+    def como_dict(self) -> Dict[str, Any]:
+        return {'tiempos': dict(self.tiempos), 'contadores': dict(self.contadores)}
+
+    def reporte(self) -> str:
+        """Resumen legible: tiempo total, medio por solicitud y % por fase."""
+        solicitudes = self.contadores.get('solicitudes', 0)
+        total = sum(self.tiempos.values())
+        lineas = [f"Perfil del recomendador ({solicitudes} solicitudes, {total * 1000:.2f} ms en total)"]
+        for nombre, t in sorted(self.tiempos.items(), key=lambda item: item[1], reverse=True):
+            medio = (t / solicitudes * 1000) if solicitudes else 0.0
+            pct = (t / total * 100) if total > 0 else 0.0
+            lineas.append(f"  {nombre:<16}{t * 1000:>10.3f} ms  {medio:>9.3f} ms/sol  {pct:>5.1f}%")
+        for nombre, n in sorted(self.contadores.items()):
+            if nombre != 'solicitudes':
+                lineas.append(f"  #{nombre:<23}{n:>10}")
+        return '\n'.join(lineas)
+
+
+def _fase(estadisticas: Optional[EstadisticasRecomendacion], nombre: str):
+    """`estadisticas.fase(nombre)` o un contexto vacío si no se instrumenta."""
+    return estadisticas.fase(nombre) if estadisticas is not None else nullcontext()
+
+
+def _normalizar_perfil(usuario: Dict[str, Any]) -> Dict[str, set]:
+    """Normaliza los campos del perfil de usuario a conjuntos (ingredientes en minúsculas)."""
+    return {
+        'likes': set(i.lower() for i in usuario.get('likes', []) or usuario.get('ingredientes_gustan', [])),
+        'allergies': set(i.lower() for i in usuario.get('allergies', []) or usuario.get('alergias', [])),
+        'restrictions': set(i.lower() for i in usuario.get('restricciones', []) or usuario.get('restricciones', [])),
+        'platos_no_gustan': set(usuario.get('platos_no_gustan', [])),
+        'platos_gustan': set(str(x) for x in usuario.get('platos_gustan', []) or []),
+        'ingredientes_no_gustan': set(i.lower() for i in usuario.get('ingredientes_no_gustan', []) or usuario.get('ingredientes_no_gustan', [])),
+    }
+
+
+def construir_matriz_incidencia(platillos: List[Dict[str, Any]]) -> Tuple[Tuple[str, ...], List[str], np.ndarray]:
+    """Construye la matriz de incidencia plato×ingrediente del catálogo.
+
+    Devuelve `(ids_platos, ingredientes, incidencia)` donde `ingredientes` es
+    la lista ordenada de ingredientes en minúsculas e `incidencia[d, i]` vale
+    1.0 si el plato `d` contiene el ingrediente `i`.
+    """
+    ids_platos = tuple(str(plato.get('id')) for plato in platillos)
+    ingredientes = sorted({ing.lower() for plato in platillos for ing in plato.get('ingredients', [])})
+    indice = {ing: i for i, ing in enumerate(ingredientes)}
+    incidencia = np.zeros((len(ids_platos), len(ingredientes)), dtype=np.float64)
+    for d, plato in enumerate(platillos):
+        for ing in plato.get('ingredients', []):
+            incidencia[d, indice[ing.lower()]] = 1.0
+    return ids_platos, ingredientes, incidencia
+
+
+def posterior_cerrada(incidencia: np.ndarray, indices_evidencia: Iterable[int]) -> np.ndarray:
+    """P(Plato | ingredientes presentes) en forma cerrada.
+
+    `indices_evidencia` son las columnas de `incidencia` observadas como
+    'present'. Los ingredientes no observados se marginalizan (suman 1) y el
+    prior uniforme se cancela al normalizar, así que el log-posterior sin
+    normalizar es `incidencia @ w` con `w_i = log(0.8 / 0.1)` para cada
+    ingrediente de la evidencia (más una constante común a todos los platos).
+    """
+    return posterior_coincidencias(incidencia[:, list(indices_evidencia)].sum(axis=1))
+
+
+def posterior_coincidencias(coincidencias: np.ndarray) -> np.ndarray:
+    """Posterior en forma cerrada a partir de cuántos ingredientes de la evidencia tiene cada plato.
+
+    Es `posterior_cerrada` sin la matriz densa: `coincidencias[d]` se puede
+    contar desde el índice invertido (ver `RecommenderModel._coincidencias`).
+    """
+    log_post = np.asarray(coincidencias, dtype=np.float64) * math.log(PROB_PRESENTE_SI_CONTIENE / PROB_PRESENTE_NO_CONTIENE)
+    if not len(log_post):
+        return log_post
+    # softmax estable: restar el máximo antes de exponenciar
+    post = np.exp(log_post - log_post.max())
+    return post / post.sum()
+
+
+def _construir_bn(platillos: List[Dict[str, Any]], estadisticas: Optional[EstadisticasRecomendacion] = None):
+    """Construye la BN completa con pgmpy y su motor VariableElimination.
+
+    Es la implementación original de la fase 1; se mantiene como referencia
+    para verificar `posterior_cerrada` (`motor='pgmpy'`). Crea una TabularCPD
+    por ingrediente, por lo que es mucho más costosa que la forma cerrada.
+    Devuelve `(inferencia, vars_ingredientes)`.
+    """
+    # Import diferido: pgmpy solo es necesario para el motor de referencia
+    from pgmpy.inference import VariableElimination
+
+    with _fase(estadisticas, 'construccion_bn'):
+        model, vars_ingredientes, n_cpds = _crear_modelo_bn(platillos)
+    if estadisticas is not None:
+        estadisticas.contar('cpds_construidas', n_cpds)
+
+    with _fase(estadisticas, 'check_model'):
+        if not model.check_model():
+            raise RuntimeError('El modelo BN no pasó la validación de consistencia.')
+
+    return VariableElimination(model), vars_ingredientes
+
+
+def _crear_modelo_bn(platillos: List[Dict[str, Any]]):
+    """Crea la DiscreteBayesianNetwork con una TabularCPD por ingrediente (sin validarla)."""
+    from pgmpy.models import DiscreteBayesianNetwork
+    from pgmpy.factors.discrete import TabularCPD
 
     # Preparar estructuras auxiliares para construir la BN
     ids_platos = tuple(str(plato.get('id')) for plato in platillos)
@@ -73,30 +246,66 @@ def recomendar_platillos_bn(platillos: List[Dict[str, Any]], usuario: Dict[str,
             plato = mapa_platos[id_plato]
             ings_plato = {x.lower() for x in plato.get('ingredients', [])}
             if ing in ings_plato:
-                absent_row.append(0.2)
-                present_row.append(0.8)
+                absent_row.append(1.0 - PROB_PRESENTE_SI_CONTIENE)
+                present_row.append(PROB_PRESENTE_SI_CONTIENE)
             else:
-                absent_row.append(0.9)
-                present_row.append(0.1)
+                absent_row.append(1.0 - PROB_PRESENTE_NO_CONTIENE)
+                present_row.append(PROB_PRESENTE_NO_CONTIENE)
         cpd = TabularCPD(variable=var, variable_card=2, values=[absent_row, present_row],
                          evidence=[plato_var], evidence_card=[n_platos], state_names={var: ['absent','present'], plato_var: list(ids_platos)})
         cpds.append(cpd)
 
     model.add_cpds(*cpds)
-    if not model.check_model():
-        raise RuntimeError('El modelo BN no pasó la validación de consistencia.')
+    return model, vars_ingredientes, len(cpds)
+
+
+def _crear_red_discreta(platillos: List[Dict[str, Any]], capas: Iterable[str] = ()):
+    """La BN del recomendador como `RedDiscreta` para el motor 've'.
+
+    Mismas CPDs que `_crear_modelo_bn` (construidas por columnas sobre la
+    matriz de incidencia) y, por cada campo de `capas`, un nodo
+    `Capa__<campo>` hijo de `Plato` con P(valor propio del plato) =
+    PROB_CAPA_PROPIA y el resto repartido (uniforme si el plato no tiene el
+    campo). Devuelve `(red, vars_ingredientes)`.
+    """
+    from eliminacion_variables import RedDiscreta
+
+    ids_platos, ingredientes, incidencia = construir_matriz_incidencia(platillos)
+    n_platos = len(ids_platos)
+    red = RedDiscreta()
+    red.agregar_variable('Plato', ids_platos, cpd=np.full(n_platos, 1.0 / n_platos))
+    vars_ingredientes = [f'Ingred__{i.replace(" ","_")}' for i in ingredientes]
+    for i, var in enumerate(vars_ingredientes):
+        presente = np.where(incidencia[:, i] > 0, PROB_PRESENTE_SI_CONTIENE, PROB_PRESENTE_NO_CONTIENE)
+        red.agregar_variable(var, ['absent', 'present'], ['Plato'], np.stack([1.0 - presente, presente], axis=1))
+    for campo in capas:
+        valores = sorted({str(p[campo]) for p in platillos if p.get(campo) is not None})
+        if not valores:
+            continue
+        cpd = np.full((n_platos, len(valores)), 1.0 / len(valores))
+        if len(valores) > 1:
+            resto = (1.0 - PROB_CAPA_PROPIA) / (len(valores) - 1)
+            for d, plato in enumerate(platillos):
+                if plato.get(campo) is not None:
+                    cpd[d] = resto
+                    cpd[d, valores.index(str(plato[campo]))] = PROB_CAPA_PROPIA
+        red.agregar_variable(f'Capa__{campo}', valores, ['Plato'], cpd)
+    return red, vars_ingredientes
+
 
+def _consultar_bn(inferencia, vars_ingredientes: List[str], ids_platos: Tuple[str, ...], likes: set, estadisticas: Optional[EstadisticasRecomendacion] = None) -> Dict[str, float]:
+    """Ejecuta la consulta P(Plato | likes) sobre la BN de pgmpy."""
+    n_platos = len(ids_platos)
     mapa_indice_plato = {pid: i for i, pid in enumerate(ids_platos)}
 
-    # --- Fase 1: inferencia BN base usando solamente 'likes' como evidencia ---
-    inferencia = VariableElimination(model)
     evidencia: Dict[str, str] = {}
     for ing in likes:
         key = f'Ingred__{ing.replace(" ","_")}'
         if key in vars_ingredientes:
             evidencia[key] = 'present'
 
-    q = inferencia.query(variables=['Plato'], evidence=evidencia, show_progress=False)
+    with _fase(estadisticas, 'consulta_ve'):
+        q = inferencia.query(variables=['Plato'], evidence=evidencia, show_progress=False)
     dist_plato = q['Plato'] if isinstance(q, dict) else q
 
     probabilidades: Dict[str, float] = {}
@@ -121,68 +330,675 @@ def recomendar_platillos_bn(platillos: List[Dict[str, Any]], usuario: Dict[str,
                 probabilidades[k] = float(v)
         except Exception:
             probabilidades = {id_plato: 1.0 / n_platos for id_plato in ids_platos}
+    return probabilidades
 
-    # --- Fase 2: aplicar vetos deterministas ---
-    for id_plato in list(probabilidades.keys()):
-        plato = mapa_platos[id_plato]
-        ings_plato = {i.lower() for i in plato.get('ingredients', [])}
-        if str(id_plato) in platos_no_gustan:
-            probabilidades[id_plato] = 0.0
-            continue
-        if ings_plato & allergies:
-            probabilidades[id_plato] = 0.0
-            continue
-        if ings_plato & restrictions:
-            probabilidades[id_plato] = 0.0
-            continue
 
-    # --- Fase 3: aplicar penalizaciones multiplicativas ---
-    factor_penalizacion_ingred_no_gusta = 0.1
-    factor_penalizacion_no_disponible = 0.2
-    for id_plato in list(probabilidades.keys()):
-        if probabilidades[id_plato] <= 0:
-            continue
-        plato = mapa_platos[id_plato]
-        ings_plato = {i.lower() for i in plato.get('ingredients', [])}
-        if disponibilidad_ingredientes is not None:
-            for ing in ings_plato:
-                if not disponibilidad_ingredientes.get(ing, True):
-                    probabilidades[id_plato] *= factor_penalizacion_no_disponible
-        if ingredientes_no_gustan and (ings_plato & ingredientes_no_gustan):
-            probabilidades[id_plato] *= factor_penalizacion_ingred_no_gusta
-
-    # --- Reforzar platos similares ---
-    ingredientes_referencia = set()
-    for pid in platos_gustan:
-        if pid in mapa_platos:
-            ingredientes_referencia |= {i.lower() for i in mapa_platos[pid].get('ingredients', [])}
-
-    if ingredientes_referencia:
-        alpha_sim = 1.0
-        for id_plato in list(probabilidades.keys()):
-            if probabilidades[id_plato] <= 0:
+class Recomendacion:
+    """Resultado ligero de `recommend(..., top_k=k)`.
+
+    No copia el dict del plato: guarda una referencia a él junto con la
+    probabilidad y el score. Admite el mismo acceso que los dicts de la
+    salida completa (`r['id']`, `r.get('name')`, `r['probability']`), por lo
+    que el código de presentación sirve para ambos formatos.
+    """
+
+    __slots__ = ('plato', 'probability', 'score')
+
+    def __init__(self, plato: Dict[str, Any], probability: float, score: float):
+        self.plato = plato
+        self.probability = probability
+        self.score = score
+
+    @property
+    def id(self) -> str:
+        return str(self.plato.get('id'))
+
+    @property
+    def name(self) -> str:
+        return self.plato.get('name', '')
+
+    def __getitem__(self, key: str) -> Any:
+        if key == 'probability':
+            return self.probability
+        if key == 'score':
+            return self.score
+        return self.plato[key]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def como_dict(self) -> Dict[str, Any]:
+        """Copia del plato con 'probability' y 'score' (formato de la salida completa)."""
+        d = dict(self.plato)
+        d['probability'] = self.probability
+        d['score'] = self.score
+        return d
+
+    def __repr__(self) -> str:
+        return f'Recomendacion(id={self.id!r}, probability={self.probability:.4f})'
+
+
+class RecommenderModel:
+    """Catálogo compilado listo para recomendar a muchos usuarios.
+
+    Todo lo que depende solo del catálogo se calcula una vez en el
+    constructor:
+      - `ingredientes` / `indice_ingrediente`: ingredientes internados
+        (minúsculas) a enteros 0..I-1.
+      - `bits_plato[d]`: bitset (int) con los ingredientes del plato `d`.
+      - `ingredientes_plato[d]`: ids (ordenados) de los ingredientes del plato.
+      - `platos_por_ingrediente[i]`: índice invertido, conjunto de platos
+        que contienen el ingrediente `i`; `indptr_t`/`indices_t` es el mismo
+        índice en arreglos (CSC), con el que se cuentan las coincidencias
+        de la posterior sin recorrer la matriz densa.
+      - `fila_similitud(d)`: fila dispersa {plato: Jaccard} con los platos
+        que comparten algún ingrediente con `d` (ver `similitud_platos`).
+        Se calcula al pedirla desde el índice invertido y se guarda en una
+        caché LRU acotada. La matriz completa (`similitudes`) solo se
+        calcula si se pide (`compilar_similitudes` o
+        `precomputar_similitudes=True`), con un máximo de pares: con
+        ingredientes populares es casi densa.
+      - `incidencia`: matriz plato×ingrediente densa para `recomendar_lote`
+        (con `desde_catalogo` se construye al primer uso si el archivo no la trae).
+      - `version`: contador que se incrementa con cada cambio de
+        disponibilidad; sirve para invalidar cachés de recomendaciones.
+      - `factor_disponibilidad[d]`: penalización 0.2^k por los `k`
+        ingredientes no disponibles del plato; `platos_con_faltantes` es el
+        conjunto de platos con k > 0.
+    Vetos y penalizaciones se resuelven como uniones de listas del índice
+    invertido, de modo que solo se tocan los platos afectados. Los cambios
+    de stock (`actualizar_disponibilidad`) recorren únicamente los platos que
+    contienen el ingrediente modificado.
+    La BN de pgmpy solo se construye (una vez) si se pide `motor='pgmpy'`, y
+    la del motor propio (`motor_eliminacion`) si se pide `motor='ve'`.
+    Un modelo puede compartirse entre hilos que recomiendan (p. ej. los
+    consumidores de `servicio_async`): la caché de filas de similitud y las
+    estructuras perezosas (incidencia, MinHash, redes) se protegen con
+    `_candado`. Los cambios de stock (`actualizar_disponibilidad`) no: no
+    deben hacerse con recomendaciones en curso.
+    """
+
+    def __init__(self, platillos: List[Dict[str, Any]], disponibilidad_ingredientes: Optional[Dict[str, bool]] = None, precomputar_similitudes: bool = False):
+        self.platillos = platillos
+        self.ids_platos, self.ingredientes, self._incidencia = construir_matriz_incidencia(platillos)
+        self.indice_ingrediente = {ing: i for i, ing in enumerate(self.ingredientes)}
+        self.indice_plato = {pid: d for d, pid in enumerate(self.ids_platos)}
+
+        self.bits_plato: List[int] = []
+        self.platos_por_ingrediente: List[set] = [set() for _ in self.ingredientes]
+        for d, plato in enumerate(platillos):
+            bits = 0
+            for ing in plato.get('ingredients', []):
+                i = self.indice_ingrediente[ing.lower()]
+                bits |= 1 << i
+                self.platos_por_ingrediente[i].add(d)
+            self.bits_plato.append(bits)
+        self.ingredientes_plato: List[Tuple[int, ...]] = [tuple(sorted({self.indice_ingrediente[ing.lower()] for ing in plato.get('ingredients', [])})) for plato in platillos]
+        self.indptr_t = np.zeros(len(self.ingredientes) + 1, dtype=np.int64)
+        self.indptr_t[1:] = np.cumsum([len(platos) for platos in self.platos_por_ingrediente])
+        self.indices_t = np.array([d for platos in self.platos_por_ingrediente for d in sorted(platos)], dtype=np.int64)
+
+        self.disponibilidad_ingredientes: Dict[str, bool] = dict(disponibilidad_ingredientes or {})
+        self.faltantes_por_plato: List[int] = [0] * len(self.ids_platos)
+        self.factor_disponibilidad: List[float] = [1.0] * len(self.ids_platos)
+        self.platos_con_faltantes: set = set()
+        for i, ing in enumerate(self.ingredientes):
+            if not self.disponibilidad_ingredientes.get(ing, True):
+                self._ajustar_faltantes(i, +1)
+
+        self.version = 0
+        self._candado = threading.RLock()
+        self._bn = None
+        self._ve = None
+        self.similitudes: Optional[List[Dict[int, float]]] = None
+        self.similitudes_top_k: Optional[int] = None
+        self._filas_similitud: 'OrderedDict[int, Dict[int, float]]' = OrderedDict()
+        self._pares_filas_similitud = 0
+        self._minhash: Optional[IndiceMinHash] = None
+        if precomputar_similitudes:
+            self.compilar_similitudes()
+
+    @classmethod
+    def desde_archivos(cls, path_platillos, path_disponibilidad=None) -> 'RecommenderModel':
+        """Compila el modelo a partir de `platillos.json` y (opcional) `ingredientes_disponibilidad.json`."""
+        with open(path_platillos, 'r', encoding='utf-8') as f:
+            platillos = json.load(f)
+        disponibilidad = None
+        if path_disponibilidad is not None and Path(path_disponibilidad).exists():
+            with open(path_disponibilidad, 'r', encoding='utf-8') as f:
+                disponibilidad = json.load(f)
+        return cls(platillos, disponibilidad)
+
+    @classmethod
+    def desde_catalogo(cls, catalogo) -> 'RecommenderModel':
+        """Carga el modelo desde un catálogo binario (ver `catalogo_compilado`).
+
+        `catalogo` es una ruta o un `CatalogoCompilado` ya abierto. No se
+        vuelve a parsear ni internar nada: los arreglos CSR/CSC, la similitud
+        y (si la trae) la incidencia densa quedan como memmaps de solo
+        lectura, compartidos entre procesos, y las estructuras por plato e
+        ingrediente son vistas que materializan cada fila al pedirla (ver
+        `catalogo_compilado`). Los platos se decodifican uno a uno al usarlos.
+        """
+        from catalogo_compilado import CatalogoCompilado, FilasCSR, ConjuntosCSR, BitsCSR
+        if not isinstance(catalogo, CatalogoCompilado):
+            catalogo = CatalogoCompilado(catalogo)
+        modelo = cls.__new__(cls)
+        modelo.platillos = catalogo.platillos
+        modelo.ids_platos = catalogo.ids_platos
+        modelo.ingredientes = catalogo.ingredientes
+        modelo._incidencia = catalogo.incidencia if catalogo.tiene('incidencia') else None
+        modelo.indice_ingrediente = {ing: i for i, ing in enumerate(modelo.ingredientes)}
+        modelo.indice_plato = {pid: d for d, pid in enumerate(modelo.ids_platos)}
+
+        modelo.ingredientes_plato = FilasCSR(catalogo.indptr, catalogo.indices)
+        modelo.bits_plato = BitsCSR(catalogo.indptr, catalogo.indices)
+        modelo.platos_por_ingrediente = ConjuntosCSR(catalogo.indptr_t, catalogo.indices_t)
+        modelo.indptr_t = catalogo.indptr_t
+        modelo.indices_t = catalogo.indices_t
+
+        modelo.disponibilidad_ingredientes = catalogo.disponibilidad()
+        no_disponible = np.array([not d for d in modelo.disponibilidad_ingredientes.values()], dtype=np.int64)
+        filas = np.repeat(np.arange(len(modelo.ids_platos)), np.diff(catalogo.indptr))
+        faltantes = np.bincount(filas, weights=no_disponible[catalogo.indices], minlength=len(modelo.ids_platos)) if len(filas) else np.zeros(len(modelo.ids_platos))
+        modelo.faltantes_por_plato = [int(n) for n in faltantes]
+        modelo.factor_disponibilidad = [FACTOR_NO_DISPONIBLE ** n for n in modelo.faltantes_por_plato]
+        modelo.platos_con_faltantes = {d for d, n in enumerate(modelo.faltantes_por_plato) if n > 0}
+
+        modelo.version = 0
+        modelo._candado = threading.RLock()
+        modelo._bn = None
+        modelo._ve = None
+        modelo.similitudes = catalogo.similitudes()
+        modelo.similitudes_top_k = catalogo.similitudes_top_k
+        modelo._filas_similitud = OrderedDict()
+        modelo._pares_filas_similitud = 0
+        modelo._minhash = None
+        return modelo
+
+    @property
+    def incidencia(self) -> np.ndarray:
+        """Matriz plato×ingrediente densa (se construye del índice invertido si no está)."""
+        if self._incidencia is None:
+            with self._candado:
+                if self._incidencia is None:
+                    incidencia = np.zeros((len(self.ids_platos), len(self.ingredientes)), dtype=np.float64)
+                    columnas = np.repeat(np.arange(len(self.ingredientes)), np.diff(self.indptr_t))
+                    incidencia[self.indices_t, columnas] = 1.0
+                    self._incidencia = incidencia
+        return self._incidencia
+
+    def _coincidencias(self, evidencia: List[int]) -> np.ndarray:
+        """Cuántos ingredientes de `evidencia` tiene cada plato, desde las listas del índice invertido."""
+        if not evidencia:
+            return np.zeros(len(self.ids_platos), dtype=np.int64)
+        platos = np.concatenate([self.indices_t[self.indptr_t[i]:self.indptr_t[i + 1]] for i in evidencia])
+        return np.bincount(platos, minlength=len(self.ids_platos))
+
+    def _ajustar_faltantes(self, i: int, delta: int) -> set:
+        """Suma `delta` al contador de faltantes de los platos con el ingrediente `i`."""
+        afectados = self.platos_por_ingrediente[i]
+        for d in afectados:
+            n = self.faltantes_por_plato[d] + delta
+            self.faltantes_por_plato[d] = n
+            self.factor_disponibilidad[d] = FACTOR_NO_DISPONIBLE ** n
+            if n > 0:
+                self.platos_con_faltantes.add(d)
+            else:
+                self.platos_con_faltantes.discard(d)
+        return afectados
+
+    def actualizar_disponibilidad(self, cambios: Dict[str, bool]) -> set:
+        """Aplica cambios de stock ({ingrediente: disponible}) al modelo compilado.
+
+        Solo se recalcula la penalización de los platos que contienen algún
+        ingrediente cuyo estado cambia. Devuelve el conjunto de índices de
+        platos afectados (vacío si nada cambió).
+        """
+        afectados: set = set()
+        for ing, disponible in cambios.items():
+            ing = ing.lower()
+            antes = self.disponibilidad_ingredientes.get(ing, True)
+            self.disponibilidad_ingredientes[ing] = bool(disponible)
+            i = self.indice_ingrediente.get(ing)
+            if i is None or bool(antes) == bool(disponible):
                 continue
-            ings_plato = {i.lower() for i in mapa_platos[id_plato].get('ingredients', [])}
-            inter = len(ings_plato & ingredientes_referencia)
-            union = len(ings_plato | ingredientes_referencia)
-            simil = (inter / union) if union > 0 else 0.0
-            multiplicador = 1.0 + alpha_sim * simil
-            probabilidades[id_plato] *= multiplicador
-
-    boost_plato_gusta = 1.3
-    for pid in platos_gustan:
-        if pid in probabilidades and probabilidades[pid] > 0:
-            probabilidades[pid] *= boost_plato_gusta
-
-    # --- Fase 4: renormalizar y construir resultado final ---
-    total = sum(probabilidades.values())
-    resultados = []
-    for id_plato in ids_platos:
-        p_copy = dict(mapa_platos[id_plato])
-        prob = (probabilidades.get(id_plato, 0.0) / total) if total > 0 else 0.0
-        p_copy['probability'] = prob
-        p_copy['score'] = float(math.log(prob) if prob > 0 else float('-inf'))
-        resultados.append(p_copy)
-
-    resultados.sort(key=lambda x: x['probability'], reverse=True)
-    return resultados
+            afectados |= self._ajustar_faltantes(i, -1 if disponible else +1)
+        if afectados:
+            self.version += 1
+        return afectados
+
+    def compilar_similitudes(self, top_k: Optional[int] = None, max_pares: Optional[int] = MAX_PARES_SIMILITUD) -> List[Dict[int, float]]:
+        """Calcula (una vez) la matriz de similitud Jaccard plato×plato.
+
+        Opcional: el modelo no la necesita (ver `fila_similitud`), sirve para
+        guardarla en el catálogo binario. `top_k` y `max_pares` acotan su
+        tamaño como en `similitudes_jaccard`; con `top_k` las filas son
+        parciales y el refuerzo por similitud sigue usando filas exactas.
+        """
+        with self._candado:
+            if self.similitudes is None or self.similitudes_top_k != top_k:
+                self.similitudes = similitudes_jaccard(self.ingredientes_plato, self.platos_por_ingrediente, top_k=top_k, max_pares=max_pares)
+                self.similitudes_top_k = top_k
+            return self.similitudes
+
+    def fila_similitud(self, d: int) -> Dict[int, float]:
+        """Fila Jaccard exacta del plato `d` (de la matriz completa si está calculada)."""
+        with self._candado:
+            if self.similitudes is not None and self.similitudes_top_k is None:
+                return self.similitudes[d]
+            fila = self._filas_similitud.get(d)
+            if fila is not None:
+                self._filas_similitud.move_to_end(d)
+                return fila
+        # La fila se calcula fuera del candado; si otro hilo se adelantó se usa la suya
+        fila = fila_jaccard(d, self.ingredientes_plato, self.platos_por_ingrediente)
+        with self._candado:
+            previa = self._filas_similitud.get(d)
+            if previa is not None:
+                self._filas_similitud.move_to_end(d)
+                return previa
+            self._filas_similitud[d] = fila
+            self._pares_filas_similitud += len(fila)
+            while self._pares_filas_similitud > MAX_PARES_FILAS_SIMILITUD and len(self._filas_similitud) > 1:
+                _, vieja = self._filas_similitud.popitem(last=False)
+                self._pares_filas_similitud -= len(vieja)
+        return fila
+
+    def platos_similares(self, pid: str, k: int = 5, aproximado: bool = False) -> List[Tuple[str, float]]:
+        """Los `k` platos más parecidos a `pid` como pares `(id, jaccard)`.
+
+        Con `aproximado=True` no se usa la matriz exacta: los candidatos salen
+        del índice MinHash/LSH (construido en el primer uso) y se re-puntúan
+        con Jaccard exacto sobre los bitsets. Es la opción para catálogos muy
+        grandes, a costa de poder omitir algún vecino poco parecido.
+        """
+        d = self.indice_plato[str(pid)]
+        if aproximado:
+            if self._minhash is None:
+                with self._candado:
+                    if self._minhash is None:
+                        self._minhash = IndiceMinHash(self.ingredientes_plato)
+            bits = self.bits_plato[d]
+            fila = {}
+            for e in self._minhash.candidatos(d):
+                union = (bits | self.bits_plato[e]).bit_count()
+                fila[e] = (bits & self.bits_plato[e]).bit_count() / union if union else 0.0
+        elif self.similitudes is not None and (self.similitudes_top_k is None or k <= self.similitudes_top_k):
+            fila = self.similitudes[d]
+        else:
+            fila = self.fila_similitud(d)
+        mejores = heapq.nlargest(k, ((e, s) for e, s in fila.items() if e != d), key=lambda item: item[1])
+        return [(self.ids_platos[e], s) for e, s in mejores]
+
+    def _similitudes_referencia(self, platos_gustan: set) -> Dict[int, float]:
+        """Jaccard de cada plato con la unión de ingredientes de `platos_gustan`.
+
+        Solo se devuelven platos con similitud > 0; el resto tiene
+        multiplicador 1 y no hace falta tocarlo. Con un único plato de
+        referencia es directamente su fila (`fila_similitud`); con varios
+        se calcula sobre los platos que comparten algún ingrediente con la
+        unión (índice invertido), usando los bitsets.
+        """
+        gustan = [self.indice_plato[pid] for pid in platos_gustan if pid in self.indice_plato]
+        if len(gustan) == 1:
+            return self.fila_similitud(gustan[0])
+        referencia = 0
+        ingredientes_ref: set = set()
+        for g in gustan:
+            referencia |= self.bits_plato[g]
+            ingredientes_ref.update(self.ingredientes_plato[g])
+        candidatos: set = set()
+        for i in ingredientes_ref:
+            candidatos |= self.platos_por_ingrediente[i]
+        similitudes = {}
+        for d in candidatos:
+            bits = self.bits_plato[d]
+            similitudes[d] = (bits & referencia).bit_count() / (bits | referencia).bit_count()
+        return similitudes
+
+    def _platos_con(self, ingredientes: Iterable[str]) -> set:
+        """Platos que contienen alguno de `ingredientes` (unión de listas del índice invertido)."""
+        platos: set = set()
+        for ing in ingredientes:
+            i = self.indice_ingrediente.get(ing)
+            if i is not None:
+                platos |= self.platos_por_ingrediente[i]
+        return platos
+
+    def _platos_vetados(self, perfil: Dict[str, set]) -> set:
+        """Fase 2 sobre el índice invertido: platos vetados por el perfil normalizado."""
+        vetados = self._platos_con(perfil['allergies'] | perfil['restrictions'])
+        for pid in perfil['platos_no_gustan']:
+            d = self.indice_plato.get(pid)
+            if d is not None:
+                vetados.add(d)
+        return vetados
+
+    def _evidencia(self, likes: set, estadisticas: Optional[EstadisticasRecomendacion]) -> List[int]:
+        """Ids de los ingredientes de `likes` presentes en el catálogo."""
+        evidencia = [self.indice_ingrediente[ing] for ing in likes if ing in self.indice_ingrediente]
+        if estadisticas is not None:
+            estadisticas.contar('ingredientes_evidencia', len(evidencia))
+        return evidencia
+
+    def motor_eliminacion(self, estadisticas: Optional[EstadisticasRecomendacion] = None):
+        """`MotorEliminacion` sobre la BN del catálogo (se construye una vez, al primer uso).
+
+        Incluye las capas de `CAPAS_OPCIONALES` presentes en los platos, que
+        pueden usarse como evidencia en consultas directas, p. ej.
+        `modelo.motor_eliminacion().distribucion('Plato', {'Capa__cuisine': 'italiana'})`.
+        """
+        if self._ve is None:
+            from eliminacion_variables import MotorEliminacion
+            with self._candado:
+                if self._ve is None:
+                    with _fase(estadisticas, 'construccion_bn'):
+                        capas = [c for c in CAPAS_OPCIONALES if any(c in p for p in self.platillos)]
+                        red, vars_ingredientes = _crear_red_discreta(self.platillos, capas)
+                    self._ve = (MotorEliminacion(red), vars_ingredientes)
+        return self._ve[0]
+
+    def _posterior(self, likes: set, motor: str, estadisticas: Optional[EstadisticasRecomendacion] = None) -> List[float]:
+        """Fase 1: posterior P(Plato | likes), una probabilidad por plato (en orden del catálogo)."""
+        if motor == 'numpy':
+            evidencia = self._evidencia(likes, estadisticas)
+            with _fase(estadisticas, 'posterior'):
+                return posterior_coincidencias(self._coincidencias(evidencia)).tolist()
+        if motor == 'pgmpy':
+            # `VariableElimination` de pgmpy no es seguro entre hilos: consultas en serie
+            with self._candado:
+                if self._bn is None:
+                    self._bn = _construir_bn(self.platillos, estadisticas)
+                inferencia, vars_ingredientes = self._bn
+                self._evidencia(likes, estadisticas)
+                probabilidades = _consultar_bn(inferencia, vars_ingredientes, self.ids_platos, likes, estadisticas)
+            return [probabilidades.get(pid, 0.0) for pid in self.ids_platos]
+        if motor == 've':
+            motor_ve = self.motor_eliminacion(estadisticas)
+            vars_ingredientes = self._ve[1]
+            evidencia = {vars_ingredientes[i]: 'present' for i in self._evidencia(likes, estadisticas)}
+            with _fase(estadisticas, 'consulta_ve'):
+                # Estados de 'Plato' en el orden del catálogo
+                return motor_ve.consultar(['Plato'], evidencia).valores.tolist()
+        raise ValueError(f"Motor de inferencia desconocido: {motor!r} (opciones: {', '.join(MOTORES)})")
+
+    def recommend(self, usuario: Dict[str, Any], motor: str = 'numpy', top_k: Optional[int] = None, estadisticas: Optional[EstadisticasRecomendacion] = None):
+        """Recomendaciones para `usuario` (mismo formato que `recomendar_platillos_bn`).
+
+        Con `top_k` se devuelven solo los `top_k` mejores platos no vetados
+        como objetos `Recomendacion` (ver `_recomendar_top`). Si se pasa
+        `estadisticas`, se acumulan en él los tiempos de cada fase.
+        """
+        if estadisticas is not None:
+            estadisticas.contar('solicitudes')
+        perfil = _normalizar_perfil(usuario)
+        if top_k is not None:
+            return self._recomendar_top(perfil, motor, top_k, estadisticas)
+        pesos = self.pesos(perfil, motor, estadisticas=estadisticas)
+        # --- Fase 4: renormalizar y construir resultado final ---
+        with _fase(estadisticas, 'normalizacion'):
+            return self._resultados(pesos)
+
+    @staticmethod
+    def normalizar_perfil(usuario: Dict[str, Any]) -> Dict[str, set]:
+        """Perfil con los campos que usa el recomendador como conjuntos (el argumento de `pesos`)."""
+        return _normalizar_perfil(usuario)
+
+    def pesos(self, perfil: Dict[str, set], motor: str = 'numpy', con_disponibilidad: bool = True, estadisticas: Optional[EstadisticasRecomendacion] = None) -> List[float]:
+        """Pesos sin normalizar por plato (fases 1-3 y refuerzos) para un perfil normalizado.
+
+        Con `con_disponibilidad=False` se omite la penalización por stock;
+        como todas las fases son multiplicativas, el peso final de un plato es
+        el peso base por `factor_disponibilidad[d]` (lo usa `MenuEnVivo`
+        para re-puntuar solo los platos afectados por un cambio de stock).
+        """
+        platos_gustan = perfil['platos_gustan']
+
+        # --- Fase 1: inferencia BN base usando solamente 'likes' como evidencia ---
+        probabilidades = self._posterior(perfil['likes'], motor, estadisticas)
+
+        # --- Fase 2: aplicar vetos deterministas (índice invertido) ---
+        with _fase(estadisticas, 'vetos'):
+            vetados = self._platos_vetados(perfil)
+            for d in vetados:
+                probabilidades[d] = 0.0
+        if estadisticas is not None:
+            estadisticas.contar('platos_vetados', len(vetados))
+
+        # --- Fase 3: aplicar penalizaciones multiplicativas (solo platos afectados) ---
+        with _fase(estadisticas, 'penalizaciones'):
+            if con_disponibilidad:
+                for d in self.platos_con_faltantes:
+                    probabilidades[d] *= self.factor_disponibilidad[d]
+            for d in self._platos_con(perfil['ingredientes_no_gustan']):
+                probabilidades[d] *= FACTOR_INGRED_NO_GUSTA
+
+        # --- Reforzar platos similares (Jaccard con los ingredientes de platos_gustan) ---
+        with _fase(estadisticas, 'similitud'):
+            for d, simil in self._similitudes_referencia(platos_gustan).items():
+                if probabilidades[d] > 0:
+                    probabilidades[d] *= 1.0 + ALPHA_SIMILITUD * simil
+
+            for pid in platos_gustan:
+                d = self.indice_plato.get(pid)
+                if d is not None and probabilidades[d] > 0:
+                    probabilidades[d] *= BOOST_PLATO_GUSTA
+        return probabilidades
+
+    def _recomendar_top(self, perfil: Dict[str, set], motor: str, top_k: int, estadisticas: Optional[EstadisticasRecomendacion] = None) -> List[Recomendacion]:
+        """Los `top_k` mejores platos, descartando los vetados antes de la inferencia.
+
+        Los vetos (alergias, restricciones, platos_no_gustan) se resuelven con
+        el índice invertido y la posterior se calcula solo para los platos
+        supervivientes. La constante de normalización de la posterior se
+        cancela en la renormalización final, así que basta con pesos sin
+        normalizar: las probabilidades coinciden con las de la salida completa.
+        La selección usa un heap y no se copia ningún dict de plato.
+        """
+        n_platos = len(self.ids_platos)
+        with _fase(estadisticas, 'vetos'):
+            vetados = self._platos_vetados(perfil)
+            vivos = np.ones(n_platos, dtype=bool)
+            vivos[list(vetados)] = False
+            supervivientes = np.flatnonzero(vivos)
+        if estadisticas is not None:
+            estadisticas.contar('platos_vetados', len(vetados))
+        if top_k <= 0 or not len(supervivientes):
+            return []
+
+        if motor == 'numpy':
+            evidencia = self._evidencia(perfil['likes'], estadisticas)
+            with _fase(estadisticas, 'posterior'):
+                log_pesos = self._coincidencias(evidencia)[supervivientes] * math.log(PROB_PRESENTE_SI_CONTIENE / PROB_PRESENTE_NO_CONTIENE)
+                pesos_base = np.exp(log_pesos - log_pesos.max()).tolist()
+        else:
+            posterior = self._posterior(perfil['likes'], motor, estadisticas)
+            pesos_base = [posterior[d] for d in supervivientes]
+
+        with _fase(estadisticas, 'penalizaciones'):
+            no_gusta = self._platos_con(perfil['ingredientes_no_gustan'])
+            pesos: Dict[int, float] = {}
+            for d, peso in zip(supervivientes.tolist(), pesos_base):
+                peso *= self.factor_disponibilidad[d]
+                if d in no_gusta:
+                    peso *= FACTOR_INGRED_NO_GUSTA
+                pesos[d] = peso
+
+        with _fase(estadisticas, 'similitud'):
+            for d, simil in self._similitudes_referencia(perfil['platos_gustan']).items():
+                if d in pesos:
+                    pesos[d] *= 1.0 + ALPHA_SIMILITUD * simil
+            for pid in perfil['platos_gustan']:
+                d = self.indice_plato.get(pid)
+                if d in pesos:
+                    pesos[d] *= BOOST_PLATO_GUSTA
+
+        with _fase(estadisticas, 'normalizacion'):
+            return self.seleccionar_top(pesos, top_k)
+
+    def seleccionar_top(self, pesos: Dict[int, float], top_k: int, total: Optional[float] = None) -> List[Recomendacion]:
+        """Renormaliza `pesos` ({plato: peso}) y devuelve los `top_k` mayores con un heap.
+
+        `total` es la constante de normalización si `pesos` no contiene todos
+        los platos con peso (por omisión, la suma de `pesos`).
+        """
+        if total is None:
+            total = sum(pesos.values())
+        if total <= 0:
+            return []
+        mejores = heapq.nlargest(top_k, pesos.items(), key=lambda item: item[1])
+        return [self.recomendacion(d, peso / total) for d, peso in mejores]
+
+    def recomendacion(self, d: int, prob: float) -> Recomendacion:
+        """`Recomendacion` del plato `d` con probabilidad `prob` (sin copiar el plato)."""
+        return Recomendacion(self.platillos[d], prob, math.log(prob) if prob > 0 else float('-inf'))
+
+    def _resultados(self, pesos) -> List[Dict[str, Any]]:
+        """Renormaliza `pesos` (uno por plato) y construye la lista ordenada de platos."""
+        total = sum(pesos)
+        resultados = []
+        for d in range(len(self.ids_platos)):
+            p_copy = dict(self.platillos[d])
+            prob = (float(pesos[d]) / total) if total > 0 else 0.0
+            p_copy['probability'] = prob
+            p_copy['score'] = float(math.log(prob) if prob > 0 else float('-inf'))
+            resultados.append(p_copy)
+
+        resultados.sort(key=lambda x: x['probability'], reverse=True)
+        return resultados
+
+    def recomendar_lote(self, usuarios: Union[Dict[str, Dict[str, Any]], Iterable[Tuple[str, Dict[str, Any]]]], tam_bloque: int = TAM_BLOQUE_LOTE, top_k: Optional[int] = None, estadisticas: Optional[EstadisticasRecomendacion] = None) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        """Recomendaciones para muchos usuarios, generadas como pares `(uid, recomendaciones)`.
+
+        Los perfiles se apilan por bloques de `tam_bloque` usuarios en
+        matrices usuario×ingrediente (likes, vetos, no gusta) y usuario×plato
+        (platos_gustan / platos_no_gustan); posterior, vetos, penalizaciones
+        y similitud Jaccard se calculan como productos de matrices contra la
+        incidencia plato×ingrediente. El resultado de cada usuario es el mismo
+        que el de `recommend` (salvo redondeo de coma flotante), también con
+        `top_k`. Con `estadisticas` se registran los tiempos de las mismas
+        fases que en `recommend` ('evidencia' incluye apilar los perfiles).
+
+        `usuarios` puede ser un dict `{uid: perfil}` o cualquier iterable de
+        pares `(uid, perfil)`; se consume bloque a bloque, así que un
+        iterador en streaming mantiene la memoria acotada al tamaño de bloque.
+        """
+        pares = iter(usuarios.items() if hasattr(usuarios, 'items') else usuarios)
+        n_ing = len(self.ingredientes)
+        n_platos = len(self.ids_platos)
+        incidencia_t = self.incidencia.T
+        tam_platos = self.incidencia.sum(axis=1)
+        factor_disp = np.asarray(self.factor_disponibilidad, dtype=np.float64)
+        log_razon = math.log(PROB_PRESENTE_SI_CONTIENE / PROB_PRESENTE_NO_CONTIENE)
+
+        tam_bloque = max(1, tam_bloque)
+        while True:
+            bloque = list(islice(pares, tam_bloque))
+            if not bloque:
+                break
+            n = len(bloque)
+            if estadisticas is not None:
+                estadisticas.contar('solicitudes', n)
+            with _fase(estadisticas, 'evidencia'):
+                likes = np.zeros((n, n_ing))
+                vetos = np.zeros((n, n_ing))
+                no_gusta = np.zeros((n, n_ing))
+                platos_veto = np.zeros((n, n_platos), dtype=bool)
+                platos_gusta = np.zeros((n, n_platos))
+                for u, (_, usuario) in enumerate(bloque):
+                    perfil = _normalizar_perfil(usuario)
+                    for campo, matriz in (('likes', likes), ('allergies', vetos), ('restrictions', vetos), ('ingredientes_no_gustan', no_gusta)):
+                        for ing in perfil[campo]:
+                            i = self.indice_ingrediente.get(ing)
+                            if i is not None:
+                                matriz[u, i] = 1.0
+                    for pid in perfil['platos_no_gustan']:
+                        if pid in self.indice_plato:
+                            platos_veto[u, self.indice_plato[pid]] = True
+                    for pid in perfil['platos_gustan']:
+                        if pid in self.indice_plato:
+                            platos_gusta[u, self.indice_plato[pid]] = 1.0
+            if estadisticas is not None:
+                estadisticas.contar('ingredientes_evidencia', int(likes.sum()))
+
+            # Fase 1: log-posterior de todos los usuarios del bloque (softmax por fila)
+            with _fase(estadisticas, 'posterior'):
+                log_post = (likes @ incidencia_t) * log_razon
+                if n_platos:
+                    log_post -= log_post.max(axis=1, keepdims=True)
+                pesos = np.exp(log_post)
+                pesos /= pesos.sum(axis=1, keepdims=True)
+
+            # Fase 2: vetos por alergias/restricciones y platos que no gustan
+            with _fase(estadisticas, 'vetos'):
+                platos_veto |= (vetos @ incidencia_t) > 0
+                pesos[platos_veto] = 0.0
+            if estadisticas is not None:
+                estadisticas.contar('platos_vetados', int(platos_veto.sum()))
+
+            # Fase 3: penalizaciones por disponibilidad e ingredientes que no gustan
+            with _fase(estadisticas, 'penalizaciones'):
+                pesos *= factor_disp
+                pesos[(no_gusta @ incidencia_t) > 0] *= FACTOR_INGRED_NO_GUSTA
+
+            # Similitud Jaccard con la unión de ingredientes de platos_gustan
+            with _fase(estadisticas, 'similitud'):
+                referencia = ((platos_gusta @ self.incidencia) > 0).astype(np.float64)
+                inter = referencia @ incidencia_t
+                union = referencia.sum(axis=1, keepdims=True) + tam_platos - inter
+                simil = np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+                pesos *= 1.0 + ALPHA_SIMILITUD * simil
+                pesos[platos_gusta > 0] *= BOOST_PLATO_GUSTA
+
+            for u, (uid, _) in enumerate(bloque):
+                with _fase(estadisticas, 'normalizacion'):
+                    if top_k is None:
+                        recs = self._resultados(pesos[u])
+                    else:
+                        positivos = np.flatnonzero(pesos[u] > 0)
+                        recs = self.seleccionar_top(dict(zip(positivos.tolist(), pesos[u, positivos].tolist())), top_k)
+                yield uid, recs
+
+
+def recomendar_platillos_bn(platillos: List[Dict[str, Any]], usuario: Dict[str, Any], disponibilidad_ingredientes: Dict[str, bool] = None, normalize: bool = True, motor: str = 'numpy', top_k: Optional[int] = None, estadisticas: Optional[EstadisticasRecomendacion] = None) -> List[Dict[str, Any]]:
+    """Calcula recomendaciones usando una Red Bayesiana simple.
+
+    Entradas:
+      - platillos: lista de dicts con keys 'id', 'name', 'ingredients', 'available'
+      - usuario: perfil con campos esperados (platos_gustan, platos_no_gustan,
+        ingredientes_gustan, alergias, restricciones, ingredientes_no_gustan).
+      - disponibilidad_ingredientes: mapping ingrediente -> bool (opcional).
+      - motor: 'numpy' (posterior en forma cerrada, por defecto), 've'
+        (eliminación de variables propia sobre la BN, ver
+        `eliminacion_variables`) o 'pgmpy' (construye la BN y ejecuta
+        VariableElimination de pgmpy; solo referencia).
+      - top_k: si se indica, devuelve solo los `top_k` mejores platos no
+        vetados como objetos `Recomendacion` (sin copiar los dicts).
+      - estadisticas: `EstadisticasRecomendacion` opcional donde acumular
+        el tiempo de cada fase (incluida la compilación del catálogo).
+
+    Salida: lista de diccionarios de plato con campos adicionales:
+      - 'probability': probabilidad posterior normalizada
+      - 'score': log(probability) para ranking estable
+
+    Compila el catálogo en cada llamada; para atender a muchos usuarios con
+    el mismo catálogo conviene crear un `RecommenderModel` y reutilizarlo.
+    """
+    with _fase(estadisticas, 'compilacion'):
+        modelo = RecommenderModel(platillos, disponibilidad_ingredientes, precomputar_similitudes=False)
+    return modelo.recommend(usuario, motor=motor, top_k=top_k, estadisticas=estadisticas)
+
+
+def recomendar_lote(platillos: List[Dict[str, Any]], usuarios: Dict[str, Dict[str, Any]], disponibilidad_ingredientes: Dict[str, bool] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """Recomendaciones para todos los `usuarios` ({uid: perfil}) en una pasada.
+
+    Compila el catálogo una vez y delega en `RecommenderModel.recomendar_lote`.
+    Devuelve `{uid: recomendaciones}` con el mismo formato que
+    `recomendar_platillos_bn`.
+    """
+    modelo = RecommenderModel(platillos, disponibilidad_ingredientes, precomputar_similitudes=False)
+    return dict(modelo.recomendar_lote(usuarios))
@@ -0,0 +1,327 @@
+"""
+Capa asyncio de recomendaciones con agrupación de peticiones idénticas.
+
+En horas pico muchos clientes piden recomendaciones para el mismo perfil (por
+ejemplo, los `PRESETS` de la GUI aplicados a un usuario nuevo).
+`ServicioRecomendacionesAsync` evita recalcular en paralelo lo mismo:
+
+  - Agrupación: las peticiones concurrentes con la misma clave
+    `(huella_perfil(usuario), version del modelo, top_k)` esperan a un único
+    cálculo en vuelo y reciben el mismo resultado.
+  - Descarga: el cálculo (CPU) se ejecuta en un executor, de hilos sobre un
+    `RecommenderModel` en memoria o de procesos sobre el catálogo binario
+    (`con_procesos`), así que el bucle de eventos nunca se bloquea.
+  - Contrapresión: los cálculos pendientes pasan por una cola acotada
+    (`max_pendientes`). Si está llena, `recomendar` espera (o, con
+    `tiempo_espera_cola`, falla con `ServicioSaturado` al agotarse).
+  - Cierre: `cerrar()` hace fallar con `RuntimeError` todas las peticiones
+    aún pendientes (en cola o calculándose), en lugar de dejarlas colgadas.
+
+Como en `CacheRecomendaciones`, las listas devueltas se comparten entre las
+peticiones agrupadas: no deben modificarse.
+
+`servir(...)` expone el servicio por HTTP con las mismas rutas que
+`servidor.py` (`GET /recommend/<user_id>`, `POST /recommend`, `GET /salud`);
+una cola llena se responde con 503.
+
+Ejemplo:
+    python servicio_async.py --puerto 8001 --procesos 4
+"""
+
+from typing import List, Dict, Any, Optional, Callable, Hashable, Tuple
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from urllib.parse import urlsplit, parse_qs, unquote
+import argparse
+import asyncio
+import json
+import multiprocessing
+
+from almacenamiento import Almacenamiento, AlmacenamientoJSON, abrir_almacenamiento
+from cache_recomendaciones import huella_perfil
+from catalogo_compilado import RUTA_POR_DEFECTO
+from main import DATA_DIR, serializar_recomendaciones
+from recomendador import RecommenderModel
+from servidor import ErrorHTTP, _top_k, _inicializar_trabajador, _recomendar, preparar_catalogo, validar_perfil
+
+
+MAX_PENDIENTES_POR_DEFECTO = 64
+
+
+class ServicioSaturado(Exception):
+    """La cola de cálculos pendientes sigue llena tras el tiempo de espera."""
+
+
+class ServicioRecomendacionesAsync:
+    """Recomendaciones asíncronas con agrupación, executor y cola acotada.
+
+    `calcular(perfil, top_k)` es la función que corre en el executor y
+    devuelve la lista serializada; `version()` da la versión del modelo que
+    entra en la clave de agrupación. Con `modelo` se usan las de ese
+    `RecommenderModel` y un executor de `consumidores` hilos.
+    """
+
+    def __init__(self, modelo: Optional[RecommenderModel] = None, max_pendientes: int = MAX_PENDIENTES_POR_DEFECTO, consumidores: int = 4, executor: Optional[Executor] = None, calcular: Optional[Callable[[Dict[str, Any], Optional[int]], List[Dict[str, Any]]]] = None):
+        if calcular is None:
+            if modelo is None:
+                raise ValueError('Hace falta un modelo o una función `calcular`')
+            calcular = lambda perfil, top_k: serializar_recomendaciones(modelo.recommend(perfil, top_k=top_k))
+        self.modelo = modelo
+        self.calcular = calcular
+        self.max_pendientes = max_pendientes
+        self.consumidores = consumidores
+        self.executor = executor or ThreadPoolExecutor(max_workers=consumidores)
+        self._executor_propio = executor is None
+        self._cola: Optional[asyncio.Queue] = None
+        self._tareas: List[asyncio.Task] = []
+        self._en_vuelo: Dict[Hashable, asyncio.Future] = {}
+        self.calculadas = 0
+        self.agrupadas = 0
+        self.rechazadas = 0
+
+    @classmethod
+    def con_procesos(cls, ruta_catalogo: str, trabajadores: int, max_pendientes: int = MAX_PENDIENTES_POR_DEFECTO) -> 'ServicioRecomendacionesAsync':
+        """Servicio cuyo executor es un pool de procesos sobre el catálogo binario."""
+        pool = ProcessPoolExecutor(
+            max_workers=trabajadores,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_inicializar_trabajador,
+            initargs=(str(ruta_catalogo),),
+        )
+        servicio = cls(max_pendientes=max_pendientes, consumidores=trabajadores, executor=pool, calcular=_recomendar)
+        servicio._executor_propio = True
+        return servicio
+
+    def version(self) -> int:
+        return self.modelo.version if self.modelo is not None else 0
+
+    async def iniciar(self) -> None:
+        if self._cola is None:
+            self._cola = asyncio.Queue(maxsize=self.max_pendientes)
+            self._tareas = [asyncio.create_task(self._consumir()) for _ in range(self.consumidores)]
+
+    async def cerrar(self) -> None:
+        # Primero se resuelven los futuros pendientes: así los consumidores
+        # cancelados no los cancelan y los clientes reciben un error claro
+        for clave, futuro in list(self._en_vuelo.items()):
+            self._abandonar(clave, futuro, RuntimeError('El servicio de recomendaciones se ha cerrado'))
+        for tarea in self._tareas:
+            tarea.cancel()
+        await asyncio.gather(*self._tareas, return_exceptions=True)
+        self._tareas = []
+        if self._cola is not None:
+            # Vaciar la cola despierta a los productores bloqueados en `put`
+            while not self._cola.empty():
+                self._cola.get_nowait()
+                self._cola.task_done()
+        self._cola = None
+        if self._executor_propio:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def __aenter__(self) -> 'ServicioRecomendacionesAsync':
+        await self.iniciar()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.cerrar()
+
+    async def _consumir(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            clave, perfil, top_k, futuro = await self._cola.get()
+            try:
+                resultado = await loop.run_in_executor(self.executor, self.calcular, perfil, top_k)
+                self.calculadas += 1
+                if not futuro.done():
+                    futuro.set_result(resultado)
+            except asyncio.CancelledError:
+                if not futuro.done():
+                    futuro.cancel()
+                raise
+            except Exception as e:
+                if not futuro.done():
+                    futuro.set_exception(e)
+            finally:
+                if self._en_vuelo.get(clave) is futuro:
+                    del self._en_vuelo[clave]
+                self._cola.task_done()
+
+    async def recomendar(self, usuario: Dict[str, Any], top_k: Optional[int] = None, tiempo_espera_cola: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Recomendaciones serializadas de `usuario`.
+
+        Si ya hay un cálculo en vuelo con la misma clave, se espera a ese.
+        Si no, se encola uno nuevo: con `tiempo_espera_cola=None` se espera
+        a que haya hueco; con un número de segundos (0 = no esperar) se lanza
+        `ServicioSaturado` si la cola sigue llena.
+        """
+        await self.iniciar()
+        clave = (huella_perfil(usuario), self.version(), top_k)
+        futuro = self._en_vuelo.get(clave)
+        if futuro is not None:
+            self.agrupadas += 1
+            # shield: cancelar a un cliente no cancela el cálculo de los demás
+            return await asyncio.shield(futuro)
+
+        futuro = asyncio.get_running_loop().create_future()
+        self._en_vuelo[clave] = futuro
+        trabajo: Tuple = (clave, usuario, top_k, futuro)
+        try:
+            if tiempo_espera_cola is None:
+                await self._cola.put(trabajo)
+            elif tiempo_espera_cola <= 0:
+                self._cola.put_nowait(trabajo)
+            else:
+                await asyncio.wait_for(self._cola.put(trabajo), tiempo_espera_cola)
+        except (asyncio.QueueFull, asyncio.TimeoutError):
+            self.rechazadas += 1
+            self._abandonar(clave, futuro, ServicioSaturado(f'{self.max_pendientes} cálculos pendientes'))
+            raise ServicioSaturado(f'{self.max_pendientes} cálculos pendientes') from None
+        except asyncio.CancelledError:
+            self._abandonar(clave, futuro, None)
+            raise
+        return await asyncio.shield(futuro)
+
+    def _abandonar(self, clave: Hashable, futuro: asyncio.Future, error: Optional[Exception]) -> None:
+        """Retira un cálculo no terminado (sin encolar, o al cerrar) y avisa a las peticiones agrupadas."""
+        if self._en_vuelo.get(clave) is futuro:
+            del self._en_vuelo[clave]
+        if futuro.done():
+            return
+        if error is None:
+            futuro.cancel()
+        else:
+            futuro.set_exception(error)
+            futuro.exception()  # marcada como recuperada aunque nadie más espere
+
+    def estadisticas(self) -> Dict[str, int]:
+        return {
+            'calculadas': self.calculadas,
+            'agrupadas': self.agrupadas,
+            'rechazadas': self.rechazadas,
+            'pendientes': self._cola.qsize() if self._cola is not None else 0,
+            'en_vuelo': len(self._en_vuelo),
+        }
+
+
+# --- Front-end HTTP mínimo sobre asyncio ---
+
+_MOTIVOS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+async def _escribir_respuesta(escritor: asyncio.StreamWriter, estado: int, cuerpo: Any) -> None:
+    datos = json.dumps(cuerpo, ensure_ascii=False).encode('utf-8')
+    cabecera = (
+        f'HTTP/1.1 {estado} {_MOTIVOS.get(estado, "")}\r\n'
+        'Content-Type: application/json; charset=utf-8\r\n'
+        f'Content-Length: {len(datos)}\r\n\r\n'
+    ).encode('latin-1')
+    escritor.write(cabecera + datos)
+    await escritor.drain()
+
+
+async def _atender(servicio: ServicioRecomendacionesAsync, almacen: Almacenamiento, lector_almacen: Executor, metodo: str, objetivo: str, cuerpo: bytes, tiempo_espera_cola: float) -> Tuple[int, Any]:
+    url = urlsplit(objetivo)
+    partes = [unquote(p) for p in url.path.split('/') if p]
+    if metodo == 'GET' and partes == ['salud']:
+        return 200, {'estado': 'ok', **servicio.estadisticas()}
+    if metodo == 'GET' and len(partes) == 2 and partes[0] == 'recommend':
+        uid = partes[1]
+        top_k = _top_k(parse_qs(url.query).get('top', [None])[0])
+        # La primera consulta puede indexar o recorrer la red entera: fuera del bucle
+        perfil = await asyncio.get_running_loop().run_in_executor(lector_almacen, almacen.obtener_usuario, uid)
+        if perfil is None:
+            raise ErrorHTTP(404, f"Usuario '{uid}' no encontrado")
+        return 200, {'usuario': uid, 'recomendaciones': await servicio.recomendar(perfil, top_k, tiempo_espera_cola)}
+    if metodo == 'POST' and partes == ['recommend']:
+        try:
+            datos = json.loads(cuerpo.decode('utf-8')) if cuerpo else {}
+        except (ValueError, UnicodeDecodeError):
+            raise ErrorHTTP(400, 'El cuerpo no es JSON válido')
+        if not isinstance(datos, dict):
+            raise ErrorHTTP(400, 'Se esperaba un objeto JSON')
+        perfil = validar_perfil(datos.get('perfil', datos))
+        recs = await servicio.recomendar(perfil, _top_k(datos.get('top_k')), tiempo_espera_cola)
+        return 200, {'usuario': perfil.get('id') or perfil.get('nombre'), 'recomendaciones': recs}
+    raise ErrorHTTP(404, f'Ruta desconocida: {url.path}')
+
+
+async def servir(servicio: ServicioRecomendacionesAsync, almacen: Almacenamiento, host: str = '127.0.0.1', puerto: int = 8001, tiempo_espera_cola: float = 1.0) -> asyncio.AbstractServer:
+    """Arranca el front-end HTTP (conexiones persistentes, HTTP/1.1) y devuelve el servidor."""
+    await servicio.iniciar()
+    # Un solo hilo para el backend de usuarios: los backends no son seguros
+    # entre hilos (como el candado de `servidor.ServidorRecomendaciones`)
+    lector_almacen = ThreadPoolExecutor(max_workers=1, thread_name_prefix='almacen')
+
+    async def conexion(lector: asyncio.StreamReader, escritor: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                linea = await lector.readline()
+                if not linea:
+                    break
+                try:
+                    metodo, objetivo, _ = linea.decode('latin-1').split(' ', 2)
+                except ValueError:
+                    await _escribir_respuesta(escritor, 400, {'error': 'Petición mal formada'})
+                    break
+                cabeceras = {}
+                while True:
+                    h = await lector.readline()
+                    if h in (b'\r\n', b'\n', b''):
+                        break
+                    nombre, _, valor = h.decode('latin-1').partition(':')
+                    cabeceras[nombre.strip().lower()] = valor.strip()
+                try:
+                    longitud = int(cabeceras.get('content-length') or 0)
+                except ValueError:
+                    longitud = -1
+                if longitud < 0:
+                    # Sin longitud fiable no se sabe dónde acaba el cuerpo: se cierra
+                    await _escribir_respuesta(escritor, 400, {'error': 'Content-Length inválido'})
+                    break
+                cuerpo = await lector.readexactly(longitud)
+                try:
+                    estado, respuesta = await _atender(servicio, almacen, lector_almacen, metodo, objetivo, cuerpo, tiempo_espera_cola)
+                except ErrorHTTP as e:
+                    estado, respuesta = e.estado, {'error': str(e)}
+                except ServicioSaturado as e:
+                    estado, respuesta = 503, {'error': f'Servicio saturado: {e}'}
+                except Exception as e:
+                    estado, respuesta = 500, {'error': f'{type(e).__name__}: {e}'}
+                await _escribir_respuesta(escritor, estado, respuesta)
+                if cabeceras.get('connection', '').lower() == 'close':
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            escritor.close()
+
+    return await asyncio.start_server(conexion, host, puerto)
+
+
+async def _principal(args) -> None:
+    almacen = abrir_almacenamiento(args.almacen) if args.almacen else AlmacenamientoJSON(str(DATA_DIR))
+    if args.procesos:
+        ruta = preparar_catalogo(almacen, args.catalogo or str(RUTA_POR_DEFECTO))
+        servicio = ServicioRecomendacionesAsync.con_procesos(ruta, args.procesos, args.max_pendientes)
+    else:
+        servicio = ServicioRecomendacionesAsync(RecommenderModel(almacen.platillos(), almacen.disponibilidad()), args.max_pendientes)
+    async with servicio:
+        servidor = await servir(servicio, almacen, args.host, args.puerto, args.espera_cola)
+        print(f'Sirviendo recomendaciones (asyncio) en http://{args.host}:{servidor.sockets[0].getsockname()[1]}')
+        async with servidor:
+            await servidor.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Front-end asyncio de recomendaciones con agrupación de peticiones')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=8001)
+    parser.add_argument('--procesos', type=int, default=0, help='Trabajadores en procesos sobre el catálogo binario (0: hilos en este proceso)')
+    parser.add_argument('--max-pendientes', type=int, default=MAX_PENDIENTES_POR_DEFECTO, help='Tamaño de la cola de cálculos pendientes')
+    parser.add_argument('--espera-cola', type=float, default=1.0, help='Segundos de espera con la cola llena antes de responder 503')
+    parser.add_argument('--almacen', metavar='SPEC', default=None, help='Backend de usuarios: json:<directorio> o sqlite:<archivo>')
+    parser.add_argument('--catalogo', metavar='RUTA', default=None, help='Catálogo binario para --procesos (se construye si no existe)')
+    args = parser.parse_args()
+    try:
+        asyncio.run(_principal(args))
+    except KeyboardInterrupt:
+        pass
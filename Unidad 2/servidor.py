@@ -0,0 +1,277 @@
+"""
+Servidor HTTP/JSON de recomendaciones con un pool de procesos trabajadores.
+
+El proceso principal atiende HTTP (un hilo por conexión) y resuelve los
+usuarios en el backend de datos; la inferencia se reparte entre
+`trabajadores` procesos. Todos cargan el mismo catálogo binario precompilado
+(`catalogo_compilado`) con `RecommenderModel.desde_catalogo`, así que la
+compilación se hace una sola vez y las matrices grandes se comparten en solo
+lectura a través del mapeo en memoria.
+
+Rutas:
+
+  - `GET  /recommend/<user_id>?top=K`: recomendaciones de un usuario de la red.
+  - `POST /recommend`: cuerpo `{"perfil": {...}, "top_k": K}` (o el perfil
+    directamente) para un perfil que no está en la red.
+  - `POST /batch`: cuerpo `{"ids": [...], "usuarios": {uid: perfil}, "top_k": K}`;
+    los usuarios se reparten en bloques entre los trabajadores.
+  - `GET  /salud`: estado del servidor.
+
+Las respuestas usan el formato de `main.py --format jsonl`:
+`{"usuario": ..., "recomendaciones": [{"id", "name", "probability", "score"}]}`.
+
+Ejemplo:
+    python servidor.py --puerto 8000 --trabajadores 4
+    curl 'http://127.0.0.1:8000/recommend/Prueba?top=3'
+"""
+
+from typing import List, Dict, Any, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qs, unquote
+import argparse
+import json
+import multiprocessing
+import os
+import threading
+
+from almacenamiento import Almacenamiento, AlmacenamientoJSON, abrir_almacenamiento
+from catalogo_compilado import construir_catalogo, RUTA_POR_DEFECTO
+from main import DATA_DIR, serializar_recomendaciones
+from recomendador import RecommenderModel, TAM_BLOQUE_LOTE
+
+
+# Segundos máximos de espera por la respuesta de un trabajador
+TIEMPO_ESPERA = 60.0
+
+# Modelo de cada proceso trabajador (lo fija `_inicializar_trabajador`)
+_MODELO: Optional[RecommenderModel] = None
+
+
+def _inicializar_trabajador(ruta_catalogo: str) -> None:
+    global _MODELO
+    _MODELO = RecommenderModel.desde_catalogo(ruta_catalogo)
+
+
+def _listo() -> int:
+    return os.getpid()
+
+
+def _recomendar(perfil: Dict[str, Any], top_k: Optional[int]) -> List[Dict[str, Any]]:
+    return serializar_recomendaciones(_MODELO.recommend(perfil, top_k=top_k))
+
+
+def _recomendar_bloque(pares: List[Tuple[str, Dict[str, Any]]], top_k: Optional[int]) -> List[Dict[str, Any]]:
+    return [
+        {'usuario': uid, 'recomendaciones': serializar_recomendaciones(recs)}
+        for uid, recs in _MODELO.recomendar_lote(pares, top_k=top_k)
+    ]
+
+
+def preparar_catalogo(almacen: Almacenamiento, ruta: str, reconstruir: bool = False) -> str:
+    """Devuelve `ruta`, construyendo antes el catálogo binario si no existe (o si se pide)."""
+    if reconstruir or not Path(ruta).exists():
+        construir_catalogo(almacen.platillos(), almacen.disponibilidad(), str(ruta))
+    return str(ruta)
+
+
+class ErrorHTTP(Exception):
+    def __init__(self, estado: int, mensaje: str):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+class ServidorRecomendaciones(ThreadingHTTPServer):
+    """`ThreadingHTTPServer` con el pool de trabajadores y el backend de usuarios."""
+
+    daemon_threads = True
+
+    def __init__(self, direccion: Tuple[str, int], ruta_catalogo: str, almacen: Almacenamiento, trabajadores: Optional[int] = None, tiempo_espera: float = TIEMPO_ESPERA):
+        self.ruta_catalogo = str(ruta_catalogo)
+        self.almacen = almacen
+        self.tiempo_espera = tiempo_espera
+        self.trabajadores = trabajadores or os.cpu_count() or 1
+        # El backend no es seguro entre hilos: se serializa su acceso
+        self._candado_almacen = threading.Lock()
+        # 'spawn': los trabajadores no heredan los hilos del servidor
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.trabajadores,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_inicializar_trabajador,
+            initargs=(self.ruta_catalogo,),
+        )
+        # Arrancar todos los trabajadores antes de aceptar conexiones
+        for futuro in [self.pool.submit(_listo) for _ in range(self.trabajadores)]:
+            futuro.result()
+        super().__init__(direccion, ManejadorRecomendaciones)
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.pool.shutdown(cancel_futures=True)
+
+    def obtener_usuario(self, uid: str) -> Optional[Dict[str, Any]]:
+        with self._candado_almacen:
+            return self.almacen.obtener_usuario(uid)
+
+    def recomendar(self, perfil: Dict[str, Any], top_k: Optional[int]) -> List[Dict[str, Any]]:
+        return self.pool.submit(_recomendar, perfil, top_k).result(self.tiempo_espera)
+
+    def recomendar_lote(self, pares: List[Tuple[str, Dict[str, Any]]], top_k: Optional[int]) -> List[Dict[str, Any]]:
+        """Reparte `pares` en bloques (uno por trabajador, como mucho `TAM_BLOQUE_LOTE`)."""
+        tam = max(1, min(TAM_BLOQUE_LOTE, -(-len(pares) // self.trabajadores)))
+        futuros = [self.pool.submit(_recomendar_bloque, pares[i:i + tam], top_k) for i in range(0, len(pares), tam)]
+        resultados = []
+        for futuro in futuros:
+            resultados.extend(futuro.result(self.tiempo_espera))
+        return resultados
+
+
+# Campos de perfil que lee el recomendador (ver `recomendador._normalizar_perfil`)
+CAMPOS_PERFIL = ('platos_gustan', 'platos_no_gustan', 'ingredientes_gustan', 'ingredientes_no_gustan', 'alergias', 'restricciones', 'likes', 'allergies')
+
+
+def _top_k(valor: Any) -> Optional[int]:
+    """`top_k` del cuerpo o de `?top=`: entero positivo (o cadena de dígitos, en la URL)."""
+    if valor is None:
+        return None
+    if isinstance(valor, str) and valor.strip().isdigit():
+        valor = int(valor)
+    if isinstance(valor, bool) or not isinstance(valor, int) or valor < 1:
+        raise ErrorHTTP(400, f'top_k debe ser un entero positivo: {valor!r}')
+    return valor
+
+
+def validar_perfil(perfil: Any, nombre: str = 'perfil') -> Dict[str, Any]:
+    """Comprueba que `perfil` es un objeto cuyos campos de `CAMPOS_PERFIL` son listas de cadenas.
+
+    Un perfil mal formado no debe llegar al recomendador: una cadena en
+    `alergias` se recorrería letra a letra y el veto se perdería sin error.
+    """
+    if not isinstance(perfil, dict):
+        raise ErrorHTTP(400, f"'{nombre}' debe ser un objeto")
+    for campo in CAMPOS_PERFIL:
+        if campo in perfil:
+            valor = perfil[campo]
+            if not isinstance(valor, list) or not all(isinstance(x, str) for x in valor):
+                raise ErrorHTTP(400, f"'{nombre}.{campo}' debe ser una lista de cadenas")
+    return perfil
+
+
+class ManejadorRecomendaciones(BaseHTTPRequestHandler):
+    server: ServidorRecomendaciones
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, formato: str, *args) -> None:
+        if getattr(self.server, 'registrar_peticiones', False):
+            super().log_message(formato, *args)
+
+    def _responder(self, estado: int, cuerpo: Any) -> None:
+        datos = json.dumps(cuerpo, ensure_ascii=False).encode('utf-8')
+        self.send_response(estado)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def _leer_json(self) -> Any:
+        try:
+            longitud = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            longitud = -1
+        if longitud < 0:
+            raise ErrorHTTP(400, 'Content-Length inválido')
+        try:
+            return json.loads(self.rfile.read(longitud).decode('utf-8')) if longitud else {}
+        except (ValueError, UnicodeDecodeError):
+            raise ErrorHTTP(400, 'El cuerpo no es JSON válido')
+
+    def _atender(self, metodo) -> None:
+        try:
+            metodo()
+        except ErrorHTTP as e:
+            self._responder(e.estado, {'error': str(e)})
+        except Exception as e:
+            self._responder(500, {'error': f'{type(e).__name__}: {e}'})
+
+    def do_GET(self) -> None:
+        self._atender(self._get)
+
+    def do_POST(self) -> None:
+        self._atender(self._post)
+
+    def _get(self) -> None:
+        url = urlsplit(self.path)
+        partes = [unquote(p) for p in url.path.split('/') if p]
+        if partes == ['salud']:
+            self._responder(200, {'estado': 'ok', 'trabajadores': self.server.trabajadores, 'catalogo': self.server.ruta_catalogo})
+            return
+        if len(partes) == 2 and partes[0] == 'recommend':
+            uid = partes[1]
+            top_k = _top_k(parse_qs(url.query).get('top', [None])[0])
+            perfil = self.server.obtener_usuario(uid)
+            if perfil is None:
+                raise ErrorHTTP(404, f"Usuario '{uid}' no encontrado")
+            self._responder(200, {'usuario': uid, 'recomendaciones': self.server.recomendar(perfil, top_k)})
+            return
+        raise ErrorHTTP(404, f'Ruta desconocida: {url.path}')
+
+    def _post(self) -> None:
+        ruta = urlsplit(self.path).path.rstrip('/')
+        cuerpo = self._leer_json()
+        if not isinstance(cuerpo, dict):
+            raise ErrorHTTP(400, 'Se esperaba un objeto JSON')
+        top_k = _top_k(cuerpo.get('top_k'))
+        if ruta == '/recommend':
+            perfil = validar_perfil(cuerpo.get('perfil', cuerpo))
+            self._responder(200, {'usuario': perfil.get('id') or perfil.get('nombre'), 'recomendaciones': self.server.recomendar(perfil, top_k)})
+            return
+        if ruta == '/batch':
+            pares: List[Tuple[str, Dict[str, Any]]] = []
+            ids = cuerpo.get('ids', [])
+            if not isinstance(ids, list):
+                raise ErrorHTTP(400, "'ids' debe ser una lista")
+            for uid in ids:
+                perfil = self.server.obtener_usuario(str(uid))
+                if perfil is None:
+                    raise ErrorHTTP(404, f"Usuario '{uid}' no encontrado")
+                pares.append((str(uid), perfil))
+            usuarios = cuerpo.get('usuarios', {})
+            if not isinstance(usuarios, dict):
+                raise ErrorHTTP(400, "'usuarios' debe ser un objeto {uid: perfil}")
+            pares.extend((uid, validar_perfil(perfil, f'usuarios.{uid}')) for uid, perfil in usuarios.items())
+            self._responder(200, {'resultados': self.server.recomendar_lote(pares, top_k)})
+            return
+        raise ErrorHTTP(404, f'Ruta desconocida: {ruta}')
+
+
+def crear_servidor(host: str = '127.0.0.1', puerto: int = 8000, trabajadores: Optional[int] = None, almacen: Optional[Almacenamiento] = None, ruta_catalogo: Optional[str] = None, reconstruir: bool = False) -> ServidorRecomendaciones:
+    """Prepara el catálogo binario y crea el servidor (sin arrancar el bucle)."""
+    if almacen is None:
+        almacen = AlmacenamientoJSON(str(DATA_DIR))
+    ruta = preparar_catalogo(almacen, ruta_catalogo or str(RUTA_POR_DEFECTO), reconstruir)
+    return ServidorRecomendaciones((host, puerto), ruta, almacen, trabajadores)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Servidor HTTP/JSON de recomendaciones')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=8000)
+    parser.add_argument('--trabajadores', type=int, default=None, help='Procesos de inferencia (por defecto, uno por CPU)')
+    parser.add_argument('--almacen', metavar='SPEC', default=None, help='Backend de usuarios: json:<directorio> o sqlite:<archivo>')
+    parser.add_argument('--catalogo', metavar='RUTA', default=None, help=f'Catálogo binario (se construye si no existe; por defecto {RUTA_POR_DEFECTO})')
+    parser.add_argument('--reconstruir', action='store_true', help='Reconstruir el catálogo binario antes de arrancar')
+    parser.add_argument('--registro', action='store_true', help='Registrar cada petición en stderr')
+    args = parser.parse_args()
+
+    almacen = abrir_almacenamiento(args.almacen) if args.almacen else None
+    servidor = crear_servidor(args.host, args.puerto, args.trabajadores, almacen, args.catalogo, args.reconstruir)
+    servidor.registrar_peticiones = args.registro
+    print(f'Sirviendo recomendaciones en http://{args.host}:{servidor.server_address[1]} con {servidor.trabajadores} trabajadores')
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        servidor.almacen.cerrar()
@@ -0,0 +1,117 @@
+"""
+Similitud entre platos (Jaccard sobre sus conjuntos de ingredientes).
+
+Estructuras construidas a partir del catálogo compilado de
+`RecommenderModel` (ingredientes internados como enteros):
+
+  - `fila_jaccard`: la fila exacta de un plato, con solo los platos que
+    comparten algún ingrediente con él, obtenidos recorriendo el índice
+    invertido ingrediente -> platos. Es lo que usa el modelo, bajo demanda.
+  - `similitudes_jaccard`: todas las filas. Con ingredientes populares casi
+    todos los pares comparten algo y la matriz "dispersa" acaba siendo
+    casi densa (O(platos²) pares), así que solo se calcula si se pide, con
+    un máximo de pares y opcionalmente recortada a los `top_k` vecinos.
+  - `IndiceMinHash`: firmas MinHash + LSH por bandas para catálogos muy
+    grandes, donde incluso la matriz dispersa es costosa (ingredientes
+    populares hacen que casi todos los pares compartan algo). Da
+    candidatos aproximados que luego se re-puntúan con Jaccard exacto.
+"""
+
+from typing import List, Dict, Optional, Sequence, Set, Tuple
+import heapq
+import random
+
+import numpy as np
+
+
+# Primo de Mersenne 2^31 - 1 para las funciones hash universales (a·x + b) mod p
+_PRIMO_MINHASH = (1 << 31) - 1
+
+
+# Máximo de pares que `similitudes_jaccard` acepta guardar (~100 bytes por
+# par en dicts de Python)
+MAX_PARES_SIMILITUD = 2_000_000
+
+
+def fila_jaccard(d: int, ingredientes_plato: Sequence[Sequence[int]], platos_por_ingrediente: Sequence[Set[int]]) -> Dict[int, float]:
+    """Fila `{plato: jaccard}` del plato `d`.
+
+    `ingredientes_plato[d]` son los ids de ingrediente del plato `d` y
+    `platos_por_ingrediente[i]` el índice invertido. Solo incluye los platos
+    que comparten algún ingrediente con `d` (incluido `d`, con 1.0).
+    """
+    ings = ingredientes_plato[d]
+    inter: Dict[int, int] = {}
+    for i in ings:
+        for e in platos_por_ingrediente[i]:
+            inter[e] = inter.get(e, 0) + 1
+    tam = len(ings)
+    return {e: c / (tam + len(ingredientes_plato[e]) - c) for e, c in inter.items()}
+
+
+def similitudes_jaccard(ingredientes_plato: Sequence[Sequence[int]], platos_por_ingrediente: Sequence[Set[int]], top_k: Optional[int] = None, max_pares: Optional[int] = MAX_PARES_SIMILITUD) -> List[Dict[int, float]]:
+    """Matriz de similitud Jaccard entre platos, una `fila_jaccard` por plato.
+
+    Con `top_k` cada fila conserva solo el propio plato y sus `top_k`
+    vecinos más parecidos. Si el total de pares guardados supera
+    `max_pares` (None: sin límite) se lanza `ValueError` en cuanto se
+    detecta, antes de llenar la memoria.
+    """
+    filas: List[Dict[int, float]] = []
+    pares = 0
+    for d in range(len(ingredientes_plato)):
+        fila = fila_jaccard(d, ingredientes_plato, platos_por_ingrediente)
+        if top_k is not None and len(fila) > top_k + 1:
+            vecinos = heapq.nlargest(top_k, ((e, s) for e, s in fila.items() if e != d), key=lambda item: item[1])
+            fila = dict(vecinos)
+            fila[d] = 1.0
+        pares += len(fila)
+        if max_pares is not None and pares > max_pares:
+            raise ValueError(f'La matriz de similitud supera {max_pares} pares ({d + 1} de {len(ingredientes_plato)} platos); usa top_k o calcula las filas bajo demanda')
+        filas.append(fila)
+    return filas
+
+
+class IndiceMinHash:
+    """Firmas MinHash por plato e índice LSH por bandas.
+
+    Con `n_bandas` bandas de `filas_por_banda` filas, dos platos con
+    similitud Jaccard `s` caen en el mismo cubo de alguna banda con
+    probabilidad 1 - (1 - s^r)^b, lo que filtra casi todos los pares poco
+    parecidos sin compararlos.
+    """
+
+    def __init__(self, ingredientes_plato: Sequence[Sequence[int]], n_bandas: int = 16, filas_por_banda: int = 4, semilla: int = 0):
+        self.n_bandas = n_bandas
+        self.filas_por_banda = filas_por_banda
+        n_hashes = n_bandas * filas_por_banda
+        rnd = random.Random(semilla)
+        a = np.array([rnd.randrange(1, _PRIMO_MINHASH) for _ in range(n_hashes)], dtype=np.int64)
+        b = np.array([rnd.randrange(0, _PRIMO_MINHASH) for _ in range(n_hashes)], dtype=np.int64)
+
+        self.firmas = np.full((len(ingredientes_plato), n_hashes), _PRIMO_MINHASH, dtype=np.int64)
+        for d, ings in enumerate(ingredientes_plato):
+            if len(ings):
+                x = np.asarray(ings, dtype=np.int64)
+                self.firmas[d] = ((a[:, None] * x[None, :] + b[:, None]) % _PRIMO_MINHASH).min(axis=1)
+
+        self.cubos: List[Dict[Tuple[int, ...], List[int]]] = [{} for _ in range(n_bandas)]
+        for d, ings in enumerate(ingredientes_plato):
+            if not len(ings):
+                continue
+            for banda, cubo in enumerate(self.cubos):
+                clave = tuple(self.firmas[d, banda * filas_por_banda:(banda + 1) * filas_por_banda].tolist())
+                cubo.setdefault(clave, []).append(d)
+
+    def candidatos(self, d: int) -> Set[int]:
+        """Platos que comparten cubo con `d` en alguna banda (sin incluir a `d`)."""
+        encontrados: Set[int] = set()
+        for banda, cubo in enumerate(self.cubos):
+            clave = tuple(self.firmas[d, banda * self.filas_por_banda:(banda + 1) * self.filas_por_banda].tolist())
+            encontrados.update(cubo.get(clave, ()))
+        encontrados.discard(d)
+        return encontrados
+
+    def similitud_estimada(self, d: int, e: int) -> float:
+        """Estimación MinHash de Jaccard(d, e): fracción de posiciones iguales en la firma."""
+        return float((self.firmas[d] == self.firmas[e]).mean())
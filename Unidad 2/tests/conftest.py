@@ -0,0 +1,23 @@
+"""Fixtures comunes: catálogo y usuarios sintéticos pequeños (ver `benchmark_recomendador`)."""
+
+from pathlib import Path
+import sys
+
+import pytest
+
+# Los módulos de la Unidad se importan por nombre, como en los scripts
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmark_recomendador import generar_catalogo, generar_usuarios
+
+
+@pytest.fixture(scope='session')
+def catalogo():
+    """`(platillos, disponibilidad)`: 40 platos sobre 25 ingredientes, algunos sin stock."""
+    return generar_catalogo(40, 25, ingredientes_por_plato=(2, 6), frac_no_disponible=0.15, semilla=7)
+
+
+@pytest.fixture(scope='session')
+def usuarios(catalogo):
+    """{uid: perfil} con el formato de `red_semantica.json`."""
+    return generar_usuarios(catalogo[0], 30, semilla=7)['usuarios']
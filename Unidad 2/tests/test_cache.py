@@ -0,0 +1,67 @@
+"""La caché de recomendaciones nunca devuelve una entrada obsoleta."""
+
+from cache_recomendaciones import CacheRecomendaciones, huella_perfil
+from recomendador import RecommenderModel
+
+
+PERFIL = {'ingredientes_gustan': ['Ingrediente_0', 'ingrediente_3'], 'alergias': ['ingrediente_5']}
+
+
+def test_acierto_con_el_mismo_perfil(catalogo):
+    cache = CacheRecomendaciones(RecommenderModel(*catalogo))
+    primera = cache.recomendar(PERFIL, top_k=5)
+    reordenado = {'alergias': ['INGREDIENTE_5'], 'ingredientes_gustan': ['ingrediente_3', 'ingrediente_0']}
+    assert huella_perfil(reordenado) == huella_perfil(PERFIL)
+    assert cache.recomendar(reordenado, top_k=5) is primera
+    assert (cache.aciertos, cache.fallos) == (1, 1)
+
+
+def test_huella_distingue_tipos_de_id():
+    # El recomendador compara los ids de platos_no_gustan sin convertirlos:
+    # 1 no veta el plato '1'
+    modelo = RecommenderModel([
+        {'id': '1', 'name': 'Uno', 'ingredients': ['a']},
+        {'id': '2', 'name': 'Dos', 'ingredients': ['b']},
+    ])
+    cache = CacheRecomendaciones(modelo)
+    assert huella_perfil({'platos_no_gustan': [1]}) != huella_perfil({'platos_no_gustan': ['1']})
+    assert [r['id'] for r in cache.recomendar({'platos_no_gustan': ['1']}, top_k=2)] == ['2']
+    assert sorted(r['id'] for r in cache.recomendar({'platos_no_gustan': [1]}, top_k=2)) == ['1', '2']
+
+
+def test_cambio_de_perfil_no_reutiliza_la_entrada(catalogo):
+    modelo = RecommenderModel(*catalogo)
+    cache = CacheRecomendaciones(modelo)
+    cache.recomendar(PERFIL, uid='u')
+    otro = dict(PERFIL, alergias=[])
+    recs = cache.recomendar(otro, uid='u')
+    assert cache.fallos == 2
+    assert [r['id'] for r in recs] == [r['id'] for r in modelo.recommend(otro)]
+
+
+def test_cambio_de_stock_invalida(catalogo):
+    platillos, disponibilidad = catalogo
+    modelo = RecommenderModel(platillos, disponibilidad)
+    cache = CacheRecomendaciones(modelo)
+    antes = cache.recomendar(PERFIL)
+    ing = platillos[0]['ingredients'][0]
+    assert modelo.actualizar_disponibilidad({ing: not modelo.disponibilidad_ingredientes.get(ing.lower(), True)})
+    despues = cache.recomendar(PERFIL)
+    assert despues is not antes
+    assert {r['id']: r['probability'] for r in despues} == {r['id']: r['probability'] for r in modelo.recommend(PERFIL)}
+    # Un cambio que no altera nada no invalida
+    version = modelo.version
+    modelo.actualizar_disponibilidad({ing: modelo.disponibilidad_ingredientes[ing.lower()]})
+    assert modelo.version == version
+    assert cache.recomendar(PERFIL) is despues
+
+
+def test_invalidar_usuario_y_capacidad(catalogo):
+    cache = CacheRecomendaciones(RecommenderModel(*catalogo), capacidad=2)
+    primera = cache.recomendar(PERFIL, uid='u')
+    cache.invalidar_usuario('u')
+    assert len(cache) == 0
+    assert cache.recomendar(PERFIL, uid='u') is not primera
+    for k in range(3):
+        cache.recomendar({'ingredientes_gustan': [f'ingrediente_{k}']})
+    assert len(cache) == 2
@@ -0,0 +1,82 @@
+"""Diario de la red semántica: reproducción, cola incompleta y compactación."""
+
+import json
+import os
+import threading
+
+from herramientas_semanticas import DiarioRed, IndiceRed, cargar_red_simplificada, guardar_red_simplificada
+
+
+def _red_inicial(tmp_path):
+    path = str(tmp_path / 'red_semantica.json')
+    guardar_red_simplificada(path, {'usuarios': {'ana': {'alergias': ['huevo']}}})
+    return path
+
+
+def test_reproduccion_sobre_la_instantanea(tmp_path):
+    path = _red_inicial(tmp_path)
+    diario = DiarioRed(path)
+    diario.registrar_usuario('beto', {'alergias': []})
+    diario.registrar_usuario('ana', {'alergias': ['leche']})
+    diario.registrar_triples([{'s': 'beto', 'p': 'gusta', 'o': 'p1'}, {'s': 'beto', 'p': 'gusta', 'o': 'p2'}])
+    diario.eliminar_triple('beto', 'gusta', 'p1')
+    diario.eliminar_usuario('beto')
+
+    red = cargar_red_simplificada(path)
+    assert red['usuarios'] == {'ana': {'alergias': ['leche']}}
+    assert red['triples'] == [{'s': 'beto', 'p': 'gusta', 'o': 'p2'}]
+    # La instantánea no se ha tocado: todo está en el diario
+    with open(path, encoding='utf-8') as f:
+        assert json.load(f)['usuarios'] == {'ana': {'alergias': ['huevo']}}
+
+    # Reaplicar el diario sobre una instantánea que ya lo incluye es inocuo
+    guardar_red_simplificada(path, red)
+    assert cargar_red_simplificada(path) == red
+
+
+def test_cola_incompleta(tmp_path):
+    path = _red_inicial(tmp_path)
+    diario = DiarioRed(path)
+    diario.registrar_usuario('beto', {'alergias': []})
+    with open(diario.path_diario, 'ab') as f:
+        f.write(b'{"op":"usuario","uid":"car')
+    tam = os.path.getsize(diario.path_diario)
+
+    # Los lectores ignoran la línea a medias sin recortarla
+    assert set(DiarioRed(path).cargar()['usuarios']) == {'ana', 'beto'}
+    assert IndiceRed(path).obtener('beto') == {'alergias': []}
+    assert os.path.getsize(diario.path_diario) == tam
+
+    # El siguiente escritor la recorta antes de añadir su línea
+    DiarioRed(path).registrar_usuario('dora', {'alergias': []})
+    with open(diario.path_diario, 'rb') as f:
+        lineas = f.read().splitlines()
+    assert [json.loads(l)['uid'] for l in lineas] == ['beto', 'dora']
+
+
+def test_compactacion_acota_el_diario(tmp_path):
+    path = _red_inicial(tmp_path)
+    for n in range(25):
+        # Instancias nuevas (sin cargar): el umbral se respeta igualmente
+        DiarioRed(path, compactar_cada=10).registrar_usuario(f'u{n}', {'n': n})
+    with open(DiarioRed.ruta_diario(path), 'rb') as f:
+        assert len(f.read().splitlines()) < 10
+    red = cargar_red_simplificada(path)
+    assert len(red['usuarios']) == 26
+    assert red['usuarios']['u24'] == {'n': 24}
+
+
+def test_escritores_concurrentes_con_compactacion(tmp_path):
+    path = _red_inicial(tmp_path)
+
+    def escribir(w):
+        for n in range(60):
+            DiarioRed(path, compactar_cada=7).registrar_usuario(f'w{w}_{n}', {'n': n})
+
+    hilos = [threading.Thread(target=escribir, args=(w,)) for w in range(4)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    # Ninguna línea añadida durante una compactación se pierde
+    assert len(cargar_red_simplificada(path)['usuarios']) == 1 + 4 * 60
@@ -0,0 +1,54 @@
+"""El motor de eliminación de variables propio coincide con pgmpy."""
+
+import numpy as np
+import pytest
+
+from eliminacion_variables import MotorEliminacion, RedDiscreta
+from recomendador import RecommenderModel
+
+pytest.importorskip('pgmpy')
+
+
+def _red_en_cadena():
+    # A -> B -> C, A -> C, C -> D: con padres múltiples y nodos intermedios
+    rng = np.random.default_rng(3)
+
+    def cpd(*forma):
+        valores = rng.random(forma) + 0.05
+        return valores / valores.sum(axis=-1, keepdims=True)
+
+    red = RedDiscreta()
+    red.agregar_variable('A', ['a0', 'a1', 'a2'], cpd=cpd(3))
+    red.agregar_variable('B', ['b0', 'b1'], ['A'], cpd(3, 2))
+    red.agregar_variable('C', ['c0', 'c1', 'c2'], ['A', 'B'], cpd(3, 2, 3))
+    red.agregar_variable('D', ['d0', 'd1'], ['C'], cpd(3, 2))
+    red.validar()
+    return red
+
+
+@pytest.mark.parametrize('variables, evidencia', [
+    (['A'], {}),
+    (['A'], {'D': 'd1'}),
+    (['B'], {'C': 'c2', 'D': 'd0'}),
+    (['A', 'C'], {'D': 'd1'}),
+    (['D'], {'A': 'a2'}),
+])
+def test_red_en_cadena(variables, evidencia):
+    assert MotorEliminacion(_red_en_cadena()).verificar(variables, evidencia) < 1e-9
+
+
+def test_cache_entre_consultas_no_altera_resultados():
+    motor = MotorEliminacion(_red_en_cadena())
+    from pgmpy.inference import VariableElimination
+    inferencia = VariableElimination(motor.red.a_pgmpy())
+    for evidencia in ({'D': 'd0'}, {'D': 'd1'}, {'D': 'd0', 'B': 'b1'}, {'D': 'd0'}):
+        assert motor.verificar(['A'], evidencia, inferencia) < 1e-9
+
+
+def test_motor_ve_del_recomendador(catalogo, usuarios):
+    platillos, disponibilidad = catalogo
+    modelo = RecommenderModel(platillos, disponibilidad)
+    for perfil in list(usuarios.values())[:6]:
+        likes = {i.lower() for i in perfil['ingredientes_gustan']}
+        np.testing.assert_allclose(modelo._posterior(likes, 've'), modelo._posterior(likes, 'pgmpy'), atol=1e-9)
+        np.testing.assert_allclose(modelo._posterior(likes, 've'), modelo._posterior(likes, 'numpy'), atol=1e-9)
@@ -0,0 +1,54 @@
+"""`top_k` y `recomendar_lote` devuelven lo mismo que la lista completa de `recommend`."""
+
+import pytest
+
+from recomendador import RecommenderModel
+
+
+def _probabilidades(recs):
+    return [(r['id'], r['probability']) for r in recs]
+
+
+def _positivas(recs):
+    return [(pid, prob) for pid, prob in _probabilidades(recs) if prob > 0]
+
+
+def _iguales(a, b):
+    # Mismas probabilidades en el mismo orden; entre empates el orden de los
+    # ids puede variar por redondeo, así que cada id se compara por separado
+    assert len(a) == len(b)
+    assert [pa for _, pa in a] == pytest.approx([pb for _, pb in b], rel=1e-9, abs=1e-12)
+    referencia = dict(b)
+    for pid, prob in a:
+        assert prob == pytest.approx(referencia.get(pid, -1.0), rel=1e-9, abs=1e-12)
+
+
+@pytest.mark.parametrize('top_k', [1, 5, 100])
+def test_top_k_es_prefijo_de_la_lista_completa(catalogo, usuarios, top_k):
+    modelo = RecommenderModel(*catalogo)
+    for perfil in usuarios.values():
+        completa = _positivas(modelo.recommend(perfil))
+        _iguales(_probabilidades(modelo.recommend(perfil, top_k=top_k)), completa[:top_k])
+
+
+def test_top_k_cero_o_todo_vetado(catalogo):
+    platillos, disponibilidad = catalogo
+    modelo = RecommenderModel(platillos, disponibilidad)
+    assert modelo.recommend({}, top_k=0) == []
+    todos = [p['id'] for p in platillos]
+    assert modelo.recommend({'platos_no_gustan': todos}, top_k=3) == []
+
+
+@pytest.mark.parametrize('tam_bloque', [1, 7, 512])
+def test_lote_igual_a_recommend(catalogo, usuarios, tam_bloque):
+    modelo = RecommenderModel(*catalogo)
+    lote = dict(modelo.recomendar_lote(usuarios, tam_bloque=tam_bloque))
+    assert list(lote) == list(usuarios)
+    for uid, perfil in usuarios.items():
+        _iguales(_positivas(lote[uid]), _positivas(modelo.recommend(perfil)))
+
+
+def test_lote_con_top_k_igual_a_recommend(catalogo, usuarios):
+    modelo = RecommenderModel(*catalogo)
+    for uid, recs in modelo.recomendar_lote(iter(usuarios.items()), tam_bloque=4, top_k=5):
+        _iguales(_probabilidades(recs), _probabilidades(modelo.recommend(usuarios[uid], top_k=5)))
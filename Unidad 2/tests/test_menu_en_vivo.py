@@ -0,0 +1,38 @@
+"""`MenuEnVivo` sigue igual a recalcular `recommend` tras cada cambio de stock."""
+
+import random
+
+import pytest
+
+from menu_en_vivo import MenuEnVivo
+from recomendador import RecommenderModel
+
+
+def _orden(recs):
+    return [r['id'] for r in recs if r['probability'] > 0]
+
+
+@pytest.mark.parametrize('top_k', [None, 3])
+def test_cambios_de_stock_incrementales(catalogo, usuarios, top_k):
+    platillos, disponibilidad = catalogo
+    modelo = RecommenderModel(platillos, dict(disponibilidad))
+    referencia = RecommenderModel(platillos, dict(disponibilidad))
+    menu = MenuEnVivo(modelo, usuarios, top_k=top_k)
+    ingredientes = sorted(modelo.ingredientes)
+    rng = random.Random(5)
+    for _ in range(25):
+        cambios = {ing: rng.random() < 0.5 for ing in rng.sample(ingredientes, 2)}
+        antes = {uid: _orden(menu.recomendaciones(uid)) for uid in usuarios}
+        cambiados = menu.aplicar_disponibilidad(cambios)
+        referencia.actualizar_disponibilidad(cambios)
+        for uid, perfil in usuarios.items():
+            recs = menu.recomendaciones(uid)
+            esperadas = referencia.recommend(perfil, top_k=top_k)
+            assert [r['probability'] for r in recs] == pytest.approx([r['probability'] for r in esperadas], rel=1e-9, abs=1e-15)
+            # Entre empates el orden puede variar por redondeo: cada id se
+            # compara con su probabilidad en la lista completa
+            completa = {r['id']: r['probability'] for r in referencia.recommend(perfil)}
+            for r in recs:
+                assert r['probability'] == pytest.approx(completa[r['id']], rel=1e-9, abs=1e-15)
+            # Se emiten exactamente los usuarios cuyo orden cambió
+            assert (uid in cambiados) == (_orden(recs) != antes[uid])
@@ -0,0 +1,42 @@
+"""Migración JSON -> SQLite -> JSON sin pérdidas."""
+
+from almacenamiento import AlmacenamientoJSON, AlmacenamientoSQLite, migrar
+
+
+TRIPLES = [
+    {'s': 'u0', 'p': 'gusta', 'o': 'p1'},
+    {'s': 'u1', 'p': 'evalua', 'o': {'plato': 'p2', 'nota': 4}},
+    {'s': 'u1', 'p': 'visitas', 'o': 3},
+]
+
+
+def _datos(almacen):
+    return {
+        'platillos': almacen.platillos(),
+        'disponibilidad': almacen.disponibilidad(),
+        'usuarios': dict(almacen.iterar_usuarios()),
+        'triples': sorted(almacen.iterar_triples(), key=repr),
+    }
+
+
+def test_ida_y_vuelta(tmp_path, catalogo, usuarios):
+    platillos, disponibilidad = catalogo
+    (tmp_path / 'origen').mkdir()
+    (tmp_path / 'vuelta').mkdir()
+    origen = AlmacenamientoJSON(str(tmp_path / 'origen'))
+    origen.guardar_catalogo(platillos, disponibilidad)
+    origen.guardar_usuarios(usuarios.items())
+    origen.añadir_triples(TRIPLES)
+    # Duplicados ignorados
+    origen.añadir_triples(TRIPLES[:1])
+
+    with AlmacenamientoSQLite(str(tmp_path / 'datos.db')) as sqlite:
+        conteo = migrar(origen, sqlite)
+        assert conteo == {'platillos': len(platillos), 'ingredientes': len(disponibilidad), 'usuarios': len(usuarios), 'triples': len(TRIPLES)}
+        assert _datos(sqlite) == _datos(origen)
+        assert sqlite.obtener_usuario('u3') == usuarios['u3']
+
+        vuelta = AlmacenamientoJSON(str(tmp_path / 'vuelta'))
+        migrar(sqlite, vuelta)
+    assert _datos(vuelta) == _datos(origen)
+    assert _datos(AlmacenamientoJSON(str(tmp_path / 'vuelta'))) == _datos(origen)
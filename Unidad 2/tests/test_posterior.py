@@ -0,0 +1,37 @@
+"""La posterior en forma cerrada coincide con la BN de pgmpy (motor de referencia)."""
+
+import numpy as np
+import pytest
+
+from recomendador import RecommenderModel, construir_matriz_incidencia, posterior_cerrada
+
+pytest.importorskip('pgmpy')
+
+
+def test_posterior_cerrada_igual_a_pgmpy(catalogo, usuarios):
+    platillos, disponibilidad = catalogo
+    modelo = RecommenderModel(platillos, disponibilidad)
+    for perfil in list(usuarios.values())[:8]:
+        likes = {i.lower() for i in perfil['ingredientes_gustan']}
+        np.testing.assert_allclose(modelo._posterior(likes, 'numpy'), modelo._posterior(likes, 'pgmpy'), atol=1e-9)
+
+
+def test_posterior_cerrada_sobre_incidencia_densa(catalogo):
+    platillos, _ = catalogo
+    modelo = RecommenderModel(platillos)
+    _, ingredientes, incidencia = construir_matriz_incidencia(platillos)
+    evidencia = [0, 3, 5]
+    esperada = modelo._posterior({ingredientes[i] for i in evidencia}, 'numpy')
+    np.testing.assert_allclose(posterior_cerrada(incidencia, evidencia), esperada)
+    np.testing.assert_allclose(posterior_cerrada(incidencia, []), np.full(len(platillos), 1.0 / len(platillos)))
+
+
+def test_recomendaciones_completas_iguales_a_pgmpy(catalogo, usuarios):
+    platillos, disponibilidad = catalogo
+    modelo = RecommenderModel(platillos, disponibilidad)
+    for perfil in list(usuarios.values())[:4]:
+        numpy_ = {r['id']: r['probability'] for r in modelo.recommend(perfil)}
+        pgmpy_ = {r['id']: r['probability'] for r in modelo.recommend(perfil, motor='pgmpy')}
+        assert numpy_.keys() == pgmpy_.keys()
+        for pid, prob in numpy_.items():
+            assert prob == pytest.approx(pgmpy_[pid], abs=1e-9)
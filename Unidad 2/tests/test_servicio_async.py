@@ -0,0 +1,58 @@
+"""`ServicioRecomendacionesAsync`: modelo compartido entre hilos y cierre con peticiones pendientes."""
+
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import threading
+
+import recomendador
+from recomendador import RecommenderModel
+from servicio_async import ServicioRecomendacionesAsync
+
+
+def _pares(recs):
+    return [(r['id'], r['probability']) for r in recs]
+
+
+def test_modelo_compartido_entre_hilos(catalogo, usuarios, monkeypatch):
+    platillos, disponibilidad = catalogo
+    # Caché de filas diminuta: los hilos desalojan filas continuamente
+    monkeypatch.setattr(recomendador, 'MAX_PARES_FILAS_SIMILITUD', 40)
+    ids = [p['id'] for p in platillos]
+    perfiles = [dict(perfil, platos_gustan=[ids[n % len(ids)]]) for n, perfil in enumerate(usuarios.values())] * 4
+    referencia = RecommenderModel(platillos, disponibilidad)
+    esperadas = [_pares(referencia.recommend(perfil, top_k=5)) for perfil in perfiles]
+
+    modelo = RecommenderModel(platillos, disponibilidad)
+    with ThreadPoolExecutor(8) as executor:
+        obtenidas = list(executor.map(lambda perfil: _pares(modelo.recommend(perfil, top_k=5)), perfiles))
+        similares = list(executor.map(lambda pid: modelo.platos_similares(pid, aproximado=True), ids))
+    assert obtenidas == esperadas
+    assert similares == [modelo.platos_similares(pid, aproximado=True) for pid in ids]
+    assert modelo._pares_filas_similitud == sum(len(f) for f in modelo._filas_similitud.values())
+
+
+def test_cerrar_resuelve_las_peticiones_pendientes():
+    liberar = threading.Event()
+
+    def calcular(perfil, top_k):
+        liberar.wait(5)
+        return []
+
+    async def escenario():
+        servicio = ServicioRecomendacionesAsync(calcular=calcular, max_pendientes=1, consumidores=1)
+        await servicio.iniciar()
+        # Una en el executor, otra en la cola y otra esperando hueco en la cola
+        peticiones = [asyncio.create_task(servicio.recomendar({'ingredientes_gustan': [f'i{n}']})) for n in range(3)]
+        agrupada = asyncio.create_task(servicio.recomendar({'ingredientes_gustan': ['i1']}))
+        await asyncio.sleep(0.05)
+        assert servicio.estadisticas()['en_vuelo'] == 3
+        await servicio.cerrar()
+        resultados = await asyncio.wait_for(asyncio.gather(*peticiones, agrupada, return_exceptions=True), 1)
+        liberar.set()
+        return resultados, servicio.estadisticas()
+
+    resultados, estadisticas = asyncio.run(escenario())
+    assert len(resultados) == 4
+    for resultado in resultados:
+        assert isinstance(resultado, RuntimeError)
+    assert estadisticas['en_vuelo'] == 0 and estadisticas['pendientes'] == 0